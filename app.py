@@ -1,5 +1,7 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, session
 import os
+import time
+import threading
 from dotenv import load_dotenv
 import subprocess
 from werkzeug.utils import secure_filename
@@ -8,7 +10,6 @@ import uuid
 from collections import deque
 from datetime import datetime, timedelta
 import base64
-import requests
 from places import MedicalPlacesSystem  # Add this import
 from apscheduler.schedulers.background import BackgroundScheduler
 import json
@@ -17,14 +18,30 @@ from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
 # from langchain.chat_models import ChatOpenAI  # Use ChatOpenAI with Together API
-from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
-from src.helper import download_hugging_face_embeddings
-from src.prompt import get_system_prompt, customize_response
+from src.helper import download_hugging_face_embeddings, load_vector_store
+from src.prompt import get_system_prompt, customize_response, format_health_context
 from src.database import get_user_health, create_user, verify_user, init_db
+from src.pipeline import RetrievalPipeline, StageTimer, contains_medical_terms
+from src.embedding_cache import with_query_cache
+from src.embedding_batcher import with_batching
+from src.semantic_cache import SemanticAnswerCache
+from src.keyword_index import load_keyword_index
+from src.keyword_matcher import KeywordMatcher
+from src.keywords import MEDICAL_KEYWORDS
+from src.topic_gate import load_topic_gate
+from src.reranker import load_reranker
+from src.session_shards import load_session_shards
+from src.summary_jobs import load_summary_jobs
+from src.summary_cache import document_key, load_summary_cache, prompt_version
+from src.single_flight import llm_flight, with_single_flight
+from src.llm_governor import INTERACTIVE, SUMMARY, LLMOverloaded, get_llm_governor
+from src.llm_deadline import client_limits, llm_deadline_stats, with_deadline
+from src.http_client import get_http_client
+from src.prompt_budget import RECENT_EXCHANGES, format_exchanges, load_prompt_assembler, roll_summary
+from src import config
 
 # Initialize the database
 init_db()
@@ -40,40 +57,91 @@ PINECONE_API_KEY = os.environ.get('PINECONE_API_KEY')
 TOGETHER_API_KEY = os.environ.get('TOGETHER_API_KEY2')
 
 # Ensure keys are available for libraries
-os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
+if PINECONE_API_KEY:  # Not needed when running on the local vector index
+    os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 os.environ["TOGETHER_API_KEY"] = TOGETHER_API_KEY
 
-# Load embeddings
-embeddings = download_hugging_face_embeddings()
+# Load embeddings: repeated questions come from the query cache, concurrent misses are batched
+embedding_batcher = with_batching(download_hugging_face_embeddings())
+embeddings = with_query_cache(embedding_batcher)
 
-# Initialize Pinecone index
+# Initialize vector store (Pinecone by default, local index when VECTOR_STORE_BACKEND=local)
 index_name = "medicalbot-try"
-docsearch = PineconeVectorStore.from_existing_index(
-    index_name=index_name,
-    embedding=embeddings
-)
+docsearch = load_vector_store(embeddings, index_name)
 
 # Create retriever
 retriever = docsearch.as_retriever(search_type="similarity", search_kwargs={"k": 5})
 
-# Initialize LLM
-llm = ChatOpenAI(
+# Initialize LLM; concurrent identical prompts share one Together call, and every upstream attempt
+# (primary, hedge, fallback) is admitted by priority so chat answers go ahead of document summaries
+LLM_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+together_llm = ChatOpenAI(
     openai_api_key=TOGETHER_API_KEY,
-    openai_api_base="https://api.together.xyz/v1",
-    model_name="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+    openai_api_base=config.LLM_API_BASE,
+    model_name=LLM_MODEL,
     temperature=0.4,
-    max_tokens=500
+    max_tokens=500,
+    **client_limits(max_retries=1)
 )
-
-# Build prompt chain with context
+# Paid model that answers chat when the free model stalls (only when LLM_FALLBACK_MODEL is set)
+together_fallback_llm = ChatOpenAI(
+    openai_api_key=TOGETHER_API_KEY,
+    openai_api_base=config.LLM_API_BASE,
+    model_name=config.LLM_FALLBACK_MODEL,
+    temperature=0.4,
+    max_tokens=500,
+    **client_limits(max_retries=0)
+) if config.LLM_FALLBACK_MODEL else None
+llm = with_single_flight(with_deadline(together_llm, together_fallback_llm, INTERACTIVE))
+# Summaries are cached for weeks, so they always come from the main model
+summary_llm = with_single_flight(with_deadline(together_llm, priority=SUMMARY))
+
+# Build prompt chain: health profile, compacted history and retrieved chunks, sized by the prompt assembler
+system_prompt = get_system_prompt()
 prompt = ChatPromptTemplate.from_messages([
-    ("system", get_system_prompt() + "\n\nPrevious conversation context:\n{context}"),
+    ("system", system_prompt
+     + "\n\nUser's Health Context:\n{health_context}"
+     + "\n\nPrevious conversation:\n{history}"
+     + "\n\nRelevant medical information:\n{context}"),
     ("human", "{input}"),
 ])
+prompt_assembler = load_prompt_assembler(system_prompt)
 
-# Create the question-answer and retrieval chain
+# Create the question-answer chain and the single-pass retrieval pipeline
 question_answer_chain = create_stuff_documents_chain(llm, prompt)
-rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+answer_cache = SemanticAnswerCache(
+    threshold=config.ANSWER_CACHE_THRESHOLD,
+    ttl=config.ANSWER_CACHE_TTL,
+    max_entries=config.ANSWER_CACHE_SIZE
+) if config.ANSWER_CACHE_SIZE > 0 else None
+keyword_index = load_keyword_index()
+topic_gate = load_topic_gate()
+
+def release_document(doc_id):
+    """Drop what is left of an uploaded document once its session shard expires"""
+    if keyword_index:
+        keyword_index.delete(doc_id)
+    if summary_jobs:
+        summary_jobs.discard(doc_id)
+    uploaded_docs.pop(doc_id, None)
+
+# Uploaded PDFs are served from per-document in-memory shards rather than the global index
+session_shards = load_session_shards(on_evict=release_document)
+chat_pipeline = RetrievalPipeline(
+    docsearch,
+    question_answer_chain,
+    k=config.HYBRID_RETRIEVAL_K if keyword_index else config.RETRIEVAL_K,
+    answer_cache=answer_cache,
+    keyword_index=keyword_index,
+    fetch_k=config.HYBRID_FETCH_K,
+    reranker=load_reranker(),
+    mmr_lambda=config.MMR_LAMBDA,
+    mmr_fetch_k=config.MMR_FETCH_K,
+    shards=session_shards
+)
+
+NON_MEDICAL_RESPONSE = "I apologize, but I am a medical assistant and can only provide information related to health and medical topics. Please ask me about medical or health-related questions."
+BUSY_RESPONSE = "I'm answering a lot of questions right now. Please try again in a moment."
 
 # Configure upload folder
 UPLOAD_FOLDER = 'uploads'
@@ -117,12 +185,7 @@ def format_conversation_history():
     """Format conversation history for context"""
     if 'conversation_history' not in session:
         return ""
-    
-    formatted_history = []
-    for exchange in session['conversation_history'][-5:]:  # Get last 5 exchanges
-        formatted_history.append(f"User: {exchange['user']}")
-        formatted_history.append(f"Assistant: {exchange['assistant']}")
-    return "\n".join(formatted_history)
+    return format_exchanges(session['conversation_history'][-RECENT_EXCHANGES:])
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -141,51 +204,13 @@ def process_pdf(file_path):
     chunks = text_splitter.split_documents(pages)
     return chunks
 
+# Compiled once at import; matches keywords at word starts in a single pass
+MEDICAL_QUERY_MATCHER = KeywordMatcher(MEDICAL_KEYWORDS)
+
 # Add this function after the imports and before the routes
 def is_medical_query(query):
     """Check if the query is related to medical or health topics"""
-    # List of medical-related keywords and topics
-    medical_keywords = [
-        'health', 'medical', 'doctor', 'hospital', 'disease', 'symptom', 
-        'treatment', 'medicine', 'patient', 'diagnosis', 'therapy', 
-        'surgery', 'clinic', 'nurse', 'pharmacy', 'prescription', 'pain',
-        'illness', 'condition', 'disorder', 'infection', 'virus', 'bacteria',
-        'vaccine', 'vaccination', 'checkup', 'examination', 'test', 'scan',
-        'x-ray', 'mri', 'ct', 'blood', 'pressure', 'heart', 'lung', 'brain',
-        'bone', 'muscle', 'joint', 'skin', 'eye', 'ear', 'nose', 'throat',
-        'dental', 'mental', 'psychological', 'cancer', 'diabetes', 'asthma',
-        'allergy', 'fever', 'cold', 'flu', 'covid', 'coronavirus', 'pandemic',
-        'epidemic', 'outbreak', 'emergency', 'ambulance', 'paramedic', 'first aid',
-        'recovery', 'rehabilitation', 'physiotherapy', 'occupational therapy',
-        'diet', 'nutrition', 'exercise', 'fitness', 'wellness', 'prevention',
-        'vaccination', 'immunization', 'antibiotic', 'antiviral', 'medication',
-        'dosage', 'side effect', 'complication', 'prognosis', 'remission',
-        'chronic', 'acute', 'terminal', 'palliative', 'hospice', 'mortality',
-        'morbidity', 'epidemiology', 'pathology', 'anatomy', 'physiology',
-        'biochemistry', 'genetics', 'immunology', 'microbiology', 'pharmacology',
-        'toxicology', 'radiology', 'ultrasound', 'endoscopy', 'biopsy',
-        'transplant', 'prosthesis', 'implant', 'pacemaker', 'defibrillator',
-        'dialysis', 'chemotherapy', 'radiation', 'hormone', 'steroid', 'insulin',
-        'antidepressant', 'antipsychotic', 'anesthetic', 'analgesic', 'antacid',
-        'antihistamine', 'decongestant', 'expectorant', 'laxative', 'diuretic',
-        'anticoagulant', 'anticonvulsant', 'antifungal', 'antimalarial',
-        'antiretroviral', 'antitubercular', 'antiviral', 'antibacterial',
-        'antiseptic', 'disinfectant', 'sanitizer', 'mask', 'glove', 'gown',
-        'syringe', 'needle', 'catheter', 'stent', 'suture', 'bandage', 'plaster',
-        'cast', 'brace', 'crutch', 'wheelchair', 'walker', 'cane', 'prosthesis',
-        'hearing aid', 'glasses', 'contact lens', 'denture', 'pacemaker',
-        'defibrillator', 'insulin pump', 'cpap', 'ventilator', 'dialysis machine',
-        'mri machine', 'ct scanner', 'x-ray machine', 'ultrasound machine',
-        'endoscope', 'colonoscope', 'laparoscope', 'arthroscope', 'bronchoscope',
-        'cystoscope', 'gastroscope', 'hysteroscope', 'laryngoscope', 'otoscope',
-        'proctoscope', 'sigmoidoscope', 'thoracoscope', 'ureteroscope'
-    ]
-    
-    # Convert query to lowercase for case-insensitive matching
-    query_lower = query.lower()
-    
-    # Check if query contains any medical keywords
-    return any(keyword in query_lower for keyword in medical_keywords)
+    return MEDICAL_QUERY_MATCHER.contains_any(query)
 
 # ---------- ROUTES ----------
 
@@ -310,6 +335,153 @@ def guest_login():
             'message': str(e)
         }), 500
 
+def prepare_chat(msg):
+    """Everything before the LLM call: the context for the answer, or a final answer string
+    when the question is rejected before generation"""
+    # Get user's health information
+    health_info = None
+    if 'user_id' in session and session['user_id'] != 'guest':
+        health_info = get_user_health(session['user_id'])
+    
+    # Get only the most recent document ID
+    recent_doc_id = None
+    if 'uploaded_docs' in session and session['uploaded_docs']:
+        recent_doc_id = session['uploaded_docs'][-1]
+        print(f"Using most recent document ID: {recent_doc_id}")
+
+    # An expired session shard means the upload is gone, answer from the general knowledge base
+    if recent_doc_id and session_shards and recent_doc_id not in uploaded_docs:
+        print(f"Document {recent_doc_id} is no longer held, searching the global index")
+        recent_doc_id = None
+
+    if recent_doc_id:
+        print(f"Searching with filter: doc_id={recent_doc_id}")
+    
+    timer = StageTimer()
+    
+    # Fetch the documents once; the same chunks feed the gate and the LLM
+    try:
+        query_embedding = chat_pipeline.embed(msg, timer=timer)
+        
+        # Reject clearly off-topic questions before any retrieval or LLM work.
+        # Questions about an uploaded report or with a medical keyword always go through.
+        if topic_gate and not recent_doc_id and not is_medical_query(msg):
+            with timer.stage("topic_gate"):
+                off_topic = topic_gate.is_off_topic(query_embedding)
+            if off_topic:
+                chat_pipeline.stats.record(timer)
+                print(f"Rejected off-topic query in {timer.report()}")
+                return NON_MEDICAL_RESPONSE
+        
+        relevant_docs = chat_pipeline.retrieve(msg, doc_id=recent_doc_id, timer=timer,
+                                               embedding=query_embedding)
+        
+        # Check if we found any relevant medical documents
+        if not relevant_docs or not chat_pipeline.passes_relevance_gate(relevant_docs, timer=timer):
+            return NON_MEDICAL_RESPONSE
+        
+    except Exception as e:
+        print(f"Error retrieving documents: {str(e)}")
+        return NON_MEDICAL_RESPONSE
+    
+    # Fit health context, history and chunks into the prompt budget
+    with timer.stage("assemble"):
+        health_context = format_health_context(health_info.get('symptoms'), health_info.get('diseases')) \
+            if health_info else ""
+        assembled = prompt_assembler.assemble(
+            msg,
+            relevant_docs,
+            history=session.get('conversation_history', []),
+            summary=session.get('conversation_summary', ""),
+            health_context=health_context
+        )
+    report = assembled['report']
+    print(f"Prompt tokens: {report['total']} (saved {report['saved']} of {report['baseline']}, "
+          f"{report['compacted_exchanges']} exchanges compacted, {report['dropped_docs']} chunks dropped)")
+    
+    # Answers built on personal data (health profile, uploaded report) are never shared via the cache;
+    # conversation history is part of the cache key, so follow-ups only match an identical history
+    personalized = bool(recent_doc_id) or bool(health_context)
+    return {
+        'docs': assembled['docs'],
+        'prompt_inputs': assembled['inputs'],
+        'embedding': query_embedding,
+        'timer': timer,
+        'health_info': health_info,
+        'cacheable': not personalized
+    }
+
+def finish_answer(answer, health_info):
+    """Medical-content check and health-profile customization of a generated answer"""
+    # Additional check to ensure the response is medical-related
+    if not contains_medical_terms(answer):
+        return None
+
+    # Customize response based on user's health information
+    if health_info:
+        answer = customize_response(
+            answer,
+            symptoms=health_info.get('symptoms'),
+            diseases=health_info.get('diseases')
+        )
+    return answer
+
+def remember_exchange(msg, answer):
+    """Add a question/answer pair to the session's conversation history"""
+    init_session()
+    session['conversation_history'].append({
+        "user": msg,
+        "assistant": answer
+    })
+        
+    # Keep only the last few exchanges verbatim, older ones are folded into a rolling summary
+    if len(session['conversation_history']) > RECENT_EXCHANGES:
+        dropped = session['conversation_history'][:-RECENT_EXCHANGES]
+        session['conversation_summary'] = roll_summary(
+            session.get('conversation_summary', ""), dropped, config.PROMPT_SUMMARY_TOKENS
+        )
+        session['conversation_history'] = session['conversation_history'][-RECENT_EXCHANGES:]
+        
+    # Update current context
+    session['current_context'] = {
+        "last_question": msg,
+        "last_answer": answer
+    }
+    
+    # Ensure session changes are saved
+    session.modified = True
+
+# Answers finished over /get_stream, by stream id. The session cookie has already been sent
+# by the time a stream completes, so the exchange is added to the history on the next request.
+streamed_exchanges = {}
+streamed_exchanges_lock = threading.Lock()
+STREAMED_EXCHANGE_TTL = 600
+
+def merge_streamed_exchange():
+    """Move the session's last streamed answer, once finished, into its conversation history"""
+    stream_id = session.get('pending_stream')
+    if not stream_id:
+        return
+    with streamed_exchanges_lock:
+        exchange = streamed_exchanges.pop(stream_id, None)
+    if exchange is None:
+        return
+    session.pop('pending_stream', None)
+    msg, answer, _ = exchange
+    if answer is not None:
+        remember_exchange(msg, answer)
+
+def save_streamed_exchange(stream_id, msg, answer):
+    now = time.time()
+    with streamed_exchanges_lock:
+        for key in [k for k, (_, _, finished) in streamed_exchanges.items() if now - finished > STREAMED_EXCHANGE_TTL]:
+            del streamed_exchanges[key]
+        streamed_exchanges[stream_id] = (msg, answer, now)
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/get', methods=["POST"])
 def get_response():
     msg = request.form["msg"]
@@ -318,108 +490,85 @@ def get_response():
     try:
         # Initialize session if needed
         init_session()
+        merge_streamed_exchange()
         
-        # Get conversation context
-        context = format_conversation_history()
+        chat = prepare_chat(msg)
+        if isinstance(chat, str):
+            return chat
         
-        # Get user's health information
-        health_info = None
-        if 'user_id' in session and session['user_id'] != 'guest':
-            health_info = get_user_health(session['user_id'])
+        answer = chat_pipeline.generate(msg, chat['docs'], timer=chat['timer'], embedding=chat['embedding'],
+                                        cacheable=chat['cacheable'], prompt_inputs=chat['prompt_inputs'])
+        chat_pipeline.stats.record(chat['timer'])
+        print(f"Pipeline timings: {chat['timer'].report()}")
         
-        # Get only the most recent document ID
-        recent_doc_id = None
-        if 'uploaded_docs' in session and session['uploaded_docs']:
-            recent_doc_id = session['uploaded_docs'][-1]
-            print(f"Using most recent document ID: {recent_doc_id}")
-        
-        # Configure retriever with document filter
-        search_kwargs = {"k": 5}
-        if recent_doc_id:
-            search_kwargs["filter"] = {"doc_id": recent_doc_id}
-            print(f"Searching with filter: {search_kwargs}")
-        
-        # Update retriever with new search parameters
-        retriever = docsearch.as_retriever(
-            search_type="similarity",
-            search_kwargs=search_kwargs
-        )
-        
-        # First, try to get relevant documents from Pinecone
-        try:
-            relevant_docs = retriever.get_relevant_documents(msg)
-            
-            # Check if we found any relevant medical documents
-            if not relevant_docs:
-                return "I apologize, but I am a medical assistant and can only provide information related to health and medical topics. Please ask me about medical or health-related questions."
-            
-            # Check if the documents are actually medical-related
-            medical_content_found = False
-            for doc in relevant_docs:
-                # Check if the document content contains medical-related terms
-                content = doc.page_content.lower()
-                if any(term in content for term in ['medical', 'health', 'disease', 'treatment', 'symptom', 'diagnosis', 'patient', 'doctor', 'hospital', 'medicine', 'therapy']):
-                    medical_content_found = True
-                    break
-            
-            if not medical_content_found:
-                return "I apologize, but I am a medical assistant and can only provide information related to health and medical topics. Please ask me about medical or health-related questions."
-            
-        except Exception as e:
-            print(f"Error retrieving documents: {str(e)}")
-            return "I apologize, but I am a medical assistant and can only provide information related to health and medical topics. Please ask me about medical or health-related questions."
-        
-        # Create new chain with updated retriever
-        rag_chain = create_retrieval_chain(
-            retriever,
-            question_answer_chain
-        )
-        
-        # Get relevant documents from Pinecone
-        response = rag_chain.invoke({
-            "input": msg,
-            "context": context
-        })
-        answer = response["answer"]
-        
-        # Additional check to ensure the response is medical-related
-        if not any(term in answer.lower() for term in ['medical', 'health', 'disease', 'treatment', 'symptom', 'diagnosis', 'patient', 'doctor', 'hospital', 'medicine', 'therapy']):
-            return "I apologize, but I am a medical assistant and can only provide information related to health and medical topics. Please ask me about medical or health-related questions."
-    
-        # Customize response based on user's health information
-        if health_info:
-            answer = customize_response(
-                answer,
-                symptoms=health_info.get('symptoms'),
-                diseases=health_info.get('diseases')
-            )
+        answer = finish_answer(answer, chat['health_info'])
+        if answer is None:
+            return NON_MEDICAL_RESPONSE
         
         print("Response:", answer)
-            
-        # Update conversation history in session
-        session['conversation_history'].append({
-            "user": msg,
-            "assistant": answer
-        })
-            
-        # Keep only last 5 exchanges
-        if len(session['conversation_history']) > 5:
-            session['conversation_history'] = session['conversation_history'][-5:]
-            
-        # Update current context
-        session['current_context'] = {
-            "last_question": msg,
-            "last_answer": answer
-        }
-        
-        # Ensure session changes are saved
-        session.modified = True
+        remember_exchange(msg, answer)
         
         return str(answer)
+    except LLMOverloaded as e:
+        print("Shed chat request:", str(e))
+        return BUSY_RESPONSE, 503, {'Retry-After': '5'}
     except Exception as e:
         print("Error:", str(e))
         return "I apologize, but I encountered an error while processing your question. Please try again."
 
+@app.route('/get_stream', methods=["POST"])
+def get_response_stream():
+    """Streaming variant of /get: 'token' events as the answer is generated, then one 'done'
+    event with the final (checked and personalized) answer that replaces the streamed text"""
+    msg = request.form["msg"]
+    print("User input (stream):", msg)
+    error_answer = "I apologize, but I encountered an error while processing your question. Please try again."
+    
+    try:
+        init_session()
+        merge_streamed_exchange()
+        chat = prepare_chat(msg)
+    except Exception as e:
+        print("Error:", str(e))
+        chat = error_answer
+    
+    if isinstance(chat, str):
+        early_answer = chat
+        return Response(sse_event('done', {'answer': early_answer}), mimetype='text/event-stream')
+    
+    stream_id = str(uuid.uuid4())
+    session['pending_stream'] = stream_id
+    session.modified = True
+    
+    def generate_events():
+        parts = []
+        try:
+            for chunk in chat_pipeline.stream(msg, chat['docs'], timer=chat['timer'],
+                                              embedding=chat['embedding'], cacheable=chat['cacheable'],
+                                              prompt_inputs=chat['prompt_inputs']):
+                parts.append(chunk)
+                yield sse_event('token', {'text': chunk})
+            chat_pipeline.stats.record(chat['timer'])
+            print(f"Pipeline timings: {chat['timer'].report()}")
+            
+            answer = finish_answer("".join(parts), chat['health_info'])
+            save_streamed_exchange(stream_id, msg, answer)
+            print("Response:", answer)
+            yield sse_event('done', {'answer': answer if answer is not None else NON_MEDICAL_RESPONSE})
+        except LLMOverloaded as e:
+            print("Shed chat stream:", str(e))
+            save_streamed_exchange(stream_id, msg, None)
+            yield sse_event('done', {'answer': BUSY_RESPONSE})
+        except Exception as e:
+            print("Error while streaming:", str(e))
+            save_streamed_exchange(stream_id, msg, None)
+            yield sse_event('done', {'answer': error_answer})
+    
+    return Response(generate_events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # keep proxies from buffering the stream
+    })
+
 @app.route("/upload", methods=["POST"])
 def upload_file():
     if 'file' not in request.files:
@@ -446,6 +595,10 @@ def upload_file():
         file_path = os.path.join(temp_dir, filename)
         file.save(file_path)
         print(f"File saved temporarily at: {file_path}")
+        
+        # Identical PDFs share their summary, whatever doc_id they were uploaded under
+        with open(file_path, 'rb') as saved_file:
+            summary_key = document_key(saved_file.read(), SUMMARY_PROMPT_VERSION)
 
         # Process PDF and get chunks
         print("Processing PDF...")
@@ -462,18 +615,33 @@ def upload_file():
                 'upload_time': datetime.now().isoformat()
             })
         
-        # Add to Pinecone in batches
-        batch_size = 50
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            docsearch.add_documents(documents=batch)
-            print(f"Added batch {i//batch_size + 1} to Pinecone")
+        if session_shards:
+            # Keep the document in its own in-memory shard, the global index stays untouched
+            vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+            session_shards.add(doc_id, chunks, vectors)
+            print(f"Stored {len(chunks)} chunks in the session shard")
+        else:
+            # Add to Pinecone in batches
+            batch_size = 50
+            for i in range(0, len(chunks), batch_size):
+                batch = chunks[i:i + batch_size]
+                docsearch.add_documents(documents=batch)
+                print(f"Added batch {i//batch_size + 1} to Pinecone")
+            # Index the same chunks for keyword (BM25) search, next to their global vectors
+            if keyword_index:
+                keyword_index.add_documents(chunks)
+        
+        # Start the summary now, from the same opening chunks /get_summary would fetch,
+        # unless this exact PDF has been summarized before
+        if summary_jobs and chunks and not (summary_cache and summary_cache.get(summary_key)):
+            summary_jobs.submit(doc_id, "\n".join(chunk.page_content for chunk in chunks[:5]), summary_key)
         
         # Store document info
         uploaded_docs[doc_id] = {
             'filename': filename,
             'chunks': len(chunks),
-            'upload_time': datetime.now().isoformat()
+            'upload_time': datetime.now().isoformat(),
+            'summary_key': summary_key
         }
         
         print(f"Successfully processed and stored {filename}")
@@ -512,12 +680,20 @@ def delete_document():
         if doc_id not in uploaded_docs:
             return jsonify({'error': 'Document not found'}), 404
             
-        # Delete document from Pinecone
-        docsearch.delete(
-            filter={
-                "doc_id": doc_id
-            }
-        )
+        # Delete document from its session shard or from Pinecone
+        if session_shards:
+            session_shards.delete(doc_id)
+        else:
+            docsearch.delete(
+                filter={
+                    "doc_id": doc_id
+                }
+            )
+        
+        if keyword_index:
+            keyword_index.delete(doc_id)
+        if summary_jobs:
+            summary_jobs.discard(doc_id)
         
         # Remove from tracking
         del uploaded_docs[doc_id]
@@ -537,12 +713,19 @@ def cleanup_session():
         
         for doc_id in doc_ids:
             if doc_id in uploaded_docs:
-                # Delete document from Pinecone
-                docsearch.delete(
-                    filter={
-                        "doc_id": doc_id
-                    }
-                )
+                # Delete document from its session shard or from Pinecone
+                if session_shards:
+                    session_shards.delete(doc_id)
+                else:
+                    docsearch.delete(
+                        filter={
+                            "doc_id": doc_id
+                        }
+                    )
+                if keyword_index:
+                    keyword_index.delete(doc_id)
+                if summary_jobs:
+                    summary_jobs.discard(doc_id)
                 # Remove from tracking
                 del uploaded_docs[doc_id]
         
@@ -553,36 +736,9 @@ def cleanup_session():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route("/get_summary", methods=["POST"])
-def get_summary():
-    try:
-        data = request.get_json()
-        doc_id = data.get('doc_id')
-        
-        if not doc_id:
-            return jsonify({'error': 'No document ID provided'}), 400
-            
-        print(f"Generating summary for doc_id: {doc_id}")  # Debug log
-        
-        # Get document chunks from Pinecone
-        results = docsearch.similarity_search(
-            query="",
-            k=5,
-            filter={"doc_id": doc_id}
-        )
-        
-        if not results:
-            print(f"No documents found for doc_id: {doc_id}")
-            return jsonify({'summary': 'No content found in document'}), 200
-            
-        print(f"Found {len(results)} chunks for summarization")
-        
-        # Combine the chunks into a single text
-        content = "\n".join([doc.page_content for doc in results])
-        
-        # Create a comprehensive medical analysis including treatment and precautions
-        comprehensive_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a medical assistant AI analyzing a medical report. Provide a comprehensive analysis in this EXACT format with emoji markers (no substitutions):
+# Comprehensive medical analysis of an uploaded report, including treatment and precautions
+COMPREHENSIVE_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a medical assistant AI analyzing a medical report. Provide a comprehensive analysis in this EXACT format with emoji markers (no substitutions):
 
 🔹 **Medical Summary**:  
 <3-4 line summary of key findings in simple, clear language that states what values are high/low/normal and concludes with positive/negative health outcome>
@@ -597,54 +753,165 @@ def get_summary():
 <2-3 practical tips tailored to the findings>
 
 Format exactly as shown with these headings and emoji markers."""),
-            ("human", "Analyze this medical document and provide a comprehensive assessment:\n\n{content}")
-        ])
-        
-        # Generate comprehensive analysis
-        comprehensive_chain = comprehensive_prompt | llm
-        comprehensive_response = comprehensive_chain.invoke({
-            "content": content
-        })
-        
-        # Get response content
-        comprehensive_content = comprehensive_response.content
-        
-        print(f"Comprehensive analysis: {comprehensive_content[:100]}...")
-        print(type(comprehensive_content))
-        
-        # For backwards compatibility, generate a brief summary too
-        summary_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful and friendly medical AI assistant. Given a medical report, respond clearly and simply.
+    ("human", "Analyze this medical document and provide a comprehensive assessment:\n\n{content}")
+])
 
-            For each report section (like Hemoglobin, WBC, Platelets, etc.), give a **1–2 line explanation** of what the value means, whether it's high, low, or normal, and what it might indicate. Use only actual numbers from the report — **do not add list numbers (1, 2, 3, etc.)**. You may include percentages if they appear in the report.
+# Brief plain-language summary, generated from the comprehensive analysis
+BRIEF_SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful and friendly medical AI assistant. Given a medical report, respond clearly and simply.
 
-            At the end, write a short and easy-to-understand **overall summary** combining everything. Be conversational and human, like you're gently explaining to someone with no medical background.
+    For each report section (like Hemoglobin, WBC, Platelets, etc.), give a **1–2 line explanation** of what the value means, whether it's high, low, or normal, and what it might indicate. Use only actual numbers from the report — **do not add list numbers (1, 2, 3, etc.)**. You may include percentages if they appear in the report.
 
-            Keep everything simple, clear, and non-alarming. Avoid medical jargon unless absolutely necessary. use total less than 120 words
-            """),
-            ("human", "Give the final response in paragraph a :\n\n{content}")
-        ])
-        
-        summary_chain = summary_prompt | llm
-        summary_response = summary_chain.invoke({
-            "content": comprehensive_content
-        })
+    At the end, write a short and easy-to-understand **overall summary** combining everything. Be conversational and human, like you're gently explaining to someone with no medical background.
+
+    Keep everything simple, clear, and non-alarming. Avoid medical jargon unless absolutely necessary. use total less than 120 words
+    """),
+    ("human", "Give the final response in paragraph a :\n\n{content}")
+])
+
+# Cached summaries are only reused for the same prompts and model
+SUMMARY_PROMPT_VERSION = prompt_version(
+    *(message.content for message in COMPREHENSIVE_ANALYSIS_PROMPT.format_messages(content="")),
+    *(message.content for message in BRIEF_SUMMARY_PROMPT.format_messages(content="")),
+    LLM_MODEL
+)
+summary_cache = load_summary_cache()
+
+def load_summary_content(doc_id):
+    """Text of the chunks a document summary is generated from, or None if the document has none"""
+    # Get document chunks from the session shard (opening chunks in page order), else from Pinecone
+    shard = session_shards.get(doc_id) if session_shards else None
+    if shard is not None:
+        results = shard.leading_chunks(5)
+    else:
+        results = docsearch.similarity_search(
+            query="",
+            k=5,
+            filter={"doc_id": doc_id}
+        )
+    
+    if not results:
+        print(f"No documents found for doc_id: {doc_id}")
+        return None
         
-        summary_content = summary_response.content
-        print(type(summary_content))
+    print(f"Found {len(results)} chunks for summarization")
+    
+    # Combine the chunks into a single text
+    return "\n".join([doc.page_content for doc in results])
+
+def summary_events(content, cache_key=None):
+    """Generate a document summary: yields ('analysis', text) pieces of the comprehensive analysis
+    as the LLM writes them, then ('done', {'summary', 'comprehensive_analysis'}), stored under cache_key"""
+    parts = []
+    for chunk in (COMPREHENSIVE_ANALYSIS_PROMPT | summary_llm).stream({"content": content}):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield 'analysis', chunk.content
+    comprehensive_content = "".join(parts)
+    print(f"Comprehensive analysis: {comprehensive_content[:100]}...")
+    
+    # For backwards compatibility, generate a brief summary too
+    summary_content = (BRIEF_SUMMARY_PROMPT | summary_llm).invoke({"content": comprehensive_content}).content
+    result = {'summary': summary_content, 'comprehensive_analysis': comprehensive_content}
+    if summary_cache and cache_key:
+        summary_cache.put(cache_key, result)
+    yield 'done', result
+
+# Summaries are precomputed in the background from the chunks /upload already has
+summary_jobs = load_summary_jobs(summary_events)
+
+def document_summary_events(doc_id):
+    """Summary events for a document: from the summary cache for a previously seen PDF, followed
+    live from its background job when there is one, otherwise generated here. None if the document
+    has no content."""
+    cache_key = uploaded_docs.get(doc_id, {}).get('summary_key')
+    cached = summary_cache.get(cache_key) if summary_cache and cache_key else None
+    if cached is not None:
+        print(f"Using cached summary for doc_id: {doc_id}")
+        return iter([('analysis', cached['comprehensive_analysis']), ('done', cached)])
+    
+    job = summary_jobs.get(doc_id) if summary_jobs else None
+    if job is not None and job.status != 'failed':
+        print(f"Joining background summary for doc_id: {doc_id} ({job.status})")
+        return job.follow(timeout=config.SUMMARY_WAIT_TIMEOUT)
+    
+    content = load_summary_content(doc_id)
+    if content is None:
+        return None
+    return summary_events(content, cache_key)
+
+@app.route("/get_summary", methods=["POST"])
+def get_summary():
+    try:
+        data = request.get_json()
+        doc_id = data.get('doc_id')
         
-        return jsonify({
-            'summary': summary_content,
-            'comprehensive_analysis': comprehensive_content
+        if not doc_id:
+            return jsonify({'error': 'No document ID provided'}), 400
             
-        }), 200
+        print(f"Generating summary for doc_id: {doc_id}")  # Debug log
+        
+        events = document_summary_events(doc_id)
+        if events is None:
+            return jsonify({'summary': 'No content found in document'}), 200
+        
+        result = next(payload for kind, payload in events if kind == 'done')
+        return jsonify(result), 200
         
+    except LLMOverloaded as e:
+        print(f"Shed summary request: {str(e)}")
+        return jsonify({'error': BUSY_RESPONSE}), 503, {'Retry-After': '10'}
     except Exception as e:
         print(f"Error generating summary: {str(e)}")
         return jsonify({
             'error': 'Failed to generate summary'
         }), 500
 
+@app.route("/get_summary_stream", methods=["POST"])
+def get_summary_stream():
+    """Streaming variant of /get_summary: 'analysis' events carry the comprehensive analysis as it is
+    generated, then a final 'done' event both full texts (or an 'error' event)"""
+    data = request.get_json() or {}
+    doc_id = data.get('doc_id')
+    
+    if not doc_id:
+        return jsonify({'error': 'No document ID provided'}), 400
+    
+    print(f"Streaming summary for doc_id: {doc_id}")
+    
+    def generate_events():
+        try:
+            events = document_summary_events(doc_id)
+            if events is None:
+                yield sse_event('done', {'summary': 'No content found in document', 'comprehensive_analysis': ''})
+                return
+            
+            # The 🔹 sections reach the client as they are written
+            for kind, payload in events:
+                if kind == 'analysis':
+                    yield sse_event('analysis', {'text': payload})
+                elif kind == 'done':
+                    yield sse_event('done', payload)
+        except LLMOverloaded as e:
+            print(f"Shed summary stream: {str(e)}")
+            yield sse_event('error', {'error': BUSY_RESPONSE})
+        except Exception as e:
+            print(f"Error streaming summary: {str(e)}")
+            yield sse_event('error', {'error': 'Failed to generate summary'})
+    
+    return Response(generate_events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route("/summary_status/<doc_id>", methods=["GET"])
+def summary_status(doc_id):
+    """Progress of a document's background summary job"""
+    job = summary_jobs.get(doc_id) if summary_jobs else None
+    if job is None:
+        return jsonify({'doc_id': doc_id, 'status': 'none'}), 404
+    return jsonify(job.describe()), 200
+
 @app.route('/speech_to_text', methods=['POST'])
 def speech_to_text():
     try:
@@ -666,7 +933,7 @@ def speech_to_text():
             }
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = get_http_client().post(url, headers=headers, json=data)
         response_data = response.json()
 
         if "results" in response_data:
@@ -762,6 +1029,26 @@ def get_random_tips():
             'error': str(e)
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose per-stage timings of the chat pipeline and cache counters"""
+    return jsonify({
+        'pipeline': chat_pipeline.stats.snapshot(),
+        'embedding_cache': embeddings.stats() if hasattr(embeddings, 'stats') else None,
+        'embedding_batcher': embedding_batcher.stats() if hasattr(embedding_batcher, 'stats') else None,
+        'answer_cache': answer_cache.stats() if answer_cache else None,
+        'topic_gate': topic_gate.stats() if topic_gate else None,
+        'reranker': chat_pipeline.reranker.stats() if chat_pipeline.reranker else None,
+        'session_shards': session_shards.stats() if session_shards else None,
+        'summary_jobs': summary_jobs.stats() if summary_jobs else None,
+        'summary_cache': summary_cache.stats() if summary_cache else None,
+        'llm_single_flight': llm_flight.stats(),
+        'prompt_budget': prompt_assembler.stats(),
+        'llm_governor': get_llm_governor().stats() if get_llm_governor() else None,
+        'llm_deadline': llm_deadline_stats.snapshot(),
+        'http': get_http_client().stats()
+    })
+
 # Optional: Route to start the Flask app as a subprocess
 @app.route('/start-app')
 def start_app():
@@ -866,7 +1153,10 @@ def send_mailjet_email(email, medicine):
     }
 
     print(f"📤 Sending reminder to {email}...")
-    response = requests.post(url, auth=(MAILJET_API_KEY, MAILJET_SECRET_KEY), headers=headers, json=payload)
+    # Never retried: a 5xx or a connection dropped after the request went out may still have
+    # queued the message, and a second attempt would deliver the reminder twice
+    response = get_http_client().post(url, auth=(MAILJET_API_KEY, MAILJET_SECRET_KEY), headers=headers,
+                                      json=payload, retries=0)
 
     try:
         response_data = response.json()
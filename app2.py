@@ -15,12 +15,11 @@ from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
 # from langchain.chat_models import ChatOpenAI  # Use ChatOpenAI with Together API
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
-from src.helper import download_hugging_face_embeddings
+from src.helper import download_hugging_face_embeddings, load_vector_store
 from src.prompt import get_system_prompt, customize_response
 from src.database import get_user_health, create_user, verify_user, init_db
 
@@ -38,18 +37,16 @@ PINECONE_API_KEY = os.environ.get('PINECONE_API_KEY')
 TOGETHER_API_KEY = os.environ.get('TOGETHER_API_KEY')
 
 # Ensure keys are available for libraries
-os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
+if PINECONE_API_KEY:  # Not needed when running on the local vector index
+    os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 os.environ["TOGETHER_API_KEY"] = TOGETHER_API_KEY
 
 # Load embeddings
 embeddings = download_hugging_face_embeddings()
 
-# Initialize Pinecone index
+# Initialize vector store (Pinecone by default, local index when VECTOR_STORE_BACKEND=local)
 index_name = "medicalbot-try"
-docsearch = PineconeVectorStore.from_existing_index(
-    index_name=index_name,
-    embedding=embeddings
-)
+docsearch = load_vector_store(embeddings, index_name)
 
 # Create retriever
 retriever = docsearch.as_retriever(search_type="similarity", search_kwargs={"k": 5})
@@ -0,0 +1,48 @@
+import argparse
+import time
+import threading
+from src.helper import download_hugging_face_embeddings
+from src.embedding_batcher import BatchingEmbeddings
+
+
+# Query-embedding throughput with and without micro-batching at several client concurrencies
+parser = argparse.ArgumentParser(description="Benchmark the embedding micro-batcher")
+parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 8, 32])
+parser.add_argument("--requests", type=int, default=20, help="queries issued by each client")
+parser.add_argument("--max-batch-size", type=int, default=32)
+parser.add_argument("--max-wait-ms", type=float, default=2.0)
+args = parser.parse_args()
+
+QUESTIONS = [
+    "what are symptoms of diabetes", "how is high blood pressure treated", "what does a high WBC count mean",
+    "side effects of metformin", "is HbA1c of 7.2 dangerous", "how long does the flu last",
+    "what causes migraine headaches", "can asthma be cured", "normal platelet count range",
+    "what is a good cholesterol level",
+]
+
+base = download_hugging_face_embeddings()
+base.embed_query("warm up")
+
+
+def run(embedder, clients):
+    def client(offset):
+        for i in range(args.requests):
+            # Unique text per call so nothing is answered by a cache
+            embedder.embed_query(f"{QUESTIONS[(offset + i) % len(QUESTIONS)]} ({offset}-{i})")
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * args.requests / (time.perf_counter() - start)
+
+
+print(f"{'clients':>8}{'direct q/s':>12}{'batched q/s':>13}{'speedup':>9}{'mean batch':>12}")
+for clients in args.clients:
+    batcher = BatchingEmbeddings(base, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    direct = run(base, clients)
+    batched = run(batcher, clients)
+    print(f"{clients:>8}{direct:>12.1f}{batched:>13.1f}{batched / direct:>8.2f}x"
+          f"{batcher.stats()['mean_batch_size']:>12.2f}")
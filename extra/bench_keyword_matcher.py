@@ -0,0 +1,44 @@
+import random
+import timeit
+from src.keyword_matcher import KeywordMatcher
+from src.keywords import MEDICAL_CONTENT_TERMS, MEDICAL_KEYWORDS
+
+# Old per-keyword scans vs the precompiled single-pass matcher, on chunk sizes used by
+# text_split (500 chars) and process_pdf (1000 chars). Run from the repo root.
+
+with open("general_help.txt") as f:
+    prose = " ".join(line.split(".", 1)[-1].strip() for line in f if line.strip())
+filler = ("The report lists reference ranges for each value alongside the measured result and the date "
+          "of collection. Values outside the range are flagged for review by the care team. ")
+random.seed(0)
+
+
+def chunks(size, count=300):
+    # Mix real health tips with report boilerplate, like uploaded lab PDFs
+    corpus = prose + " " + filler * 20
+    return [corpus[i:i + size] for i in (random.randrange(0, len(corpus) - size) for _ in range(count))]
+
+
+def compare(label, keywords, texts, number=20):
+    matcher = KeywordMatcher(keywords)
+    old = lambda: [any(k in text.lower() for k in keywords) for text in texts]
+    new = lambda: [matcher.contains_any(text) for text in texts]
+    old_us = timeit.timeit(old, number=number) / (number * len(texts)) * 1e6
+    new_us = timeit.timeit(new, number=number) / (number * len(texts)) * 1e6
+    # Word-start matching only ever drops hits that were inside another word
+    dropped = sum(o and not n for o, n in zip(old(), new()))
+    print(f"{label:<34}{old_us:>10.2f}{new_us:>10.2f}{old_us / new_us:>9.1f}x{dropped:>9}")
+
+
+QUERIES = [
+    "what are symptoms of diabetes", "how do I lower my cholesterol", "what is the capital of france",
+    "recommend a good movie for tonight", "my HbA1c is 7.2, is that bad?", "tell me a joke about cats",
+    "is 500mg of paracetamol safe for kids", "best way to learn python", "why does my back hurt after running",
+]
+
+print(f"{'scan':<34}{'old us':>10}{'new us':>10}{'speedup':>10}{'dropped':>9}")
+compare("is_medical_query (queries)", MEDICAL_KEYWORDS, QUERIES * 30)
+for size in (500, 1000):
+    compare(f"chunk gate ({size}-char chunks)", MEDICAL_CONTENT_TERMS, chunks(size))
+    compare(f"query keywords on {size}-char chunks", MEDICAL_KEYWORDS, chunks(size))
+compare("customize_response (answers)", ["fever", " headache", "fatigue", "nausea"], chunks(400))
@@ -0,0 +1,72 @@
+import argparse
+import time
+import numpy as np
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from src.helper import download_hugging_face_embeddings
+from src.mmr import mmr_select
+from src import config
+
+
+# Prompt tokens spent on text that is already in the prompt (the 200-char overlap
+# between neighbouring chunks, repeated passages) for plain top-k vs MMR top-k,
+# plus the cost of the selection itself next to langchain's MMR.
+parser = argparse.ArgumentParser(description="Benchmark MMR diversification of retrieved chunks")
+parser.add_argument("pdf", help="a lab report or other PDF, split the way /upload splits it")
+parser.add_argument("--queries", nargs="+", default=[
+    "What do my blood test results mean?", "Is my cholesterol level normal?",
+    "What does a high white blood cell count indicate?", "Summarize the abnormal values in this report",
+])
+parser.add_argument("--k", type=int, default=config.RETRIEVAL_K)
+parser.add_argument("--fetch-k", type=int, default=config.MMR_FETCH_K)
+parser.add_argument("--lambdas", type=float, nargs="+", default=[0.5, 0.7, 0.85])
+args = parser.parse_args()
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+chunks = splitter.split_documents(PyPDFLoader(args.pdf).load())
+embeddings = download_hugging_face_embeddings()
+chunk_vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+print(f"{len(chunks)} chunks, {len(args.queries)} queries, k={args.k} of fetch_k={args.fetch_k}\n")
+
+
+def redundant_tokens(selected):
+    """Approximate tokens (4 chars each) sent, and how many repeat text already sent in another selected chunk"""
+    covered = {}
+    sent = 0
+    for i in selected:
+        chunk = chunks[i]
+        page, start = chunk.metadata.get('page'), chunk.metadata['start_index']
+        spans = covered.setdefault(page, set())
+        spans.update(range(start, start + len(chunk.page_content)))
+        sent += len(chunk.page_content)
+    unique = sum(len(spans) for spans in covered.values())
+    return sent // 4, (sent - unique) // 4
+
+
+print(f"{'selection':<14}{'tokens sent':>12}{'redundant':>11}{'unique':>9}")
+results = {}
+for query in args.queries:
+    q = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+    pool = np.argsort(-(chunk_vectors @ q))[:args.fetch_k]
+    results.setdefault("top-k", []).append(redundant_tokens(pool[:args.k]))
+    for lambda_mult in args.lambdas:
+        picked = pool[mmr_select(q, chunk_vectors[pool], args.k, lambda_mult)]
+        results.setdefault(f"mmr {lambda_mult}", []).append(redundant_tokens(picked))
+
+for name, rows in results.items():
+    sent = sum(s for s, _ in rows) / len(rows)
+    redundant = sum(r for _, r in rows) / len(rows)
+    print(f"{name:<14}{sent:>12.0f}{redundant:>11.0f}{sent - redundant:>9.0f}")
+
+# Selection cost on a pool of fetch_k candidates
+print()
+rng = np.random.default_rng(0)
+q, pool = chunk_vectors[0], chunk_vectors[rng.integers(0, len(chunk_vectors), args.fetch_k)]
+for name, fn in (("src.mmr", lambda: mmr_select(q, pool, args.k, 0.7)),
+                 ("langchain", lambda: maximal_marginal_relevance(q, pool, 0.7, args.k))):
+    start = time.perf_counter()
+    for _ in range(1000):
+        fn()
+    print(f"{name:<10} {(time.perf_counter() - start):.3f} ms per selection")
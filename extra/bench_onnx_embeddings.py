@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+
+# Cold start, peak RSS and per-query latency of the torch vs ONNX embedding backends.
+# Each backend runs in a fresh interpreter so imports and memory are measured from zero.
+parser = argparse.ArgumentParser(description="Benchmark torch vs ONNX embeddings")
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--child", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+QUERY = "What does a hemoglobin of 10.1 g/dL and a high WBC count mean?"
+
+if args.child:
+    start = time.perf_counter()
+    if args.child == "onnx":
+        from src.onnx_embeddings import load_onnx_embeddings
+        embeddings = load_onnx_embeddings()
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embeddings.embed_query(QUERY)
+    cold_start = time.perf_counter() - start
+
+    latencies = []
+    for i in range(args.queries):
+        t = time.perf_counter()
+        embeddings.embed_query(f"{QUERY} #{i}")
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+    print(json.dumps({
+        "cold_start_s": cold_start,
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+    }))
+    sys.exit(0)
+
+print(f"{'backend':<8}{'cold start':>12}{'peak RSS':>12}{'p50':>10}{'p95':>10}")
+for backend in ("torch", "onnx"):
+    output = subprocess.run(
+        [sys.executable, "-m", "extra.bench_onnx_embeddings", "--child", backend, "--queries", str(args.queries)],
+        capture_output=True, text=True, env=dict(os.environ, TOKENIZERS_PARALLELISM="false"),
+    )
+    if output.returncode != 0:
+        print(f"{backend:<8} failed: {output.stderr.strip().splitlines()[-1] if output.stderr else 'unknown'}")
+        continue
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    print(f"{backend:<8}{result['cold_start_s']:>11.2f}s{result['rss_mib']:>9.0f} MiB"
+          f"{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms")
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sqlite3
+import time
+import numpy as np
+from src.local_store import normalize_rows
+from src.quantization import create_quantizer
+from src import config
+
+
+# Recall@k of quantized search (ADC + exact re-rank) against exact search,
+# plus the resident memory each storage format needs per million chunks.
+parser = argparse.ArgumentParser(description="Benchmark quantized vector storage")
+parser.add_argument("--vectors", type=int, default=20000, help="corpus size (synthetic or sampled from the index)")
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--k", type=int, default=5)
+parser.add_argument("--rerank", type=int, nargs="+", default=[config.QUANT_RERANK])
+parser.add_argument("--from-index", action="store_true", help="sample vectors from LOCAL_INDEX_PATH")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+if args.from_index:
+    # Layout as recorded by the index itself, not the current environment
+    conn = sqlite3.connect(os.path.join(config.LOCAL_INDEX_PATH, "chunks.sqlite"))
+    try:
+        info = dict(conn.execute("SELECT key, value FROM index_info").fetchall())
+        live = np.array([row for row, in conn.execute("SELECT row FROM chunks WHERE deleted = 0 ORDER BY row")])
+        count = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    finally:
+        conn.close()
+    stored = np.memmap(os.path.join(config.LOCAL_INDEX_PATH, "vectors.bin"), dtype=np.dtype(info['dtype']),
+                       mode="r", shape=(count, int(info['dimension'])))
+    rows = np.sort(rng.choice(live, min(len(live), args.vectors + args.queries), replace=False))
+    sample = normalize_rows(stored[rows])
+    rng.shuffle(sample)
+    corpus, queries = sample[:-args.queries], sample[-args.queries:]
+else:
+    # Clustered synthetic 384-dim data shaped like MiniLM sentence embeddings
+    centers = rng.normal(size=(max(8, args.vectors // 100), 384))
+    pick = lambda n: centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, 384))
+    corpus, queries = normalize_rows(pick(args.vectors)), normalize_rows(pick(args.queries))
+
+exact = [set(np.argsort(-(corpus @ q))[:args.k]) for q in queries]
+print(f"{len(corpus)} vectors, {len(queries)} queries, recall@{args.k} vs exact float32 search\n")
+print(f"{'format':<10}{'bytes/vec':>10}{'MiB per 1M':>12}{'rerank':>8}{'recall':>8}{'ms/query':>10}")
+
+def report(name, code_bytes, rerank, hits, elapsed):
+    print(f"{name:<10}{code_bytes:>10}{code_bytes * 1e6 / 2**20:>12.0f}{rerank:>8}"
+          f"{hits / (args.k * len(queries)):>8.3f}{elapsed * 1000 / len(queries):>10.2f}")
+
+for name, dtype in (("float32", np.float32), ("float16", np.float16)):
+    stored = corpus.astype(dtype)
+    start, hits = time.perf_counter(), 0
+    for q, expected in zip(queries, exact):
+        hits += len(set(np.argsort(-(stored.astype(np.float32) @ q))[:args.k]) & expected)
+    report(name, corpus.shape[1] * np.dtype(dtype).itemsize, "-", hits, time.perf_counter() - start)
+
+for kind in ("sq8", "pq"):
+    # PQ needs a subvector count that divides the embedding dimension
+    for subvectors in ((config.PQ_SUBVECTORS,) if kind == "sq8"
+                       else [m for m in (24, 48, 96) if corpus.shape[1] % m == 0]):
+        quantizer = create_quantizer(kind, pq_subvectors=subvectors)
+        quantizer.train(corpus[rng.choice(len(corpus), min(len(corpus), 50000), replace=False)])
+        codes = quantizer.encode(corpus)
+        for rerank in args.rerank:
+            start, hits = time.perf_counter(), 0
+            for q, expected in zip(queries, exact):
+                approx = quantizer.scores(q, codes)
+                candidates = np.argpartition(-approx, rerank - 1)[:rerank]
+                best = candidates[np.argsort(-(corpus[candidates] @ q))[:args.k]]
+                hits += len(set(best) & expected)
+            label = kind if kind == "sq8" else f"pq{subvectors}"
+            report(label, quantizer.code_size, rerank, hits, time.perf_counter() - start)
@@ -0,0 +1,47 @@
+import argparse
+import time
+import numpy as np
+from src.helper import download_hugging_face_embeddings
+from src.local_store import LocalVectorStore
+from src import config
+
+
+# (Re)train the IVF index of the local vector store and report recall/latency per nprobe
+parser = argparse.ArgumentParser(description="Build the IVF index for the local vector store")
+parser.add_argument("--nlist", type=int, default=config.IVF_NLIST, help="number of k-means lists (default 4*sqrt(n))")
+parser.add_argument("--sample-size", type=int, default=None, help="vectors used to train the centroids")
+parser.add_argument("--iterations", type=int, default=15)
+parser.add_argument("--queries", type=int, default=200, help="stored vectors reused as probe queries")
+parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+parser.add_argument("--k", type=int, default=5)
+args = parser.parse_args()
+
+embeddings = download_hugging_face_embeddings()
+store = LocalVectorStore(embeddings, config.LOCAL_INDEX_PATH, ann_min_rows=0)
+print(f"Local index at {config.LOCAL_INDEX_PATH} holds {len(store)} chunks")
+
+start = time.perf_counter()
+store.build_ann(nlist=args.nlist, sample_size=args.sample_size, iterations=args.iterations)
+print(f"✅ Trained in {time.perf_counter() - start:.1f}s")
+
+rng = np.random.default_rng(0)
+alive_rows = np.flatnonzero(store._alive)
+probe_rows = rng.choice(alive_rows, min(args.queries, len(alive_rows)), replace=False)
+queries = np.asarray(store._vectors[np.sort(probe_rows)], dtype=np.float32)
+
+exact_ids, exact_ms = [], 0.0
+for query in queries:
+    t = time.perf_counter()
+    exact_ids.append({doc.id for doc in store.similarity_search_by_vector(query, k=args.k, exact=True)})
+    exact_ms += (time.perf_counter() - t) * 1000
+
+print(f"exact scan: {exact_ms / len(queries):.2f} ms/query")
+for nprobe in args.nprobe:
+    hits, ann_ms = 0, 0.0
+    for query, expected in zip(queries, exact_ids):
+        t = time.perf_counter()
+        found = {doc.id for doc in store.similarity_search_by_vector(query, k=args.k, nprobe=nprobe)}
+        ann_ms += (time.perf_counter() - t) * 1000
+        hits += len(found & expected)
+    print(f"nprobe={nprobe:<3} recall@{args.k}={hits / (args.k * len(queries)):.3f} "
+          f"{ann_ms / len(queries):.2f} ms/query")
@@ -0,0 +1,78 @@
+import argparse
+import json
+import numpy as np
+from src.topic_gate import TopicGate, fit_logistic, fit_centroids
+from src import config
+
+
+# Train the embedding topic gate on topic_examples.json, pick the rejection threshold from
+# out-of-fold scores and print a precision/recall report. "Positive" = off-topic (rejected).
+
+def out_of_fold_scores(X, y, kind, folds=5, seed=0):
+    order = np.random.default_rng(seed).permutation(len(y))
+    scores = np.zeros(len(y), dtype=np.float32)
+    for fold in range(folds):
+        held_out = order[fold::folds]
+        train = np.setdiff1d(order, held_out)
+        weights, bias = (fit_logistic if kind == "logistic" else fit_centroids)(X[train], y[train])
+        scores[held_out] = [TopicGate(weights, bias, 0.0, kind).score(x) for x in X[held_out]]
+    return scores
+
+
+def precision_recall(scores, y, threshold):
+    rejected = scores >= threshold
+    true_positive = int((rejected & (y == 1)).sum())
+    precision = true_positive / max(1, int(rejected.sum()))
+    recall = true_positive / max(1, int((y == 1).sum()))
+    return precision, recall
+
+
+def choose_threshold(scores, y, target_precision):
+    """Lowest threshold (highest recall) whose rejections are at least target_precision correct"""
+    best = None
+    for threshold in np.unique(scores)[::-1]:
+        precision, recall = precision_recall(scores, y, threshold)
+        if precision >= target_precision:
+            best = (threshold, precision, recall)
+    if best is None:
+        threshold = float(scores.max())
+        best = (threshold,) + precision_recall(scores, y, threshold)
+    return tuple(float(value) for value in best)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the embedding topic gate")
+    parser.add_argument("--examples", default="topic_examples.json")
+    parser.add_argument("--model", choices=["logistic", "centroid"], default="logistic")
+    parser.add_argument("--target-precision", type=float, default=0.97,
+                        help="share of rejected queries that must really be off-topic")
+    parser.add_argument("--output", default=config.TOPIC_GATE_PATH)
+    args = parser.parse_args()
+
+    from src.helper import download_hugging_face_embeddings
+
+    with open(args.examples) as f:
+        examples = json.load(f)
+    texts = examples["medical"] + examples["off_topic"]
+    y = np.array([0] * len(examples["medical"]) + [1] * len(examples["off_topic"]))
+    X = np.array(download_hugging_face_embeddings().embed_documents(texts), dtype=np.float32)
+    print(f"Embedded {len(examples['medical'])} medical and {len(examples['off_topic'])} off-topic examples")
+
+    scores = out_of_fold_scores(X, y, args.model)
+    threshold, precision, recall = choose_threshold(scores, y, args.target_precision)
+
+    print(f"\n{'threshold':>10}{'precision':>11}{'recall':>8}")
+    for candidate in sorted(set(np.quantile(scores, [0.3, 0.4, 0.5, 0.6, 0.7]).round(4)) | {round(threshold, 4)}):
+        p, r = precision_recall(scores, y, candidate)
+        marker = "  <- chosen" if candidate == round(threshold, 4) else ""
+        print(f"{candidate:>10.4f}{p:>11.3f}{r:>8.3f}{marker}")
+
+    print(f"\nOut-of-fold at threshold {threshold:.4f}: precision={precision:.3f} recall={recall:.3f}")
+    wrongly_rejected = [texts[i] for i in np.flatnonzero((scores >= threshold) & (y == 0))]
+    missed = [texts[i] for i in np.flatnonzero((scores < threshold) & (y == 1))]
+    print(f"Medical questions that would be rejected: {wrongly_rejected or 'none'}")
+    print(f"Off-topic questions let through: {missed or 'none'}")
+
+    weights, bias = (fit_logistic if args.model == "logistic" else fit_centroids)(X, y)
+    TopicGate(weights, bias, threshold, args.model).save(args.output)
+    print(f"✅ Saved topic gate to {args.output}")
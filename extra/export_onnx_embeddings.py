@@ -0,0 +1,66 @@
+import argparse
+import os
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from src.onnx_embeddings import OnnxMiniLMEmbeddings
+from src import config
+
+
+# Export all-MiniLM-L6-v2 to ONNX, quantize it to int8 and check it against the torch embeddings
+parser = argparse.ArgumentParser(description="Export the MiniLM embedder to int8 ONNX")
+parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+parser.add_argument("--output", default=config.ONNX_MODEL_DIR)
+parser.add_argument("--tolerance", type=float, default=0.99, help="minimum cosine similarity vs torch")
+parser.add_argument("--keep-fp32", action="store_true", help="keep model.onnx next to the int8 model")
+args = parser.parse_args()
+
+os.makedirs(args.output, exist_ok=True)
+tokenizer = AutoTokenizer.from_pretrained(args.model)
+model = AutoModel.from_pretrained(args.model).eval()
+tokenizer.save_pretrained(args.output)  # writes tokenizer.json for the fast tokenizer
+
+fp32_path = os.path.join(args.output, "model.onnx")
+sample = tokenizer(["export sample"], return_tensors="pt")
+dynamic = {0: "batch", 1: "sequence"}
+with torch.no_grad():
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "token_type_ids": dynamic,
+                      "last_hidden_state": dynamic},
+        opset_version=14,
+    )
+print(f"✅ Exported {fp32_path}")
+
+int8_path = os.path.join(args.output, "model_quantized.onnx")
+quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+print(f"✅ Quantized to {int8_path} ({os.path.getsize(int8_path) / 2**20:.1f} MiB, "
+      f"fp32 was {os.path.getsize(fp32_path) / 2**20:.1f} MiB)")
+if not args.keep_fp32:
+    os.remove(fp32_path)
+
+# Vectors must stay compatible with the index built from the torch model
+from langchain_huggingface import HuggingFaceEmbeddings
+
+SENTENCES = [
+    "What are the symptoms of diabetes?",
+    "My WBC count is 11,200 cells/mcL and HbA1c is 7.2%, is that high?",
+    "Metformin 500 mg twice daily side effects",
+    "Hemoglobin 10.1 g/dL, platelets 150,000, what does this mean for anemia?",
+    "How do I lower my blood pressure without medication?",
+    "Chest pain radiating to the left arm and shortness of breath",
+    "",
+    "Paracetamol dosage for children under 12",
+]
+torch_vectors = np.array(HuggingFaceEmbeddings(model_name=args.model).embed_documents(SENTENCES))
+onnx_vectors = np.array(OnnxMiniLMEmbeddings(args.output).embed_documents(SENTENCES))
+similarity = (torch_vectors * onnx_vectors).sum(axis=1)
+print(f"Cosine similarity vs torch: min={similarity.min():.4f} mean={similarity.mean():.4f}")
+if similarity.min() < args.tolerance:
+    raise SystemExit(f"❌ ONNX embeddings drift beyond tolerance {args.tolerance}")
+print("✅ ONNX embeddings are compatible with the existing index")
@@ -0,0 +1,28 @@
+import argparse
+import time
+from src.helper import download_hugging_face_embeddings
+from src.local_store import LocalVectorStore
+from src.quantization import create_quantizer
+from src import config
+
+
+# Convert an existing local index to quantized (sq8 / pq) in-memory storage.
+# Full-precision vectors stay on disk and are only read to re-rank the best candidates.
+parser = argparse.ArgumentParser(description="Quantize the local vector index")
+parser.add_argument("--kind", choices=["sq8", "pq"], default=config.LOCAL_INDEX_QUANTIZATION)
+parser.add_argument("--subvectors", type=int, default=config.PQ_SUBVECTORS, help="PQ code bytes per vector")
+parser.add_argument("--sample-size", type=int, default=100000, help="vectors used to train the quantizer")
+args = parser.parse_args()
+
+embeddings = download_hugging_face_embeddings()
+store = LocalVectorStore(embeddings, config.LOCAL_INDEX_PATH)
+print(f"Local index at {config.LOCAL_INDEX_PATH} holds {len(store)} chunks")
+if not len(store):
+    raise SystemExit("❌ Nothing to quantize, build the index first (extra/store_index_local.py)")
+
+before = store.memory_bytes()
+start = time.perf_counter()
+store.quantize(create_quantizer(args.kind, pq_subvectors=args.subvectors), sample_size=args.sample_size)
+after = store.memory_bytes()
+print(f"✅ Quantized to {args.kind} in {time.perf_counter() - start:.1f}s")
+print(f"Resident vector memory: {before / 2**20:.1f} MiB -> {after / 2**20:.1f} MiB")
@@ -2,6 +2,8 @@ from src.helper import load_pdf_file, text_split, download_hugging_face_embeddin
 from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
+from src.keyword_index import KeywordIndex
+from src import config
 from dotenv import load_dotenv
 import os
 
@@ -49,5 +51,9 @@ else:
         print("Uploading to Pinecone...")
         docsearch.add_documents(documents=text_chunks)
         print("✅ Upload completed!")
+
+        # Same chunks go into the local BM25 index used for hybrid retrieval
+        KeywordIndex(config.KEYWORD_INDEX_PATH).add_documents(text_chunks)
+        print("✅ Keyword index updated!")
     else:
         print("❌ No text chunks created. Check 'text_split()' function.")
\ No newline at end of file
@@ -0,0 +1,29 @@
+from src.helper import load_pdf_file, text_split, download_hugging_face_embeddings
+from src.local_store import LocalVectorStore
+from src.keyword_index import KeywordIndex
+from src import config
+
+
+# Build the offline index used when VECTOR_STORE_BACKEND=local
+embeddings = download_hugging_face_embeddings()
+docsearch = LocalVectorStore(embeddings, config.LOCAL_INDEX_PATH, dtype=config.LOCAL_INDEX_DTYPE)
+print(f"Local index at {config.LOCAL_INDEX_PATH} currently holds {len(docsearch)} chunks")
+
+# Load PDF data
+raw_text = load_pdf_file("NewData/")
+if not raw_text:
+    print("❌ No text found! Check your 'NewData/' folder and 'load_pdf_file()' function.")
+else:
+    # Split text into chunks
+    text_chunks = text_split(raw_text)
+    print(f"✅ Total Chunks Created: {len(text_chunks)}")
+
+    batch_size = 256
+    for i in range(0, len(text_chunks), batch_size):
+        docsearch.add_documents(documents=text_chunks[i:i + batch_size])
+        print(f"Added batch {i//batch_size + 1} ({min(i + batch_size, len(text_chunks))}/{len(text_chunks)})")
+    print(f"✅ Local index now holds {len(docsearch)} chunks")
+
+    # Same chunks go into the BM25 index used for hybrid retrieval
+    KeywordIndex(config.KEYWORD_INDEX_PATH).add_documents(text_chunks)
+    print("✅ Keyword index updated!")
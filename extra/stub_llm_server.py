@@ -0,0 +1,167 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Stand-in for the Together chat-completions API, for load tests that should not spend credits:
+#   python -m extra.stub_llm_server --port 8001 --latency lognormal:0.8,0.6 --tokens-per-sec 40 --error-rate 0.02
+#   LLM_API_BASE=http://127.0.0.1:8001/v1 gunicorn -c gunicorn_config.py app:app
+parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server with configurable latency and errors")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8001)
+parser.add_argument("--latency", default="lognormal:0.8,0.5",
+                    help="time to first token in seconds: fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exp:MEAN")
+parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="generation speed after the first token")
+parser.add_argument("--completion-tokens", type=int, default=120, help="answer length (capped by the request's max_tokens)")
+parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error status")
+parser.add_argument("--error-status", type=int, nargs="+", default=[429, 503])
+parser.add_argument("--stall-rate", type=float, default=0.0,
+                    help="fraction of requests that hang for --stall-seconds before answering (exercises client deadlines)")
+parser.add_argument("--stall-seconds", type=float, default=120.0)
+parser.add_argument("--seed", type=int, default=None, help="seed the latency and error draws for repeatable runs")
+args = parser.parse_args()
+
+# Medical wording so the app's medical-content checks accept the answers
+WORDS = ("The patient should discuss these symptoms with a doctor, since the diagnosis and treatment depend on "
+         "their medical history. Common therapy options include medicine, rest and follow-up tests at the "
+         "hospital to monitor the disease and keep track of overall health.").split()
+
+rng = random.Random(args.seed)
+rng_lock = threading.Lock()
+stats = {'requests': 0, 'streamed': 0, 'errors': 0, 'stalls': 0, 'completion_tokens': 0}
+stats_lock = threading.Lock()
+
+
+def parse_latency(spec):
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda r: values[0]
+    if kind == "uniform":
+        return lambda r: r.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda r: r.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda r: r.expovariate(1.0 / values[0])
+    raise SystemExit(f"Unknown latency distribution: {spec}")
+
+
+first_token_latency = parse_latency(args.latency)
+
+
+def draw():
+    """Outcome of one request: (error status or None, stall seconds, time to first token)"""
+    with rng_lock:
+        error = rng.choice(args.error_status) if rng.random() < args.error_rate else None
+        stall = args.stall_seconds if rng.random() < args.stall_rate else 0.0
+        return error, stall, max(0.0, first_token_latency(rng))
+
+
+def count(**increments):
+    with stats_lock:
+        for name, n in increments.items():
+            stats[name] += n
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *log_args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with stats_lock:
+                return self._json(200, dict(stats))
+        if self.path.rstrip("/") == "/v1/models":
+            return self._json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        self._json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            return self._json(404, {"error": {"message": "Not found"}})
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = request.get("model", "stub")
+        n_tokens = min(args.completion_tokens, request.get("max_tokens") or args.completion_tokens)
+        tokens = [WORDS[i % len(WORDS)] + " " for i in range(n_tokens)]
+        error, stall, ttft = draw()
+        count(requests=1)
+
+        time.sleep(stall + ttft)
+        count(stalls=int(stall > 0))
+        if error:
+            count(errors=1)
+            return self._json(error, {"error": {"message": f"Injected error {error}", "type": "stub_error"}})
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+        count(completion_tokens=n_tokens)
+        if not request.get("stream"):
+            time.sleep(n_tokens / args.tokens_per_sec)
+            return self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                          "total_tokens": prompt_tokens + n_tokens},
+            })
+
+        count(streamed=1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(1.0 / args.tokens_per_sec)
+                event({"content": token})
+            event({}, finish_reason="stop")
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (deadline, hedge loser); nothing left to send
+            self.close_connection = True
+
+
+server = ThreadingHTTPServer((args.host, args.port), Handler)
+server.daemon_threads = True
+print(f"Stub LLM listening on http://{args.host}:{args.port}/v1 "
+      f"(latency {args.latency}, {args.tokens_per_sec:g} tok/s, error rate {args.error_rate:g})")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
@@ -7,7 +7,7 @@ backlog = 2048
 # Worker processes
 workers = 1  # Use only one worker to reduce memory usage
 worker_class = "gthread"  # Use threaded worker
-threads = 2  # Number of threads per worker
+threads = 8  # Number of threads per worker; LLM calls are capped separately (LLM_MAX_CONCURRENT)
 worker_connections = 1000
 timeout = 120
 keepalive = 2
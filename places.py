@@ -1,10 +1,19 @@
 import sqlite3
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from html import escape
 from typing import List, Optional
 import googlemaps
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from src.http_client import get_http_client
+from src.single_flight import llm_flight, request_key
+from src.llm_governor import FORMATTING, llm_slot
+from src import config
 
 # Load environment variables
 load_dotenv()
@@ -32,6 +41,131 @@ class Hospital:
     distance: float
     place_id: str
 
+def render_recommendations(disease_name: str, location: str, specialist: Specialist,
+                           hospitals: List[Hospital]) -> str:
+    """Render the specialist and hospital list as the HTML block shown in the chat"""
+    # Use HTML formatting to ensure proper spacing
+    parts = ["<div class='medical-help-result'>"]
+    parts.append(f"<h3>Medical Help for {escape(disease_name)}</h3>")
+    parts.append("<p>Based on your symptoms, you should consult a:</p>")
+    parts.append(f"<p class='specialist-name'><strong>{escape(specialist.name)}</strong></p>")
+    parts.append(f"<h4>Recommended Hospitals in {escape(location)}:</h4>")
+    parts.append("<div class='hospital-list'>")
+
+    for i, hospital in enumerate(hospitals, 1):
+        parts.append("<div class='hospital-item'>")
+        parts.append(f"<p class='hospital-number'>{i}. <strong>{escape(hospital.name)}</strong></p>")
+        parts.append(f"<p class='hospital-address'>📍 {escape(hospital.address)}</p>")
+        if hospital.rating > 0:
+            # Create stars based on the integer part of the rating
+            stars = "⭐" * int(hospital.rating)
+            parts.append(f"<p class='hospital-rating'>Rating: {stars} ({hospital.rating}/5)</p>")
+        else:
+            parts.append("<p class='hospital-rating'>Rating: Not available</p>")
+        parts.append("</div>")
+
+    parts.append("</div></div>")
+    return "".join(parts)
+
+
+class RecommendationFormatter:
+    """Optional LLM polish of rendered recommendations, off the request path.
+
+    Results are cached by (disease, specialist, location, hospital set); the
+    disease is part of the key because it is in the rendered heading. A request
+    that misses the cache gets the template straight away while the polished
+    version is generated in the background for the next identical request.
+    """
+
+    def __init__(self, max_entries=256, ttl=24 * 3600, workers=1):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.workers = workers
+        self._cache = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="places-format")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    @staticmethod
+    def key(disease_name, specialist_name, location, hospitals):
+        return (disease_name.strip().lower(), specialist_name, location.strip().lower(),
+                tuple(sorted(h.place_id for h in hospitals)))
+
+    def get(self, disease_name, specialist_name, location, hospitals, rendered):
+        """The cached polished version of ``rendered``, or ``rendered`` itself (scheduling the polish)"""
+        key = self.key(disease_name, specialist_name, location, hospitals)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                self._cache.move_to_end(key)
+                return entry[0]
+            if key not in self._pending:
+                self._pending.add(key)
+                self._executor().submit(self._format, key, rendered)
+        return rendered
+
+    def _format(self, key, rendered):
+        try:
+            formatted = format_with_llm(rendered)
+            if formatted:
+                with self._lock:
+                    self._cache[key] = (formatted, time.time())
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+def format_with_llm(rendered: str) -> Optional[str]:
+    """Ask Together to reword the rendered recommendations; None when the call fails"""
+    try:
+        TOGETHER_API_KEY = os.getenv('TOGETHER_API_KEY2')
+        
+        url = f"{config.LLM_API_BASE}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {TOGETHER_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        
+        prompt = f"""Please format this medical recommendation to be concise, clear, and user-friendly. 
+        Avoid using Markdown formatting like **bold**, __italic__, or backticks.
+        Keep the emojis and stars, maintain proper spacing that make it look good, and ensure it's easy to read: 
+        you can highlight the important points and make it more user-friendly.
+
+        {rendered}"""
+        
+        data = {
+            "model": "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+            "messages": [
+                {"role": "system", "content": "You are a medical information formatter. Format the given medical recommendations to be concise, clear, and user-friendly. Preserve the emojis and formatting."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2,
+            "max_tokens": 500
+        }
+        
+        # Identical concurrent requests share one API call, admitted behind chat and summaries
+        def call():
+            with llm_slot(FORMATTING):
+                return get_http_client().post(url, headers=headers, json=data, timeout=(3.05, 60))
+        response = llm_flight.do(request_key(url, data), call)
+        if response.status_code == 200:
+            return response.json()['choices'][0]['message']['content']
+        print(f"Together API error: {response.text}")
+    except Exception as e:
+        print(f"Error formatting with Together API: {str(e)}")
+    return None
+
+
 class MedicalPlacesSystem:
     def __init__(self):
         """Initialize the system with database and Google Maps client"""
@@ -45,6 +179,10 @@ class MedicalPlacesSystem:
         print(f"Google Maps API key loaded: {api_key[:10]}...")
         
         self.gmaps = googlemaps.Client(key=api_key)
+        self.formatter = RecommendationFormatter(
+            max_entries=config.PLACES_FORMAT_CACHE_SIZE,
+            ttl=config.PLACES_FORMAT_CACHE_TTL
+        ) if config.PLACES_LLM_FORMAT else None
         self.init_database()
 
     def init_database(self):
@@ -312,80 +450,14 @@ class MedicalPlacesSystem:
 
         print(f"Found {len(hospitals)} hospitals")
         
-        # Use HTML formatting to ensure proper spacing
-        initial_response = f"<div class='medical-help-result'>"
-        initial_response += f"<h3>Medical Help for {disease_name}</h3>"
-        initial_response += f"<p>Based on your symptoms, you should consult a:</p>"
-        initial_response += f"<p class='specialist-name'><strong>{specialist.name}</strong></p>"
-        initial_response += f"<h4>Recommended Hospitals in {location}:</h4>"
-        initial_response += f"<div class='hospital-list'>"
-
-        for i, hospital in enumerate(hospitals, 1):
-            initial_response += f"<div class='hospital-item'>"
-            initial_response += f"<p class='hospital-number'>{i}. <strong>{hospital.name}</strong></p>"
-            initial_response += f"<p class='hospital-address'>📍 {hospital.address}</p>"
-            if hospital.rating > 0:
-                # Create stars based on the integer part of the rating
-                stars = "⭐" * int(hospital.rating)
-                initial_response += f"<p class='hospital-rating'>Rating: {stars} ({hospital.rating}/5)</p>"
-            else:
-                initial_response += "<p class='hospital-rating'>Rating: Not available</p>"
-            initial_response += f"</div>"
-        
-        initial_response += f"</div></div>"
-
-        # Send to Together API for better formatting
-        try:
-            import requests
-            import os
-            from dotenv import load_dotenv
-            
-            load_dotenv()
-            TOGETHER_API_KEY = os.getenv('TOGETHER_API_KEY2')
-            
-            url = "https://api.together.xyz/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {TOGETHER_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            prompt = f"""Please format this medical recommendation to be concise, clear, and user-friendly. 
-            Avoid using Markdown formatting like **bold**, __italic__, or backticks.
-            Keep the emojis and stars, maintain proper spacing that make it look good, and ensure it's easy to read: 
-            you can highlight the important points and make it more user-friendly.
-
-            {initial_response}"""
-            
-            data = {
-                "model": "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-                "messages": [
-                    {"role": "system", "content": "You are a medical information formatter. Format the given medical recommendations to be concise, clear, and user-friendly. Preserve the emojis and formatting."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 500
-            }
-            
-            response = requests.post(url, headers=headers, json=data)
-            if response.status_code == 200:
-                formatted_response = response.json()['choices'][0]['message']['content']
-                return {
-                    "success": True,
-                    "response": formatted_response
-                }
-            else:
-                print(f"Together API error: {response.text}")
-                return {
-                    "success": True,
-                    "response": initial_response  # Fallback to original response
-                }
-                
-        except Exception as e:
-            print(f"Error formatting with Together API: {str(e)}")
-            return {
-                "success": True,
-                "response": initial_response  # Fallback to original response
-            }
+        # The template is the answer; the LLM polish (PLACES_LLM_FORMAT=1) is served once cached
+        response = render_recommendations(disease_name, location, specialist, hospitals)
+        if self.formatter:
+            response = self.formatter.get(disease_name, specialist.name, location, hospitals, response)
+        return {
+            "success": True,
+            "response": response
+        }
 
 # Usage Example
 if __name__ == "__main__":
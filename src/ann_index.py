@@ -0,0 +1,119 @@
+import os
+import numpy as np
+
+
+def train_kmeans(vectors, nlist, iterations=15, seed=0):
+    """Spherical k-means over L2-normalized vectors, returns (nlist, dim) unit centroids"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Reseed empty clusters with random points so every list stays usable
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file index (k-means coarse quantizer) over the rows of a LocalVectorStore.
+
+    Only row numbers are kept here; vectors stay in the store's memory map and
+    candidates from the ``nprobe`` closest lists are re-scored exactly there.
+    Deleted rows are filtered by the store's tombstone mask, so deletes cost
+    nothing here. Centroids and row assignments are persisted next to the store
+    so a worker restart reloads instead of retraining.
+    """
+
+    def __init__(self, path, nprobe=8):
+        self.nprobe = nprobe
+        self._centroids_path = os.path.join(path, 'ivf_centroids.npy')
+        self._assign_path = os.path.join(path, 'ivf_assign.bin')
+        self.centroids = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists = []
+        self._load()
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    @property
+    def nlist(self):
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def __len__(self):
+        return len(self._assign)
+
+    def _load(self):
+        if not os.path.exists(self._centroids_path):
+            return
+        self.centroids = np.load(self._centroids_path)
+        if os.path.exists(self._assign_path):
+            self._assign = np.fromfile(self._assign_path, dtype=np.int32)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        order = np.argsort(self._assign, kind='stable')
+        bounds = np.searchsorted(self._assign[order], np.arange(self.nlist + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(self.nlist)]
+
+    def _assign_rows(self, vectors, block=65536):
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block):
+            chunk = np.asarray(vectors[start:start + block], dtype=np.float32)
+            assign[start:start + block] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assign
+
+    def train(self, vectors, nlist=None, sample_size=None, iterations=15, seed=0):
+        """Train centroids on a sample of ``vectors`` and (re)assign every row"""
+        count = len(vectors)
+        nlist = nlist or max(1, min(count, int(4 * np.sqrt(count))))
+        sample_size = min(count, sample_size or nlist * 64)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, sample_size, replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        self.centroids = train_kmeans(sample, nlist, iterations=iterations, seed=seed)
+        np.save(self._centroids_path, self.centroids)
+        self._assign = self._assign_rows(vectors)
+        self._assign.tofile(self._assign_path)
+        self._rebuild_lists()
+
+    def add(self, vectors):
+        """Assign newly appended store rows to their nearest list"""
+        if not self.is_trained or not len(vectors):
+            return
+        start = len(self._assign)
+        assign = self._assign_rows(vectors)
+        with open(self._assign_path, 'ab') as f:
+            f.write(assign.tobytes())
+        self._assign = np.concatenate([self._assign, assign])
+        for list_id in np.unique(assign):
+            new_rows = start + np.flatnonzero(assign == list_id)
+            self._lists[list_id] = np.concatenate([self._lists[list_id], new_rows])
+
+    def sync(self, vectors):
+        """Assign rows the store has but this index has not seen (e.g. after a crash)"""
+        if self.is_trained and len(self._assign) < len(vectors):
+            self.add(vectors[len(self._assign):])
+
+    def compact(self, keep):
+        """Drop tombstoned rows, mirroring LocalVectorStore.compact renumbering"""
+        if not self.is_trained:
+            return
+        self._assign = self._assign[keep]
+        self._assign.tofile(self._assign_path)
+        self._rebuild_lists()
+
+    def candidates(self, query, nprobe=None):
+        """Row numbers in the ``nprobe`` lists closest to the (normalized) query"""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self._lists[i] for i in closest])
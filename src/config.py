@@ -0,0 +1,130 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before reading any setting below
+load_dotenv()
+
+# Vector store backend: "pinecone" (hosted) or "local" (in-process, memory-mapped)
+VECTOR_STORE_BACKEND = os.environ.get('VECTOR_STORE_BACKEND', 'pinecone').lower()
+PINECONE_INDEX_NAME = os.environ.get('PINECONE_INDEX_NAME', 'medicalbot-try')
+LOCAL_INDEX_PATH = os.environ.get('LOCAL_INDEX_PATH', 'local_index')
+LOCAL_INDEX_DTYPE = os.environ.get('LOCAL_INDEX_DTYPE')  # float32 (default) or float16, fixed when the index is created
+
+# Approximate search over the local index (IVF). Below ANN_MIN_ROWS chunks searches are exact.
+ANN_MIN_ROWS = int(os.environ.get('ANN_MIN_ROWS', '50000'))
+IVF_NLIST = int(os.environ.get('IVF_NLIST', '0')) or None  # 0 = 4 * sqrt(chunks)
+IVF_NPROBE = int(os.environ.get('IVF_NPROBE', '8'))  # more lists = better recall, slower search
+
+# Quantized storage for the local index ("sq8" or "pq"), applied by extra/quantize_index.py
+LOCAL_INDEX_QUANTIZATION = os.environ.get('LOCAL_INDEX_QUANTIZATION', 'pq')
+PQ_SUBVECTORS = int(os.environ.get('PQ_SUBVECTORS', '48'))  # 384 dims / 48 = 8 dims per code byte
+QUANT_RERANK = int(os.environ.get('QUANT_RERANK', '50'))  # candidates re-scored at full precision
+
+# Query-embedding cache: in-memory LRU entries (0 disables) and an opt-in SQLite tier ("" = memory only)
+# holding query hashes and vectors, bounded by entries and lifetime (s)
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '2048'))
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', '')
+EMBEDDING_CACHE_DISK_SIZE = int(os.environ.get('EMBEDDING_CACHE_DISK_SIZE', '20000'))
+EMBEDDING_CACHE_TTL = int(os.environ.get('EMBEDDING_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Semantic answer cache: minimum query cosine similarity, entry lifetime (s) and max entries (0 disables)
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', '0.95'))
+ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', '3600'))
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', '1000'))
+
+# Micro-batching of concurrent query embeddings (max size <= 1 disables)
+EMBED_BATCH_MAX_SIZE = int(os.environ.get('EMBED_BATCH_MAX_SIZE', '32'))
+EMBED_BATCH_MAX_WAIT_MS = float(os.environ.get('EMBED_BATCH_MAX_WAIT_MS', '2'))
+# Seconds a request waits for its batched embedding before embedding the text itself
+EMBED_BATCH_TIMEOUT = float(os.environ.get('EMBED_BATCH_TIMEOUT', '5'))
+
+# Embedding backend: "torch" (sentence-transformers) or "onnx" (int8 ONNX Runtime export of the same model)
+EMBEDDINGS_BACKEND = os.environ.get('EMBEDDINGS_BACKEND', 'torch').lower()
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'models/all-MiniLM-L6-v2-onnx')
+
+# Hybrid retrieval: BM25 (SQLite FTS5) results fused with vector results by reciprocal rank
+HYBRID_RETRIEVAL = os.environ.get('HYBRID_RETRIEVAL', '1') == '1'
+KEYWORD_INDEX_PATH = os.environ.get('KEYWORD_INDEX_PATH', 'keyword_index.sqlite')
+HYBRID_FETCH_K = int(os.environ.get('HYBRID_FETCH_K', '10'))  # candidates taken from each retriever
+RETRIEVAL_K = int(os.environ.get('RETRIEVAL_K', '5'))  # chunks sent to the LLM
+# Fused results are denser, so fewer chunks are sent while the keyword index is in use (it is skipped when empty)
+HYBRID_RETRIEVAL_K = int(os.environ.get('HYBRID_RETRIEVAL_K', os.environ.get('RETRIEVAL_K', '3')))
+
+# Embedding topic gate calibrated by extra/calibrate_topic_gate.py (gate is off until the file exists)
+TOPIC_GATE_PATH = os.environ.get('TOPIC_GATE_PATH', 'topic_gate.npz')
+
+# Cross-encoder rerank of over-fetched chunks, with a per-request time budget (falls back to retrieval order)
+RERANK = os.environ.get('RERANK', '0') == '1'
+RERANK_MODEL = os.environ.get('RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+RERANK_FETCH_K = int(os.environ.get('RERANK_FETCH_K', '20'))  # candidates scored per query
+RERANK_BUDGET_MS = float(os.environ.get('RERANK_BUDGET_MS', '150'))
+RERANK_MAX_TOKENS = int(os.environ.get('RERANK_MAX_TOKENS', '1200'))  # context budget for the kept chunks
+
+# MMR diversification of retrieved chunks: 1.0 = pure relevance (off), lower = fewer near-duplicate chunks.
+# Uses the embeddings the vector store returns with its hits (Pinecone values, local memmap); chunk text is never re-embedded
+MMR_LAMBDA = float(os.environ.get('MMR_LAMBDA', '0.7'))
+MMR_LAMBDA = MMR_LAMBDA if MMR_LAMBDA < 1.0 else None
+MMR_FETCH_K = int(os.environ.get('MMR_FETCH_K', '15'))  # candidates MMR picks from
+
+# Uploaded PDFs kept in per-document in-memory shards instead of the global index (0 = write them to the index)
+SESSION_SHARDS = os.environ.get('SESSION_SHARDS', '1') == '1'
+SESSION_SHARD_TTL = int(os.environ.get('SESSION_SHARD_TTL', '7200'))  # seconds without a query before a shard is dropped
+SESSION_SHARD_MAX_CHUNKS = int(os.environ.get('SESSION_SHARD_MAX_CHUNKS', '20000'))  # across all shards in the worker
+
+# Background summaries started at upload: concurrent jobs (0 = summarize on request only), waiting jobs,
+# how long finished summaries are kept (s) and how long /get_summary waits for a running one (s)
+SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', '2'))
+SUMMARY_MAX_QUEUED = int(os.environ.get('SUMMARY_MAX_QUEUED', '16'))
+SUMMARY_RESULT_TTL = int(os.environ.get('SUMMARY_RESULT_TTL', '3600'))
+SUMMARY_WAIT_TIMEOUT = float(os.environ.get('SUMMARY_WAIT_TIMEOUT', '120'))
+
+# Summaries of previously uploaded PDFs, keyed by file SHA-256 ("" disables): max entries and lifetime (s)
+SUMMARY_CACHE_PATH = os.environ.get('SUMMARY_CACHE_PATH', 'summary_cache.sqlite')
+SUMMARY_CACHE_SIZE = int(os.environ.get('SUMMARY_CACHE_SIZE', '500'))
+SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL', str(30 * 24 * 3600)))
+
+# Coalesce concurrent identical LLM prompts into one upstream call; a caller waits at most
+# SINGLE_FLIGHT_TIMEOUT s for the shared call (or its next chunk) before calling the LLM itself
+SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT', '1') == '1'
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '50'))
+
+# Outbound HTTP (Google Speech, Mailjet, Together): timeouts (s), retries with jittered backoff (s), pool per host
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '3.05'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '30'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', '0.25'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))
+
+# Chat prompt budget (estimated tokens): whole prompt (0 = no limit on chunks), conversation history,
+# and the rolling summary older exchanges are compacted into
+PROMPT_MAX_TOKENS = int(os.environ.get('PROMPT_MAX_TOKENS', '2500'))
+PROMPT_HISTORY_TOKENS = int(os.environ.get('PROMPT_HISTORY_TOKENS', '600'))
+PROMPT_SUMMARY_TOKENS = int(os.environ.get('PROMPT_SUMMARY_TOKENS', '150'))
+
+# Hospital recommendations are rendered from a template; PLACES_LLM_FORMAT=1 also rewords them with the LLM
+# in the background and serves the cached rewrite (max entries, lifetime in s) to later identical requests
+PLACES_LLM_FORMAT = os.environ.get('PLACES_LLM_FORMAT', '0') == '1'
+PLACES_FORMAT_CACHE_SIZE = int(os.environ.get('PLACES_FORMAT_CACHE_SIZE', '256'))
+PLACES_FORMAT_CACHE_TTL = int(os.environ.get('PLACES_FORMAT_CACHE_TTL', str(24 * 3600)))
+
+# LLM admission control: concurrent calls per worker (0 = unlimited), waiters before shedding, max wait (s),
+# and how many of the concurrent calls background work (summaries, formatting) may hold
+LLM_MAX_CONCURRENT = int(os.environ.get('LLM_MAX_CONCURRENT', '2'))
+LLM_MAX_QUEUED = int(os.environ.get('LLM_MAX_QUEUED', '4'))
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '20'))
+LLM_BACKGROUND_SLOTS = int(os.environ.get('LLM_BACKGROUND_SLOTS', '1'))
+
+# LLM deadlines: per HTTP request and per call (s, 0 = no call deadline), the fallback model asked
+# LLM_FALLBACK_RESERVE s before the deadline, and hedging: a second request to the main model
+# once a call runs past the recent p95 (at least LLM_HEDGE_MIN_DELAY s). The fallback is off unless
+# LLM_FALLBACK_MODEL names one; unlike the free main model it is billed per token
+# (e.g. meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo), and its answers are never put in the answer cache
+LLM_REQUEST_TIMEOUT = float(os.environ.get('LLM_REQUEST_TIMEOUT', '30'))
+LLM_DEADLINE = float(os.environ.get('LLM_DEADLINE', '45'))
+LLM_FALLBACK_MODEL = os.environ.get('LLM_FALLBACK_MODEL', '')
+LLM_FALLBACK_RESERVE = float(os.environ.get('LLM_FALLBACK_RESERVE', '15'))
+LLM_HEDGE = os.environ.get('LLM_HEDGE', '0') == '1'
+LLM_HEDGE_MIN_DELAY = float(os.environ.get('LLM_HEDGE_MIN_DELAY', '3'))
+
+# OpenAI-compatible endpoint for every LLM call (point it at extra/stub_llm_server.py for load tests)
+LLM_API_BASE = os.environ.get('LLM_API_BASE', 'https://api.together.xyz/v1').rstrip('/')
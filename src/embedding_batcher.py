@@ -0,0 +1,125 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeout
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    """Coalesce concurrent ``embed_query`` calls into one batched forward pass.
+
+    Request threads enqueue their text and block on a Future; a single worker
+    thread waits up to ``max_wait_ms`` after the first arrival (or until
+    ``max_batch_size`` texts are queued), runs ``embed_documents`` once and
+    hands each caller its vector. The worker is started lazily so it survives
+    gunicorn forking the app after import. A caller whose vector is not back
+    within ``timeout`` seconds (worker dead or stuck) embeds its text directly.
+    """
+
+    def __init__(self, base, max_batch_size=32, max_wait_ms=2.0, timeout=5.0):
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self.fallbacks = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.base.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    self._settle(future, exception=e)
+                continue
+            with self._lock:
+                self.batches += 1
+                self.texts += len(texts)
+                self.largest_batch = max(self.largest_batch, len(texts))
+            for (_, future), vector in zip(batch, vectors):
+                self._settle(future, result=vector)
+
+    @staticmethod
+    def _settle(future, result=None, exception=None):
+        # The caller may have timed out and cancelled the future in the meantime
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def embed_query(self, text):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if not future.cancel() and future.done():
+                return future.result()
+        print(f"Embedding batcher gave no result within {self.timeout:g}s, embedding directly")
+        with self._lock:
+            self.fallbacks += 1
+        return self.base.embed_query(text)
+
+    def embed_documents(self, texts):
+        # Ingestion already sends whole batches, no need to go through the queue
+        return self.base.embed_documents(texts)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'texts': self.texts,
+                'mean_batch_size': round(self.texts / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'fallbacks': self.fallbacks,
+                'queued': self._queue.qsize(),
+            }
+
+
+def with_batching(embeddings):
+    """Wrap embeddings with the micro-batcher configured by EMBED_BATCH_* settings"""
+    from src import config
+
+    if config.EMBED_BATCH_MAX_SIZE <= 1:
+        return embeddings
+    return BatchingEmbeddings(
+        embeddings,
+        max_batch_size=config.EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=config.EMBED_BATCH_MAX_WAIT_MS,
+        timeout=config.EMBED_BATCH_TIMEOUT
+    )
@@ -0,0 +1,176 @@
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text):
+    """Cache key for a query: lowercased, whitespace collapsed.
+
+    all-MiniLM-L6-v2 uses an uncased tokenizer that also ignores runs of
+    whitespace, so queries differing only in these ways embed identically.
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def query_digest(key):
+    """What the SQLite tier stores instead of the question itself"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Query-embedding cache in front of an Embeddings instance.
+
+    A bounded in-memory LRU is checked first, then an optional SQLite tier that
+    survives restarts. The SQLite tier is keyed by a SHA-256 of the normalized
+    query, never the text; entries older than ``disk_ttl`` seconds are ignored
+    and removed, and beyond ``max_disk_entries`` the least recently used go.
+    Document embedding (ingestion, uploads) passes straight through since
+    chunks are rarely embedded twice.
+    """
+
+    def __init__(self, base, max_size=2048, db_path=None, namespace='all-MiniLM-L6-v2',
+                 max_disk_entries=20000, disk_ttl=7 * 24 * 3600):
+        self.base = base
+        self.max_size = max_size
+        self.db_path = db_path
+        self.namespace = namespace
+        self.max_disk_entries = max_disk_entries
+        self.disk_ttl = disk_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            # Earlier builds kept the questions themselves in plaintext
+            conn.execute("DROP TABLE IF EXISTS query_embeddings")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_vectors (
+                namespace TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, digest)
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_vectors_last_used ON query_vectors (last_used)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        now = time.time()
+        digest = query_digest(key)
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT vector FROM query_vectors WHERE namespace = ? AND digest = ? AND created_at > ?",
+                (self.namespace, digest, now - self.disk_ttl)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE query_vectors SET last_used = ? WHERE namespace = ? AND digest = ?",
+                             (now, self.namespace, digest))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error reading query embedding: {e}")
+            row = None
+        finally:
+            conn.close()
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+
+    def _write_disk(self, key, vector):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_vectors (namespace, digest, vector, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, query_digest(key), np.asarray(vector, dtype=np.float32).tobytes(), now, now)
+            )
+            conn.execute("DELETE FROM query_vectors WHERE created_at <= ?", (now - self.disk_ttl,))
+            conn.execute(
+                "DELETE FROM query_vectors WHERE rowid NOT IN "
+                "(SELECT rowid FROM query_vectors ORDER BY last_used DESC LIMIT ?)",
+                (self.max_disk_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error persisting query embedding: {e}")
+        finally:
+            conn.close()
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.db_path:
+            vector = self._read_disk(key)
+            if vector is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+
+        vector = self.base.embed_query(key)
+        with self._lock:
+            self.misses += 1
+        self._remember(key, vector)
+        if self.db_path:
+            self._write_disk(key, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'size': len(self._memory),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+def with_query_cache(embeddings):
+    """Wrap embeddings with the query cache configured by EMBEDDING_CACHE_* settings"""
+    from src import config
+
+    if config.EMBEDDING_CACHE_SIZE <= 0:
+        return embeddings
+    return CachedEmbeddings(
+        embeddings,
+        max_size=config.EMBEDDING_CACHE_SIZE,
+        db_path=config.EMBEDDING_CACHE_PATH or None,
+        max_disk_entries=config.EMBEDDING_CACHE_DISK_SIZE,
+        disk_ttl=config.EMBEDDING_CACHE_TTL
+    )
@@ -28,5 +28,35 @@ def text_split(extracted_data):
 
 #Download the Embeddings from HuggingFace 
 def download_hugging_face_embeddings():
+    from src import config
+
+    if config.EMBEDDINGS_BACKEND == "onnx":
+        from src.onnx_embeddings import load_onnx_embeddings
+        return load_onnx_embeddings()  #same model exported to int8 ONNX, also 384 dimensions
+
     embeddings=HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2')  #this model return 384 dimensions
-    return embeddings
\ No newline at end of file
+    return embeddings
+
+
+#Open the vector store selected by VECTOR_STORE_BACKEND (Pinecone or the local memory-mapped index)
+def load_vector_store(embeddings, index_name=None):
+    from src import config
+
+    if config.VECTOR_STORE_BACKEND == "local":
+        from src.local_store import LocalVectorStore
+        print(f"Using local vector index at {config.LOCAL_INDEX_PATH}")
+        return LocalVectorStore(
+            embeddings,
+            config.LOCAL_INDEX_PATH,
+            dtype=config.LOCAL_INDEX_DTYPE,
+            ann_min_rows=config.ANN_MIN_ROWS,
+            nprobe=config.IVF_NPROBE,
+            nlist=config.IVF_NLIST,
+            rerank=config.QUANT_RERANK
+        )
+
+    from src.pinecone_store import PineconeStore
+    return PineconeStore.from_existing_index(
+        index_name=index_name or config.PINECONE_INDEX_NAME,
+        embedding=embeddings
+    )
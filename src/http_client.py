@@ -0,0 +1,139 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth another attempt: rate limiting and transient upstream failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostStats:
+    """Request count, failures, retries and a latency window for one upstream host"""
+
+    def __init__(self, window=500):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+        percentile = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2) if ordered else None
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+
+class HttpClient:
+    """Outbound HTTP for the app's integrations (Google Speech, Mailjet, Together).
+
+    One ``requests.Session`` per process keeps a keep-alive connection pool
+    per host, so repeated calls skip the TCP and TLS handshakes. Every request
+    gets a (connect, read) timeout. Connection failures and ``retry_statuses``
+    responses are retried up to ``retries`` times with full-jitter exponential
+    backoff, honouring a numeric Retry-After header. A connection aborted after
+    the request was sent is a connection failure too, so non-idempotent calls
+    must pass ``retries=0``.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=30, retries=2, backoff=0.25, max_backoff=4.0,
+                 pool_size=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._session_pid = None
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        # Pooled sockets must not be shared with a forked gunicorn worker
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            return self._hosts.setdefault(host, HostStats())
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, retries=None, retry_statuses=RETRY_STATUSES, **kwargs):
+        """Send a request through the shared pool; raises the last connection error once retries run out"""
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.retries if retries is None else retries
+        stats = self._host(url)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            response, error = None, None
+            try:
+                response = self._get_session().request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # Also covers connect timeouts; read timeouts are not retried (the request may have landed)
+                error = e
+            elapsed = (time.perf_counter() - start) * 1000
+
+            failed = error is not None or response.status_code >= 500 or response.status_code in retry_statuses
+            retry = attempt < retries and (error is not None or response.status_code in retry_statuses)
+            with self._lock:
+                stats.requests += 1
+                stats.latencies.append(elapsed)
+                stats.errors += int(failed)
+                stats.retries += int(retry)
+            if not retry:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._delay(attempt, response)
+            reason = type(error).__name__ if error is not None else response.status_code
+            print(f"Retrying {method} {urlsplit(url).netloc} in {delay:.2f}s ({reason})")
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {host: stats.snapshot() for host, stats in self._hosts.items()}
+
+
+@lru_cache(maxsize=1)
+def get_http_client():
+    """The process-wide outbound HTTP client configured by the HTTP_* settings"""
+    from src import config
+
+    return HttpClient(
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.HTTP_READ_TIMEOUT,
+        retries=config.HTTP_RETRIES,
+        backoff=config.HTTP_BACKOFF,
+        pool_size=config.HTTP_POOL_SIZE
+    )
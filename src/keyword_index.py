@@ -0,0 +1,129 @@
+import re
+import json
+import hashlib
+import sqlite3
+from langchain_core.documents import Document
+
+# Question words that would otherwise match most chunks
+STOPWORDS = {
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'could', 'do', 'does', 'for', 'from',
+    'has', 'have', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'should', 'so',
+    'tell', 'that', 'the', 'their', 'there', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'who',
+    'why', 'will', 'with', 'you', 'your'
+}
+
+
+def content_key(doc):
+    """Stable identity for a chunk across the vector store and the keyword index"""
+    return hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()
+
+
+def query_terms(query):
+    """Lowercased word tokens of the query without stopwords (keeps WBC, HbA1c, 500mg...)"""
+    return [term for term in re.findall(r"\w+", query.lower()) if term not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(result_lists, k, rrf_k=60):
+    """Merge ranked Document lists, scoring each chunk by sum(1 / (rrf_k + rank))"""
+    scores, docs = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = content_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+class KeywordIndex:
+    """BM25 keyword search over chunk text, backed by a SQLite FTS5 inverted index"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = self._connect()
+        try:
+            conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text,
+                chunk_id UNINDEXED,
+                doc_id UNINDEXED,
+                metadata UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def add_documents(self, documents):
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO chunks_fts (text, chunk_id, doc_id, metadata) VALUES (?, ?, ?, ?)",
+                [(doc.page_content, doc.id or content_key(doc), doc.metadata.get('doc_id'),
+                  json.dumps(doc.metadata, default=str)) for doc in documents]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, doc_id):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM chunks_fts WHERE doc_id = ?", (doc_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def search(self, query, k=10, doc_id=None, corpus_only=False):
+        """Top-k chunks by BM25 for any of the query terms, optionally within one document;
+        ``corpus_only`` leaves out chunks of uploaded documents (rows with a doc_id)"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = "SELECT chunk_id, text, metadata FROM chunks_fts WHERE chunks_fts MATCH ?"
+        params = [match]
+        if doc_id:
+            sql += " AND doc_id = ?"
+            params.append(doc_id)
+        elif corpus_only:
+            sql += " AND doc_id IS NULL"
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        params.append(k)
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Keyword search failed: {e}")
+            return []
+        finally:
+            conn.close()
+        return [Document(page_content=text, metadata=json.loads(metadata or '{}'), id=chunk_id)
+                for chunk_id, text, metadata in rows]
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+        finally:
+            conn.close()
+
+
+def load_keyword_index():
+    """Open the keyword index configured by KEYWORD_INDEX_PATH, or None when hybrid search is off
+    or the index holds no chunks yet (fusing with an empty index would only cost vector hits)"""
+    from src import config
+
+    if not config.HYBRID_RETRIEVAL:
+        return None
+    index = KeywordIndex(config.KEYWORD_INDEX_PATH)
+    if not len(index):
+        print(f"WARNING: HYBRID_RETRIEVAL is on but {config.KEYWORD_INDEX_PATH} is empty; using vector search "
+              f"only with k={config.RETRIEVAL_K}. Re-run ingestion (extra/store_index2.py or "
+              f"extra/store_index_local.py) to build the keyword index.")
+        return None
+    return index
@@ -0,0 +1,66 @@
+import re
+
+BOUNDARIES = ('prefix', 'word', 'substring')
+
+
+def _trie_pattern(node):
+    """Emit the regex for a trie node: shared prefixes are matched once, longer keywords first"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A keyword ends here; the (greedy) optional group still prefers the longer keywords
+        return '(?:' + body + ')?' if len(branches) == 1 else body + '?'
+    return body
+
+
+class KeywordMatcher:
+    """Find any of many keywords in a single pass over the text.
+
+    The keywords are folded into a trie (the goto graph of an Aho–Corasick
+    automaton) which is compiled once into a single regular expression, so the
+    scan runs in the C regex engine rather than one ``in`` check per keyword.
+
+    ``boundary`` controls where matches may occur:
+    - ``'prefix'``: the keyword must start a word ("health" matches "healthcare"
+      but "ct" no longer matches inside "doctor")
+    - ``'word'``: whole words only
+    - ``'substring'``: anywhere, like ``keyword in text``
+    """
+
+    def __init__(self, keywords, boundary='prefix'):
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"boundary must be one of {BOUNDARIES}, got {boundary}")
+        self.keywords = sorted({keyword.strip().lower() for keyword in keywords if keyword and keyword.strip()})
+        self.boundary = boundary
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        # The word-start check sits after each keyword's first character (instead of a leading
+        # \b) so the regex engine can still skip ahead to candidate first characters
+        start_check = r'(?<!\w.)' if boundary != 'substring' else ''
+        body = '|'.join(re.escape(ch) + start_check + _trie_pattern(child)
+                        for ch, child in sorted(trie.items()))
+        body = '(?:' + body + ')'
+        if boundary == 'word':
+            # Not followed by a word character: unlike \b this also holds after keywords
+            # ending in punctuation ("c++", "covid-19.")
+            body += r'(?!\w)'
+        # An empty keyword list must never match
+        self._regex = re.compile(body if self.keywords else r'(?!)')
+
+    def contains_any(self, text):
+        """True as soon as one keyword is found"""
+        return self._regex.search(text.lower()) is not None
+
+    def find_all(self, text):
+        """All non-overlapping hits as (start, end, keyword), longest keyword at each position"""
+        return [(m.start(), m.end(), m.group()) for m in self._regex.finditer(text.lower())]
+
+    def matched_keywords(self, text):
+        return {keyword for _, _, keyword in self.find_all(text)}
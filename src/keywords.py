@@ -0,0 +1,42 @@
+# List of medical-related keywords and topics
+MEDICAL_KEYWORDS = [
+    'health', 'medical', 'doctor', 'hospital', 'disease', 'symptom',
+    'treatment', 'medicine', 'patient', 'diagnosis', 'therapy',
+    'surgery', 'clinic', 'nurse', 'pharmacy', 'prescription', 'pain',
+    'illness', 'condition', 'disorder', 'infection', 'virus', 'bacteria',
+    'vaccine', 'vaccination', 'checkup', 'examination', 'test', 'scan',
+    'x-ray', 'mri', 'ct', 'blood', 'pressure', 'heart', 'lung', 'brain',
+    'bone', 'muscle', 'joint', 'skin', 'eye', 'ear', 'nose', 'throat',
+    'dental', 'mental', 'psychological', 'cancer', 'diabetes', 'asthma',
+    'allergy', 'fever', 'cold', 'flu', 'covid', 'coronavirus', 'pandemic',
+    'epidemic', 'outbreak', 'emergency', 'ambulance', 'paramedic', 'first aid',
+    'recovery', 'rehabilitation', 'physiotherapy', 'occupational therapy',
+    'diet', 'nutrition', 'exercise', 'fitness', 'wellness', 'prevention',
+    'vaccination', 'immunization', 'antibiotic', 'antiviral', 'medication',
+    'dosage', 'side effect', 'complication', 'prognosis', 'remission',
+    'chronic', 'acute', 'terminal', 'palliative', 'hospice', 'mortality',
+    'morbidity', 'epidemiology', 'pathology', 'anatomy', 'physiology',
+    'biochemistry', 'genetics', 'immunology', 'microbiology', 'pharmacology',
+    'toxicology', 'radiology', 'ultrasound', 'endoscopy', 'biopsy',
+    'transplant', 'prosthesis', 'implant', 'pacemaker', 'defibrillator',
+    'dialysis', 'chemotherapy', 'radiation', 'hormone', 'steroid', 'insulin',
+    'antidepressant', 'antipsychotic', 'anesthetic', 'analgesic', 'antacid',
+    'antihistamine', 'decongestant', 'expectorant', 'laxative', 'diuretic',
+    'anticoagulant', 'anticonvulsant', 'antifungal', 'antimalarial',
+    'antiretroviral', 'antitubercular', 'antiviral', 'antibacterial',
+    'antiseptic', 'disinfectant', 'sanitizer', 'mask', 'glove', 'gown',
+    'syringe', 'needle', 'catheter', 'stent', 'suture', 'bandage', 'plaster',
+    'cast', 'brace', 'crutch', 'wheelchair', 'walker', 'cane', 'prosthesis',
+    'hearing aid', 'glasses', 'contact lens', 'denture', 'pacemaker',
+    'defibrillator', 'insulin pump', 'cpap', 'ventilator', 'dialysis machine',
+    'mri machine', 'ct scanner', 'x-ray machine', 'ultrasound machine',
+    'endoscope', 'colonoscope', 'laparoscope', 'arthroscope', 'bronchoscope',
+    'cystoscope', 'gastroscope', 'hysteroscope', 'laryngoscope', 'otoscope',
+    'proctoscope', 'sigmoidoscope', 'thoracoscope', 'ureteroscope'
+]
+
+# Terms used to decide whether retrieved chunks / generated answers are medical
+MEDICAL_CONTENT_TERMS = [
+    'medical', 'health', 'disease', 'treatment', 'symptom', 'diagnosis',
+    'patient', 'doctor', 'hospital', 'medicine', 'therapy'
+]
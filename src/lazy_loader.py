@@ -1,40 +1,64 @@
 from functools import lru_cache
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.chat_models import ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
 import os
 
 @lru_cache(maxsize=1)
 def get_embeddings():
-    """Lazy load embeddings model"""
-    return HuggingFaceEmbeddings(
+    """Lazy load embeddings model, wrapped in the query-embedding cache and micro-batcher"""
+    from src import config
+    from src.embedding_cache import with_query_cache
+    from src.embedding_batcher import with_batching
+    if config.EMBEDDINGS_BACKEND == "onnx":
+        from src.onnx_embeddings import load_onnx_embeddings
+        return with_query_cache(with_batching(load_onnx_embeddings()))
+    return with_query_cache(with_batching(HuggingFaceEmbeddings(
         model_name="sentence-transformers/all-MiniLM-L6-v2",
         model_kwargs={'device': 'cpu'}
-    )
+    )))
 
 @lru_cache(maxsize=1)
 def get_llm():
-    """Lazy load language model"""
-    return ChatOpenAI(
+    """Lazy load language model, coalescing concurrent identical prompts and admitted by the LLM governor,
+    with per-call deadlines and the fallback model"""
+    from src import config
+    from src.single_flight import with_single_flight
+    from src.llm_governor import INTERACTIVE
+    from src.llm_deadline import client_limits, with_deadline
+    model = ChatOpenAI(
         openai_api_key=os.environ.get('TOGETHER_API_KEY2'),
-        openai_api_base="https://api.together.xyz/v1",
+        openai_api_base=config.LLM_API_BASE,
         model_name="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",  # Using smaller 8B model
         temperature=0.4,
-        max_tokens=500
+        max_tokens=500,
+        **client_limits(max_retries=1)
     )
+    fallback = ChatOpenAI(
+        openai_api_key=os.environ.get('TOGETHER_API_KEY2'),
+        openai_api_base=config.LLM_API_BASE,
+        model_name=config.LLM_FALLBACK_MODEL,
+        temperature=0.4,
+        max_tokens=500,
+        **client_limits(max_retries=0)
+    ) if config.LLM_FALLBACK_MODEL else None
+    return with_single_flight(with_deadline(model, fallback, INTERACTIVE))
 
 @lru_cache(maxsize=1)
 def get_pinecone_store():
-    """Lazy load Pinecone vector store"""
+    """Lazy load the vector store (Pinecone, or the local index when VECTOR_STORE_BACKEND=local)"""
+    from src.helper import load_vector_store
     embeddings = get_embeddings()
-    return PineconeVectorStore.from_existing_index(
-        index_name="medicalbot-try",
-        embedding=embeddings
-    )
+    return load_vector_store(embeddings, "medicalbot-try")
 
 def get_retriever(k=3):
-    """Get retriever with specified number of results"""
+    """Get retriever with specified number of results, diversified by MMR when MMR_LAMBDA is set"""
+    from src import config
     store = get_pinecone_store()
+    if config.MMR_LAMBDA is not None:
+        return store.as_retriever(
+            search_type="mmr",
+            search_kwargs={"k": k, "fetch_k": config.MMR_FETCH_K, "lambda_mult": config.MMR_LAMBDA}
+        )
     return store.as_retriever(
         search_type="similarity",
         search_kwargs={"k": k}
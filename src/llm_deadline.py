@@ -0,0 +1,291 @@
+import time
+import queue
+import threading
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from src.llm_governor import INTERACTIVE, get_llm_governor, with_governor
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """No attempt (primary, hedge or fallback) answered within the call's deadline"""
+
+
+class DeadlineStats:
+    """Recent primary-model latencies (to place the hedge) and attempt counters"""
+
+    def __init__(self, window=200):
+        self._latencies = {'generate': deque(maxlen=window), 'stream': deque(maxlen=window)}
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ('calls', 'hedged', 'hedge_wins', 'fallbacks', 'fallback_wins', 'deadline_exceeded', 'errors'), 0
+        )
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def record(self, mode, seconds):
+        with self._lock:
+            self._latencies[mode].append(seconds)
+
+    def p95(self, mode, min_samples=20):
+        with self._lock:
+            ordered = sorted(self._latencies[mode])
+        if len(ordered) < min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def snapshot(self):
+        p95 = {mode: self.p95(mode, min_samples=1) for mode in self._latencies}
+        with self._lock:
+            return {
+                **self.counts,
+                'p95_generate_ms': round(p95['generate'] * 1000, 1) if p95['generate'] is not None else None,
+                'p95_first_token_ms': round(p95['stream'] * 1000, 1) if p95['stream'] is not None else None,
+            }
+
+
+# Shared by every wrapped model so /metrics reports one set of numbers
+llm_deadline_stats = DeadlineStats()
+
+
+class FallbackWatch(BaseCallbackHandler):
+    """Callback noting whether an LLM answer in the run came from the fallback model"""
+
+    def __init__(self):
+        self.used = False
+
+    def on_llm_end(self, response, **kwargs):
+        if any((generation.generation_info or {}).get('fallback')
+               for generations in response.generations for generation in generations):
+            self.used = True
+
+
+def _mark_fallback(generation):
+    generation.generation_info = {**(generation.generation_info or {}), 'fallback': True}
+    return generation
+
+
+class _Attempt:
+    """One upstream call running on its own thread, reporting to a shared queue.
+
+    The call runs inside ``admit()`` (a governor slot), held until the call
+    really ends even if the race was lost; an attempt cancelled while it
+    waited for admission never calls upstream.
+    """
+
+    def __init__(self, role, run, events, streaming, admit=nullcontext):
+        self.role = role
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.admit = admit
+        target = self._stream if streaming else self._call
+        threading.Thread(target=target, args=(run, events), daemon=True, name=f"llm-{role}").start()
+
+    def _call(self, run, events):
+        try:
+            with self.admit():
+                if self.cancelled:
+                    return
+                self.started = time.monotonic()
+                result = run()
+            events.put((self, 'result', result))
+        except Exception as e:
+            events.put((self, 'error', e))
+
+    def _stream(self, run, events):
+        try:
+            with self.admit():
+                if self.cancelled:
+                    return
+                self.started = time.monotonic()
+                chunks = run()
+                try:
+                    for chunk in chunks:
+                        if self.cancelled:
+                            return
+                        events.put((self, 'chunk', chunk))
+                finally:
+                    if self.cancelled and hasattr(chunks, 'close'):
+                        chunks.close()
+            events.put((self, 'end', None))
+        except Exception as e:
+            events.put((self, 'error', e))
+
+
+class DeadlineChatModel(BaseChatModel):
+    """Chat model wrapper bounding every call by ``deadline`` seconds.
+
+    With ``hedge`` a second request to the primary model goes out once the
+    call has run longer than the recent p95 (at least ``hedge_min_delay``);
+    the first to answer wins. ``fallback_reserve`` seconds before the deadline,
+    or as soon as every attempt has failed, the ``fallback`` model is asked
+    too. Streams race on the first token; after that the winner alone is
+    followed and a gap of ``stall_timeout`` between chunks ends the call.
+    Losing attempts are abandoned, their HTTP requests end with the client's
+    own timeout. Answers from the fallback carry ``fallback`` in their
+    generation_info (see FallbackWatch).
+
+    With a ``governor`` every attempt takes its own slot at ``priority``, so
+    hedges, fallbacks and abandoned attempts all count against the limit.
+    """
+
+    model: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    deadline: float = 45.0
+    fallback_reserve: float = 10.0
+    hedge: bool = False
+    hedge_min_delay: float = 2.0
+    stall_timeout: float = 30.0
+    stats: Any = None
+    governor: Any = None
+    priority: int = INTERACTIVE
+
+    @property
+    def _llm_type(self):
+        return f"deadline-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self):
+        return self.model._identifying_params
+
+    def _race(self, launch, mode):
+        """Start the primary, then the hedge and fallback as their times come; returns
+        (attempt, kind, payload) of the first event that is not a failure, with the events queue"""
+        stats = self.stats or llm_deadline_stats
+        start = time.monotonic()
+        deadline = start + self.deadline
+        events = queue.Queue()
+
+        def admit():
+            if self.governor is None:
+                return nullcontext()
+            return self.governor.slot(self.priority, timeout=deadline - time.monotonic())
+        attempts = [launch('primary', events, admit)]
+        hedge_at = start + max(self.hedge_min_delay, stats.p95(mode) or 0) if self.hedge else None
+        fallback_at = deadline - self.fallback_reserve if self.fallback is not None else None
+        pending, last_error = 1, None
+        stats.add('calls')
+
+        while True:
+            next_at = min(t for t in (hedge_at, fallback_at, deadline) if t is not None)
+            try:
+                attempt, kind, payload = events.get(timeout=max(0.0, next_at - time.monotonic()))
+            except queue.Empty:
+                now = time.monotonic()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    attempts.append(launch('hedge', events, admit))
+                    pending += 1
+                    stats.add('hedged')
+                elif fallback_at is not None and now >= fallback_at:
+                    fallback_at = hedge_at = None
+                    attempts.append(launch('fallback', events, admit))
+                    pending += 1
+                    stats.add('fallbacks')
+                elif now >= deadline:
+                    self._cancel(attempts)
+                    stats.add('deadline_exceeded')
+                    raise LLMDeadlineExceeded(f"No LLM response within {self.deadline:g}s")
+                continue
+
+            if kind != 'error':
+                self._cancel(other for other in attempts if other is not attempt)
+                if attempt.role != 'fallback':
+                    stats.record(mode, time.monotonic() - attempt.started)
+                if attempt.role in ('hedge', 'fallback'):
+                    stats.add(f"{attempt.role}_wins")
+                return attempt, kind, payload, events
+
+            print(f"LLM {attempt.role} attempt failed: {str(payload)}")
+            stats.add('errors')
+            pending -= 1
+            last_error = payload
+            if pending == 0:
+                if fallback_at is None:
+                    raise last_error
+                # Everything launched so far failed, do not wait for the reserve to ask the fallback
+                fallback_at = hedge_at = None
+                attempts.append(launch('fallback', events, admit))
+                pending += 1
+                stats.add('fallbacks')
+
+    @staticmethod
+    def _cancel(attempts):
+        for attempt in attempts:
+            attempt.cancelled = True
+
+    def _model_for(self, role):
+        return self.fallback if role == 'fallback' else self.model
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def launch(role, events, admit):
+            model = self._model_for(role)
+            return _Attempt(role, lambda: model._generate(messages, stop=stop, **kwargs), events,
+                            streaming=False, admit=admit)
+
+        winner, _, result, _ = self._race(launch, 'generate')
+        if winner.role == 'fallback':
+            for generation in result.generations:
+                _mark_fallback(generation)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        def launch(role, events, admit):
+            model = self._model_for(role)
+            return _Attempt(role, lambda: model._stream(messages, stop=stop, **kwargs), events,
+                            streaming=True, admit=admit)
+
+        winner, kind, payload, events = self._race(launch, 'stream')
+        try:
+            while kind == 'chunk':
+                if winner.role == 'fallback':
+                    _mark_fallback(payload)
+                if run_manager:
+                    run_manager.on_llm_new_token(payload.text, chunk=payload)
+                yield payload
+                while True:
+                    try:
+                        attempt, kind, payload = events.get(timeout=self.stall_timeout)
+                    except queue.Empty:
+                        (self.stats or llm_deadline_stats).add('deadline_exceeded')
+                        raise LLMDeadlineExceeded(f"LLM stream stalled for {self.stall_timeout:g}s")
+                    if attempt is winner:
+                        break
+            if kind == 'error':
+                raise payload
+        finally:
+            winner.cancelled = True
+
+
+def client_limits(max_retries=1):
+    """request_timeout and max_retries for an LLM client wrapped by ``with_deadline``: with a deadline
+    one attempt must end inside it, so the client does not retry on its own (hedge and fallback do)"""
+    from src import config
+
+    if config.LLM_DEADLINE <= 0:
+        return {'request_timeout': config.LLM_REQUEST_TIMEOUT, 'max_retries': max_retries}
+    return {'request_timeout': min(config.LLM_REQUEST_TIMEOUT, config.LLM_DEADLINE), 'max_retries': 0}
+
+
+def with_deadline(model, fallback=None, priority=INTERACTIVE):
+    """Bound the model's calls by LLM_DEADLINE, with optional hedging (LLM_HEDGE=1) and a fallback
+    model, each attempt admitted by the LLM governor at ``priority``; LLM_DEADLINE=0 only governs the model"""
+    from src import config
+
+    if config.LLM_DEADLINE <= 0:
+        return with_governor(model, priority)
+    return DeadlineChatModel(
+        model=model,
+        fallback=fallback,
+        deadline=config.LLM_DEADLINE,
+        fallback_reserve=config.LLM_FALLBACK_RESERVE,
+        hedge=config.LLM_HEDGE,
+        hedge_min_delay=config.LLM_HEDGE_MIN_DELAY,
+        stall_timeout=config.LLM_REQUEST_TIMEOUT,
+        governor=get_llm_governor(),
+        priority=priority
+    )
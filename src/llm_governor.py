@@ -0,0 +1,199 @@
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any
+from langchain_core.language_models.chat_models import BaseChatModel
+
+# Admission priorities, most urgent first
+INTERACTIVE = 0
+SUMMARY = 1
+FORMATTING = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', SUMMARY: 'summary', FORMATTING: 'formatting'}
+
+
+class LLMOverloaded(RuntimeError):
+    """An LLM call was shed: the admission queue is full or the wait for a slot ran out"""
+
+
+class LLMGovernor:
+    """Bounded priority admission in front of the LLM.
+
+    At most ``max_concurrent`` calls run at once, and background work (any
+    priority below INTERACTIVE) may hold at most ``background_slots`` of them
+    so a chat message never waits behind a batch of summaries. Callers that
+    cannot start wait in priority order; beyond ``max_queued`` waiters the
+    least urgent one is shed immediately, and a waiter that gets no slot
+    within ``queue_timeout`` seconds is shed too. Shed calls raise LLMOverloaded.
+    """
+
+    def __init__(self, max_concurrent=2, max_queued=4, queue_timeout=20, background_slots=1):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.background_slots = max(1, min(background_slots, max_concurrent))
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._evicted = set()
+        self.active = 0
+        self.active_background = 0
+        self.admitted = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.shed = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.timeouts = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.waits = {priority: deque(maxlen=500) for priority in PRIORITY_NAMES}
+
+    def _fits(self, priority):
+        if self.active >= self.max_concurrent:
+            return False
+        return priority == INTERACTIVE or self.active_background < self.background_slots
+
+    def _admissible(self, entry):
+        """A free slot for the entry's priority, and no waiter ahead of it that could take one"""
+        if not self._fits(entry[0]):
+            return False
+        return all(other >= entry or not self._fits(other[0]) for other in self._waiting)
+
+    def _enqueue(self, entry):
+        if len(self._waiting) < self.max_queued:
+            self._waiting.append(entry)
+            return True
+        # Full: a more urgent caller takes the place of the least urgent, most recent waiter
+        worst = max(self._waiting)
+        if worst <= entry:
+            return False
+        self._waiting.remove(worst)
+        self._evicted.add(worst)
+        self._waiting.append(entry)
+        self._cond.notify_all()
+        return True
+
+    def _wait(self, entry, start, wait):
+        deadline = start + wait
+        try:
+            while True:
+                # Checked before admission: an evicted waiter is shed even if a slot has just freed up
+                if entry in self._evicted:
+                    self._evicted.discard(entry)
+                    self.shed[entry[0]] += 1
+                    raise LLMOverloaded("LLM queue is full")
+                if self._admissible(entry):
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts[entry[0]] += 1
+                    raise LLMOverloaded(f"No LLM slot within {wait:g}s")
+                self._cond.wait(remaining)
+        finally:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, timeout=None):
+        """Hold one LLM slot for the duration of the block, waiting at most ``timeout`` seconds
+        (default ``queue_timeout``) for it; raises LLMOverloaded when shed"""
+        start = time.monotonic()
+        wait = self.queue_timeout if timeout is None else min(self.queue_timeout, max(timeout, 0.0))
+        entry = (priority, next(self._seq))
+        with self._cond:
+            if not self._admissible(entry):
+                if not self._enqueue(entry):
+                    self.shed[priority] += 1
+                    raise LLMOverloaded("LLM queue is full")
+                self._wait(entry, start, wait)
+            self.active += 1
+            self.active_background += int(priority != INTERACTIVE)
+            self.admitted[priority] += 1
+            self.waits[priority].append((time.monotonic() - start) * 1000)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self.active_background -= int(priority != INTERACTIVE)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            by_priority = {}
+            for priority, name in PRIORITY_NAMES.items():
+                ordered = sorted(self.waits[priority])
+                by_priority[name] = {
+                    'queued': sum(1 for waiting, _ in self._waiting if waiting == priority),
+                    'admitted': self.admitted[priority],
+                    'shed': self.shed[priority],
+                    'timeouts': self.timeouts[priority],
+                    'wait_p50_ms': round(ordered[len(ordered) // 2], 2) if ordered else None,
+                    'wait_p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2) if ordered else None,
+                }
+            return {
+                'max_concurrent': self.max_concurrent,
+                'active': self.active,
+                'queued': len(self._waiting),
+                'priorities': by_priority,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_llm_governor():
+    """The process-wide LLM governor from the LLM_* settings, or None when LLM_MAX_CONCURRENT is 0"""
+    from src import config
+
+    if config.LLM_MAX_CONCURRENT <= 0:
+        return None
+    return LLMGovernor(
+        max_concurrent=config.LLM_MAX_CONCURRENT,
+        max_queued=config.LLM_MAX_QUEUED,
+        queue_timeout=config.LLM_QUEUE_TIMEOUT,
+        background_slots=config.LLM_BACKGROUND_SLOTS
+    )
+
+
+@contextmanager
+def llm_slot(priority=INTERACTIVE):
+    """Hold a slot of the process-wide governor (a no-op when it is disabled)"""
+    governor = get_llm_governor()
+    if governor is None:
+        yield
+        return
+    with governor.slot(priority):
+        yield
+
+
+class GovernedChatModel(BaseChatModel):
+    """Chat model wrapper that takes a governor slot at ``priority`` for every call"""
+
+    model: BaseChatModel
+    priority: int = INTERACTIVE
+    governor: Any = None
+
+    @property
+    def _llm_type(self):
+        return f"governed-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self):
+        return self.model._identifying_params
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self.governor.slot(self.priority):
+            return self.model._generate(messages, stop=stop, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # The slot is held until the last chunk, a stream occupies the upstream as long as a call
+        with self.governor.slot(self.priority):
+            for chunk in self.model._stream(messages, stop=stop, **kwargs):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+
+
+def with_governor(model, priority=INTERACTIVE):
+    """Admit the model's calls through the LLM governor at ``priority`` (LLM_MAX_CONCURRENT=0 disables)"""
+    governor = get_llm_governor()
+    if governor is None:
+        return model
+    return GovernedChatModel(model=model, priority=priority, governor=governor)
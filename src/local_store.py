@@ -0,0 +1,401 @@
+import os
+import json
+import uuid
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from src.ann_index import IVFIndex
+from src.quantization import load_quantizer, save_quantizer
+
+SUPPORTED_DTYPES = ('float32', 'float16')
+
+
+def normalize_rows(vectors):
+    """L2-normalize embeddings so a dot product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def parse_doc_id_filter(filter):
+    """Turn a Pinecone-style filter into a set of doc_ids (or None for no filter)"""
+    if not filter:
+        return None
+    unsupported = set(filter) - {'doc_id'}
+    if unsupported:
+        raise ValueError(f"Local vector store can only filter on doc_id, got: {sorted(unsupported)}")
+    condition = filter['doc_id']
+    if isinstance(condition, dict):
+        if '$eq' in condition:
+            return {condition['$eq']}
+        if '$in' in condition:
+            return set(condition['$in'])
+        raise ValueError(f"Unsupported doc_id filter operator: {condition}")
+    return {condition}
+
+
+class LocalVectorStore(VectorStore):
+    """In-process replacement for PineconeVectorStore.
+
+    Vectors live in a memory-mapped float32/float16 matrix (``vectors.bin``),
+    chunk text and metadata in SQLite (``chunks.sqlite``) next to it. Deleted
+    chunks are tombstoned and dropped from disk by ``compact()``.
+
+    Unfiltered searches are exact scans until the store reaches ``ann_min_rows``
+    chunks; from then on an IVF index narrows the scan to the ``nprobe``
+    closest k-means lists (pass ``nprobe=`` or ``exact=True`` per search).
+
+    A quantized index (see ``quantize()``) keeps only compact codes in memory:
+    candidates are ranked by asymmetric distance against the codes and the top
+    ``rerank`` are re-scored exactly from the full-precision file on disk.
+    """
+
+    def __init__(self, embedding, path, dtype=None, ann_min_rows=50000, nprobe=8, nlist=None, rerank=50):
+        if dtype is not None and dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype}")
+        self._embedding = embedding
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, 'vectors.bin')
+        self._db_path = os.path.join(path, 'chunks.sqlite')
+        self._codes_path = os.path.join(path, 'codes.bin')
+        self.rerank = rerank
+        self.quantizer = load_quantizer(path)
+        self.ann_min_rows = ann_min_rows
+        self.nlist = nlist
+        self.ann = IVFIndex(path, nprobe=nprobe)
+        self._init_db(dtype)
+        self._load()
+        self.ann.sync(self._vectors)
+        self._load_codes()
+
+    # ---------- storage ----------
+
+    def _connect(self):
+        return sqlite3.connect(self._db_path)
+
+    def _init_db(self, dtype):
+        conn = self._connect()
+        try:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                doc_id TEXT,
+                text TEXT NOT NULL,
+                metadata TEXT,
+                deleted INTEGER DEFAULT 0
+            )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS index_info (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR IGNORE INTO index_info (key, value) VALUES ('dtype', ?)",
+                         (dtype or 'float32',))
+            conn.commit()
+            stored = dict(conn.execute("SELECT key, value FROM index_info").fetchall())
+        finally:
+            conn.close()
+        if dtype and stored['dtype'] != dtype:
+            print(f"Local index at {self.path} is stored as {stored['dtype']}, ignoring requested {dtype}")
+        self.dtype = np.dtype(stored['dtype'])
+        self.dimension = int(stored['dimension']) if 'dimension' in stored else None
+
+    def _load(self):
+        """(Re)build the in-memory row bookkeeping and the memory map"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT row, id, doc_id, deleted FROM chunks ORDER BY row").fetchall()
+        finally:
+            conn.close()
+        self._row_ids = [row_id for _, row_id, _, _ in rows]
+        self._id_to_row = {row_id: row for row, row_id, _, _ in rows}
+        self._alive = np.array([not deleted for _, _, _, deleted in rows], dtype=bool)
+        self._doc_rows = {}
+        for row, _, doc_id, deleted in rows:
+            if doc_id is not None and not deleted:
+                self._doc_rows.setdefault(doc_id, []).append(row)
+        self._remap()
+
+    def _remap(self):
+        count = len(self._row_ids)
+        if count and self.dimension:
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode='r',
+                                      shape=(count, self.dimension))
+        else:
+            self._vectors = np.zeros((0, self.dimension or 0), dtype=self.dtype)
+
+    def _load_codes(self):
+        if self.quantizer is None:
+            self._codes = None
+            return
+        codes = np.fromfile(self._codes_path, dtype=np.uint8) if os.path.exists(self._codes_path) else \
+            np.zeros(0, dtype=np.uint8)
+        self._codes = codes.reshape(-1, self.quantizer.code_size)
+        if len(self._codes) < len(self._row_ids):
+            self._append_codes(self._vectors[len(self._codes):])
+
+    def _append_codes(self, vectors, block=65536):
+        for start in range(0, len(vectors), block):
+            codes = self.quantizer.encode(np.asarray(vectors[start:start + block], dtype=np.float32))
+            with open(self._codes_path, 'ab') as f:
+                f.write(codes.tobytes())
+            self._codes = np.concatenate([self._codes, codes])
+
+    def __len__(self):
+        return int(self._alive.sum())
+
+    def memory_bytes(self):
+        """Bytes of vector data that searches keep resident (codes if quantized, else the matrix)"""
+        if self._codes is not None:
+            return int(self._codes.nbytes)
+        return len(self._row_ids) * (self.dimension or 0) * self.dtype.itemsize
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # ---------- writes ----------
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = normalize_rows(self._embedding.embed_documents(texts))
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def add_vectors(self, vectors, texts, metadatas, ids):
+        """Append pre-computed embeddings (used by add_texts and index conversion tools)"""
+        vectors = normalize_rows(vectors)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO index_info (key, value) VALUES ('dimension', ?)",
+                             (str(self.dimension),))
+                conn.commit()
+                conn.close()
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dim vectors, got {vectors.shape[1]}")
+
+            start = len(self._row_ids)
+            with open(self._vectors_path, 'ab') as f:
+                f.write(vectors.astype(self.dtype).tobytes())
+
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "INSERT INTO chunks (row, id, doc_id, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [(start + i, ids[i], metadatas[i].get('doc_id'), texts[i], json.dumps(metadatas[i]))
+                     for i in range(len(texts))]
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+            for i, chunk_id in enumerate(ids):
+                row = start + i
+                self._row_ids.append(chunk_id)
+                self._id_to_row[chunk_id] = row
+                doc_id = metadatas[i].get('doc_id')
+                if doc_id is not None:
+                    self._doc_rows.setdefault(doc_id, []).append(row)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            self._remap()
+
+            if self._codes is not None:
+                self._append_codes(vectors)
+            if self.ann.is_trained:
+                self.ann.add(vectors)
+            elif self.ann_min_rows and len(self._row_ids) >= self.ann_min_rows:
+                self.build_ann()
+        return ids
+
+    def build_ann(self, nlist=None, sample_size=None, iterations=15):
+        """(Re)train the IVF index over every stored row"""
+        with self._lock:
+            print(f"Training IVF index over {len(self._row_ids)} chunks...")
+            self.ann.train(self._vectors, nlist=nlist or self.nlist,
+                           sample_size=sample_size, iterations=iterations)
+            print(f"IVF index ready with {self.ann.nlist} lists")
+
+    def quantize(self, quantizer, sample_size=100000, seed=0):
+        """Train ``quantizer`` on a sample of stored vectors and encode every row"""
+        with self._lock:
+            rng = np.random.default_rng(seed)
+            count = len(self._row_ids)
+            sample_rows = np.sort(rng.choice(count, min(count, sample_size), replace=False))
+            quantizer.train(np.asarray(self._vectors[sample_rows], dtype=np.float32))
+            if os.path.exists(self._codes_path):
+                os.remove(self._codes_path)
+            save_quantizer(quantizer, self.path)
+            self.quantizer = quantizer
+            self._codes = np.zeros((0, quantizer.code_size), dtype=np.uint8)
+            self._append_codes(self._vectors)
+
+    def delete(self, ids=None, filter=None, **kwargs):
+        """Tombstone chunks by id and/or by a doc_id filter"""
+        with self._lock:
+            rows = set()
+            if ids:
+                rows.update(self._id_to_row[i] for i in ids if i in self._id_to_row)
+            doc_ids = parse_doc_id_filter(filter)
+            if doc_ids:
+                for doc_id in doc_ids:
+                    rows.update(self._doc_rows.pop(doc_id, []))
+            rows = sorted(row for row in rows if self._alive[row])
+            if not rows:
+                return False
+            conn = self._connect()
+            try:
+                conn.executemany("UPDATE chunks SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+                conn.commit()
+            finally:
+                conn.close()
+            self._alive[rows] = False
+            return True
+
+    def compact(self):
+        """Rewrite the vector file and row numbers without tombstoned chunks"""
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            self.ann.sync(self._vectors)
+            self.ann.compact(keep)
+            if self._codes is not None:
+                self._codes = self._codes[keep]
+                self._codes.tofile(self._codes_path)
+            tmp_path = self._vectors_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                for start in range(0, len(keep), 65536):
+                    f.write(np.asarray(self._vectors[keep[start:start + 65536]]).tobytes())
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM chunks WHERE deleted = 1")
+                # Renumber the surviving rows 0..n-1 via negative values to avoid key clashes
+                old_rows = [row for (row,) in conn.execute("SELECT row FROM chunks ORDER BY row")]
+                conn.executemany("UPDATE chunks SET row = ? WHERE row = ?",
+                                 [(-1 - new_row, old_row) for new_row, old_row in enumerate(old_rows)])
+                conn.execute("UPDATE chunks SET row = -1 - row")
+                conn.commit()
+            finally:
+                conn.close()
+            self._vectors = None
+            os.replace(tmp_path, self._vectors_path)
+            self._load()
+            self._load_codes()
+
+    # ---------- reads ----------
+
+    def _candidate_rows(self, filter):
+        doc_ids = parse_doc_id_filter(filter)
+        if doc_ids is None:
+            return None
+        rows = [row for doc_id in doc_ids for row in self._doc_rows.get(doc_id, [])]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _score_rows(self, query, rows=None, nprobe=None, exact=False, rerank=None, block=65536):
+        """Cosine scores for the given rows (all rows when None), dead rows get -inf"""
+        if rows is None and self.ann.is_trained and not exact:
+            rows = np.sort(self.ann.candidates(query, nprobe))
+        rerank = rerank or self.rerank
+        if self._codes is not None and not exact and (rows is None or len(rows) > rerank):
+            # Rank by asymmetric distance on the codes, keep the best for exact re-scoring
+            if rows is None:
+                rows = np.arange(len(self._row_ids))
+            approx = self.quantizer.scores(query, self._codes[rows])
+            approx[~self._alive[rows]] = -np.inf
+            best = np.argpartition(-approx, rerank - 1)[:rerank] if len(rows) > rerank else np.arange(len(rows))
+            rows = np.sort(rows[best])
+        if rows is None:
+            scores = np.empty(len(self._row_ids), dtype=np.float32)
+            for start in range(0, len(scores), block):
+                chunk = np.asarray(self._vectors[start:start + block], dtype=np.float32)
+                scores[start:start + block] = chunk @ query
+            scores[~self._alive] = -np.inf
+            return np.arange(len(scores)), scores
+        scores = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+        scores[~self._alive[rows]] = -np.inf
+        return rows, scores
+
+    def _fetch_documents(self, rows):
+        conn = self._connect()
+        try:
+            placeholders = ','.join('?' for _ in rows)
+            found = conn.execute(
+                f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({placeholders})",
+                [int(row) for row in rows]
+            ).fetchall()
+        finally:
+            conn.close()
+        by_row = {row: Document(page_content=text, metadata=json.loads(metadata or '{}'), id=chunk_id)
+                  for row, chunk_id, text, metadata in found}
+        return [by_row[int(row)] for row in rows]
+
+    def _search(self, embedding, k, filter=None, nprobe=None, exact=False, rerank=None, with_vectors=False):
+        """Top-k (doc, score[, vector]) tuples; vectors come straight from the matrix, no extra lookup"""
+        with self._lock:
+            if not len(self._row_ids):
+                return []
+            query = normalize_rows(embedding)[0]
+            rows, scores = self._score_rows(query, self._candidate_rows(filter), nprobe=nprobe, exact=exact,
+                                            rerank=max(rerank or self.rerank, k))
+            if not len(rows):
+                return []
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = top[np.isfinite(scores[top])]
+            docs = self._fetch_documents(rows[top])
+            if not with_vectors:
+                return list(zip(docs, scores[top].tolist()))
+            vectors = np.asarray(self._vectors[rows[top]], dtype=np.float32)
+            return list(zip(docs, scores[top].tolist(), vectors))
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, nprobe=None, exact=False,
+                                               rerank=None, **kwargs):
+        return self._search(embedding, k, filter, nprobe=nprobe, exact=exact, rerank=rerank)
+
+    def similarity_search_with_vectors_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        """Like similarity_search_with_score_by_vector but each hit also carries its stored embedding"""
+        return self._search(embedding, k, filter, nprobe=kwargs.get('nprobe'), exact=kwargs.get('exact', False),
+                            rerank=kwargs.get('rerank'), with_vectors=True)
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, filter=None,
+                                                **kwargs):
+        from src.mmr import mmr_select
+
+        hits = self.similarity_search_with_vectors_by_vector(embedding, fetch_k, filter, **kwargs)
+        if not hits:
+            return []
+        selected = mmr_select(embedding, np.stack([vector for _, _, vector in hits]), k, lambda_mult)
+        return [hits[i][0] for i in selected]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, filter, **kwargs)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter, **kwargs)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] mapped to a [0, 1] relevance score
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, path='local_index', dtype=None, **kwargs):
+        store = cls(embedding, path, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=kwargs.get('ids'))
+        return store
@@ -0,0 +1,58 @@
+import numpy as np
+from src.keyword_index import content_key
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def mmr_select(query_embedding, candidate_embeddings, k, lambda_mult=0.7):
+    """Indices of k candidates by maximal marginal relevance, in selection order.
+
+    Each step picks argmax(lambda * sim(query, c) - (1 - lambda) * max sim(c, selected)).
+    The candidate-candidate similarities come from one matrix product and the
+    redundancy term is kept as a running maximum, so a step is a few vector ops.
+    """
+    candidates = _unit_rows(candidate_embeddings)
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+    k = min(k, len(candidates))
+    relevance = candidates @ _unit_rows(query_embedding).reshape(-1)
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+def candidate_vectors(docs, known):
+    """Stored embedding per doc from ``known`` (content_key -> vector, as returned by the search),
+    None for docs the search did not return (keyword-only hits). Nothing is embedded here."""
+    return [known.get(content_key(doc)) for doc in docs]
+
+
+def diversify(query_embedding, docs, vectors, k, lambda_mult=0.7):
+    """Pick k of the docs by MMR over their stored embeddings, returned in their original order.
+
+    Docs without a vector cannot be compared with the others; they are kept
+    and compete for the k places by their original rank only.
+    """
+    if len(docs) <= 1:
+        return docs[:k]
+    scored = [i for i, vector in enumerate(vectors) if vector is not None]
+    unscored = [i for i, vector in enumerate(vectors) if vector is None]
+    picked = mmr_select(query_embedding, np.asarray([vectors[i] for i in scored], dtype=np.float32), k, lambda_mult) \
+        if scored else []
+    keep = sorted([scored[j] for j in picked] + unscored)[:k]
+    return [docs[i] for i in keep]
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Preferred model files inside the model directory, int8 first
+MODEL_FILES = ('model_quantized.onnx', 'model.onnx')
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 on ONNX Runtime instead of torch.
+
+    Reads an exported (optionally int8-quantized) model plus ``tokenizer.json``
+    from a local directory (see extra/export_onnx_embeddings.py) and reproduces
+    the sentence-transformers pipeline: mean pooling over the attention mask
+    followed by L2 normalization, so vectors match the existing index.
+    """
+
+    def __init__(self, model_dir, max_length=256, batch_size=32, intra_op_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = next((os.path.join(model_dir, name) for name in MODEL_FILES
+                           if os.path.exists(os.path.join(model_dir, name))), None)
+        if model_path is None:
+            raise FileNotFoundError(f"No ONNX model ({' or '.join(MODEL_FILES)}) found in {model_dir}")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+        self.batch_size = batch_size
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.model_path = model_path
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch([text.replace("\n", " ") for text in texts])
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).tolist()
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0]
+
+
+def load_onnx_embeddings():
+    """Build the ONNX embedder from the ONNX_MODEL_DIR setting"""
+    from src import config
+    return OnnxMiniLMEmbeddings(config.ONNX_MODEL_DIR)
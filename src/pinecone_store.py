@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+from langchain_pinecone import PineconeVectorStore
+
+
+class PineconeStore(PineconeVectorStore):
+    """PineconeVectorStore whose search can also return the stored embedding of every hit.
+
+    MMR diversification needs the candidates' vectors; asking Pinecone for them
+    (``include_values``) avoids embedding the chunk text again on every query.
+    """
+
+    def similarity_search_with_vectors_by_vector(self, embedding, k=4, filter=None, namespace=None, **kwargs):
+        """(doc, score, vector) for the top-k hits, like LocalVectorStore's method of the same name"""
+        results = self._index.query(
+            vector=list(embedding),
+            top_k=k,
+            include_metadata=True,
+            include_values=True,
+            namespace=namespace if namespace is not None else self._namespace,
+            filter=filter
+        )
+        hits = []
+        for match in results["matches"]:
+            metadata = dict(match["metadata"] or {})
+            if self._text_key not in metadata:
+                continue
+            text = metadata.pop(self._text_key)
+            hits.append((Document(id=match.get("id"), page_content=text, metadata=metadata),
+                         match["score"], match["values"]))
+        return hits
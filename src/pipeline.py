@@ -0,0 +1,236 @@
+import time
+import threading
+from contextlib import contextmanager
+from src.keyword_index import content_key, reciprocal_rank_fusion
+from src.llm_deadline import FallbackWatch
+from src.mmr import candidate_vectors, diversify
+from src.keyword_matcher import KeywordMatcher
+from src.keywords import MEDICAL_CONTENT_TERMS
+
+MEDICAL_CONTENT_MATCHER = KeywordMatcher(MEDICAL_CONTENT_TERMS)
+
+
+def contains_medical_terms(text):
+    """Check if a piece of text mentions any of the medical content terms"""
+    return MEDICAL_CONTENT_MATCHER.contains_any(text)
+
+
+class StageTimer:
+    """Wall-clock timings for the named stages of a single request"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - start) * 1000))
+
+    def add(self, name, start):
+        """Record a stage that started at ``start`` (a perf_counter value) and ends now"""
+        self.stages.append((name, (time.perf_counter() - start) * 1000))
+
+    def total_ms(self):
+        return sum(ms for _, ms in self.stages)
+
+    def report(self):
+        """Format the timings as 'stage=12.3ms ... total=45.6ms'"""
+        parts = [f"{name}={ms:.1f}ms" for name, ms in self.stages]
+        parts.append(f"total={self.total_ms():.1f}ms")
+        return " ".join(parts)
+
+
+class PipelineStats:
+    """Aggregated per-stage timings across requests"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        with self._lock:
+            for name, ms in timer.stages + [("total", timer.total_ms())]:
+                samples = self._samples.setdefault(name, [])
+                samples.append(ms)
+                if len(samples) > self.window:
+                    del samples[0]
+
+    def snapshot(self):
+        """Return count, mean, p50 and p95 (in ms) for every stage seen so far"""
+        with self._lock:
+            report = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                report[name] = {
+                    'count': len(ordered),
+                    'mean_ms': round(sum(ordered) / len(ordered), 2),
+                    'p50_ms': round(ordered[len(ordered) // 2], 2),
+                    'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                }
+            return report
+
+
+class RetrievalPipeline:
+    """Retrieve once, gate on the retrieved chunks, then answer from the same chunks.
+
+    Replaces the old ``retriever.get_relevant_documents`` + ``create_retrieval_chain``
+    combination in ``/get``, which embedded the query and hit the vector store twice.
+    """
+
+    def __init__(self, vector_store, question_answer_chain, k=5, answer_cache=None, keyword_index=None,
+                 fetch_k=10, reranker=None, mmr_lambda=None, mmr_fetch_k=15, shards=None):
+        self.vector_store = vector_store
+        self.question_answer_chain = question_answer_chain
+        self.k = k
+        self.answer_cache = answer_cache
+        self.keyword_index = keyword_index
+        self.fetch_k = fetch_k
+        self.reranker = reranker
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_k = mmr_fetch_k
+        self.shards = shards
+        self.stats = PipelineStats()
+
+    def embed(self, query, timer=None):
+        """Embed the query once so retrieval and the answer cache share the vector"""
+        timer = timer or StageTimer()
+        with timer.stage("embed"):
+            return self.vector_store.embeddings.embed_query(query)
+
+    def retrieve(self, query, doc_id=None, timer=None, embedding=None):
+        """Fetch the top-k chunks for the query, optionally scoped to one document.
+
+        With a keyword index, ``fetch_k`` vector hits and ``fetch_k`` BM25 hits
+        are merged by reciprocal-rank fusion so exact drug names and lab
+        abbreviations are not lost to embedding similarity. With ``mmr_lambda``
+        the candidates are diversified by maximal marginal relevance, over the
+        embeddings the store returns with its hits, so overlapping chunks of the
+        same passage do not fill the prompt. With a
+        reranker, ``reranker.fetch_k`` candidates are re-scored and the best k kept.
+
+        Questions about an uploaded document held in ``shards`` are searched in
+        that document's in-memory shard instead of the filtered global index,
+        by vector only. With shards, unscoped questions never see uploaded
+        chunks: keyword hits are limited to the ingested corpus.
+        """
+        timer = timer or StageTimer()
+        if embedding is None:
+            embedding = self.embed(query, timer)
+        if self.reranker:
+            candidates = self.reranker.fetch_k
+        elif self.mmr_lambda is not None:
+            candidates = self.mmr_fetch_k
+        else:
+            candidates = self.k
+        search_kwargs = {"k": max(self.fetch_k, candidates) if self.keyword_index else candidates}
+        store = self.shards.get(doc_id) if doc_id and self.shards else None
+        sharded = store is not None
+        if store is None:
+            store = self.vector_store
+            if doc_id:
+                search_kwargs["filter"] = {"doc_id": doc_id}
+        known_vectors = {}
+        with timer.stage("retrieve"):
+            if self.mmr_lambda is not None and hasattr(store, 'similarity_search_with_vectors_by_vector'):
+                hits = store.similarity_search_with_vectors_by_vector(embedding, **search_kwargs)
+                docs = [doc for doc, _, _ in hits]
+                known_vectors = {content_key(doc): vector for doc, _, vector in hits}
+            else:
+                docs = store.similarity_search_by_vector(embedding, **search_kwargs)
+
+        if self.keyword_index is not None and not sharded:
+            with timer.stage("keyword"):
+                # Uploads are never indexed globally with shards on, rows an older build added are skipped
+                keyword_docs = self.keyword_index.search(query, k=search_kwargs["k"], doc_id=doc_id,
+                                                         corpus_only=self.shards is not None)
+            with timer.stage("fuse"):
+                docs = reciprocal_rank_fusion([docs, keyword_docs], candidates)
+
+        if self.mmr_lambda is not None and known_vectors:
+            # Only the vectors the store returned are used, chunk text is never embedded again here.
+            # Ahead of a reranker MMR only drops the most redundant half of the pool.
+            with timer.stage("mmr"):
+                vectors = candidate_vectors(docs, known_vectors)
+                keep = self.k if self.reranker is None else max(self.k, len(docs) // 2)
+                docs = diversify(embedding, docs, vectors, keep, self.mmr_lambda)
+
+        if self.reranker is None:
+            # MMR was skipped when the store returned no vectors, the pool is cut to k instead
+            return docs[:self.k]
+        with timer.stage("rerank"):
+            return self.reranker.rerank(query, docs, self.k)
+
+    def passes_relevance_gate(self, docs, timer=None):
+        """Check that at least one retrieved chunk is medical-related"""
+        timer = timer or StageTimer()
+        with timer.stage("gate"):
+            return contains_medical_terms("\n".join(doc.page_content for doc in docs))
+
+    def generate(self, query, docs, timer=None, embedding=None, cacheable=False, prompt_inputs=None):
+        """Run the stuff-documents chain over the already retrieved chunks.
+
+        ``prompt_inputs`` fills the prompt's other variables (history, health context).
+
+        When ``cacheable`` (no personal data in play) and an answer cache is set,
+        a stored answer for a near-identical question over the same chunks and
+        the same ``prompt_inputs`` is returned instead of calling the LLM, so
+        follow-up questions hit it too when the history matches. Answers from
+        the fallback model are not stored.
+        """
+        timer = timer or StageTimer()
+        use_cache = cacheable and self.answer_cache is not None and embedding is not None
+        if use_cache:
+            with timer.stage("answer_cache"):
+                cached = self.answer_cache.lookup(embedding, docs, prompt_inputs)
+            if cached is not None:
+                return cached
+
+        watch = FallbackWatch() if use_cache else None
+        with timer.stage("generate"):
+            answer = self.question_answer_chain.invoke({
+                **(prompt_inputs or {}),
+                "input": query,
+                "context": docs
+            }, config={"callbacks": [watch]} if watch else None)
+
+        if use_cache and not watch.used and contains_medical_terms(answer):
+            self.answer_cache.store(embedding, docs, answer, prompt_inputs)
+        return answer
+
+    def stream(self, query, docs, timer=None, embedding=None, cacheable=False, prompt_inputs=None):
+        """Like ``generate`` but yields the answer in pieces as the LLM produces them.
+
+        The LLM time is split into ``first_token`` (what the user waits for)
+        and ``stream`` (the rest of the completion). A cached answer is
+        yielded whole.
+        """
+        timer = timer or StageTimer()
+        use_cache = cacheable and self.answer_cache is not None and embedding is not None
+        if use_cache:
+            with timer.stage("answer_cache"):
+                cached = self.answer_cache.lookup(embedding, docs, prompt_inputs)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        watch = FallbackWatch() if use_cache else None
+        start = time.perf_counter()
+        for chunk in self.question_answer_chain.stream({**(prompt_inputs or {}), "input": query, "context": docs},
+                                                       config={"callbacks": [watch]} if watch else None):
+            if not chunk:
+                continue
+            if not parts:
+                timer.add("first_token", start)
+                start = time.perf_counter()
+            parts.append(chunk)
+            yield chunk
+        timer.add("stream" if parts else "generate", start)
+
+        answer = "".join(parts)
+        if use_cache and not watch.used and contains_medical_terms(answer):
+            self.answer_cache.store(embedding, docs, answer, prompt_inputs)
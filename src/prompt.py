@@ -1,5 +1,7 @@
+from functools import lru_cache
 from flask import session
 from src.database import get_db_connection
+from src.keyword_matcher import KeywordMatcher
 
 def get_user_health_info():
     """Retrieve user's health information from the database"""
@@ -59,16 +61,21 @@ def get_system_prompt():
     except RuntimeError:
         return get_base_prompt()
 
+@lru_cache(maxsize=256)
+def health_terms_matcher(terms):
+    """Matcher for a user's comma-separated symptoms or diseases, reused across their messages"""
+    return KeywordMatcher(terms.split(','))
+
 def customize_response(response, symptoms=None, diseases=None):
     """Customize the response based on user's health information"""
     if not symptoms and not diseases:
         return response
     
     # Add relevant health context to the response
-    if symptoms and any(symptom.lower() in response.lower() for symptom in symptoms.split(',')):
+    if symptoms and health_terms_matcher(symptoms).contains_any(response):
         response += "\nNote: Monitor these symptoms and consult your healthcare provider if they persist."
     
-    if diseases and any(disease.lower() in response.lower() for disease in diseases.split(',')):
+    if diseases and health_terms_matcher(diseases).contains_any(response):
         response += "\nNote: Please follow your healthcare provider's recommendations for this condition."
     
     return response
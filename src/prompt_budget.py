@@ -0,0 +1,133 @@
+import re
+import threading
+from src.reranker import estimate_tokens, fit_token_budget
+
+# Exchanges the session keeps verbatim; older ones survive only in the rolling summary
+RECENT_EXCHANGES = 5
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def format_exchanges(exchanges):
+    """Render exchanges as 'User: ...' / 'Assistant: ...' lines"""
+    lines = []
+    for exchange in exchanges:
+        lines.append(f"User: {exchange['user']}")
+        lines.append(f"Assistant: {exchange['assistant']}")
+    return "\n".join(lines)
+
+
+def compact_exchange(exchange, max_chars=160):
+    """One-line digest of an exchange: the question and the first sentence of the answer"""
+    answer = _SENTENCE_END.split(exchange['assistant'].strip(), maxsplit=1)[0]
+    line = f"- Asked: {exchange['user'].strip()} / Answered: {answer}"
+    return line if len(line) <= max_chars else line[:max_chars - 3].rstrip() + "..."
+
+
+def roll_summary(summary, exchanges, max_tokens):
+    """Append digests of ``exchanges`` to the summary, dropping its oldest lines beyond max_tokens"""
+    lines = [line for line in (summary or "").split("\n") if line]
+    lines.extend(compact_exchange(exchange) for exchange in exchanges)
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        del lines[0]
+    return "\n".join(lines)
+
+
+class PromptAssembler:
+    """Fit the pieces of a chat prompt into a token budget.
+
+    The system prompt, the user's health context and the question are always
+    sent. Of the remaining ``max_tokens``, conversation history gets up to
+    ``history_tokens``: the newest exchanges verbatim, older ones folded into a
+    rolling summary of at most ``summary_tokens``. Retrieved chunks get what is
+    left, in retrieval order (the best chunk is always kept).
+
+    Each call reports the tokens sent against what the untrimmed prompt (every
+    chunk, every held exchange verbatim) would have cost.
+    """
+
+    def __init__(self, system_prompt, max_tokens=2500, history_tokens=600, summary_tokens=150):
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.max_tokens = max_tokens
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+        self.compacted = 0
+        self.dropped_docs = 0
+
+    def _fit_history(self, history, summary):
+        """Newest exchanges that fit the history budget, and the summary with the rest folded in"""
+        recent, used = [], 0
+        for exchange in reversed(history):
+            tokens = estimate_tokens(format_exchanges([exchange]))
+            if used + tokens > self.history_tokens:
+                break
+            recent.insert(0, exchange)
+            used += tokens
+        overflow = history[:len(history) - len(recent)]
+        if overflow:
+            summary = roll_summary(summary, overflow, self.summary_tokens)
+        return recent, summary, len(overflow)
+
+    def assemble(self, query, docs, history=None, summary="", health_context=""):
+        """Return {'docs', 'inputs', 'report'}: the chunks to stuff, the extra prompt variables
+        ('history', 'health_context') and the token accounting for this request"""
+        history = history or []
+        recent, rolled, compacted = self._fit_history(history, summary)
+        history_text = format_exchanges(recent)
+        if rolled:
+            history_text = f"Earlier in the conversation:\n{rolled}" + (f"\n\n{history_text}" if recent else "")
+
+        fixed = self.system_tokens + estimate_tokens(query) + (estimate_tokens(health_context) if health_context else 0)
+        history_used = estimate_tokens(history_text) if history_text else 0
+        docs_budget = max(self.max_tokens - fixed - history_used, 1) if self.max_tokens else None
+        kept = fit_token_budget(docs, len(docs), docs_budget)
+
+        docs_used = sum(estimate_tokens(doc.page_content) for doc in kept)
+        baseline = (fixed + sum(estimate_tokens(doc.page_content) for doc in docs)
+                    + (estimate_tokens(format_exchanges(history)) if history else 0)
+                    + (estimate_tokens(summary) if summary else 0))
+        total = fixed + history_used + docs_used
+        report = {
+            'fixed': fixed,
+            'history': history_used,
+            'docs': docs_used,
+            'total': total,
+            'baseline': baseline,
+            'saved': max(baseline - total, 0),
+            'compacted_exchanges': compacted,
+            'dropped_docs': len(docs) - len(kept),
+        }
+        with self._lock:
+            self.requests += 1
+            self.tokens_sent += total
+            self.tokens_saved += report['saved']
+            self.compacted += compacted
+            self.dropped_docs += report['dropped_docs']
+        return {
+            'docs': kept,
+            'inputs': {'history': history_text or "(none)", 'health_context': health_context or "(none)"},
+            'report': report,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'tokens_sent': self.tokens_sent,
+                'tokens_saved': self.tokens_saved,
+                'mean_tokens_sent': round(self.tokens_sent / self.requests, 1) if self.requests else None,
+                'compacted_exchanges': self.compacted,
+                'dropped_docs': self.dropped_docs,
+            }
+
+
+def load_prompt_assembler(system_prompt):
+    """Create the prompt assembler from the PROMPT_* settings (PROMPT_MAX_TOKENS=0 sends every chunk)"""
+    from src import config
+
+    return PromptAssembler(system_prompt, max_tokens=config.PROMPT_MAX_TOKENS,
+                           history_tokens=config.PROMPT_HISTORY_TOKENS, summary_tokens=config.PROMPT_SUMMARY_TOKENS)
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+
+QUANTIZER_FILE = 'quantizer.npz'
+
+
+def kmeans(vectors, k, iterations=20, seed=0):
+    """Plain (Euclidean) k-means used to train the product-quantizer codebooks"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), k, replace=len(vectors) < k)].copy()
+    for _ in range(iterations):
+        distances = (vectors ** 2).sum(1)[:, None] - 2 * vectors @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assign = np.argmin(distances, axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if (~filled).any():
+            centroids[~filled] = vectors[rng.choice(len(vectors), int((~filled).sum()))]
+    return centroids
+
+
+class ScalarQuantizer:
+    """int8 scalar quantization: one byte per dimension with a per-dimension range"""
+
+    kind = 'sq8'
+
+    def __init__(self, low=None, scale=None):
+        self.low = low
+        self.scale = scale
+
+    @property
+    def code_size(self):
+        return len(self.low)
+
+    def train(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.low = vectors.min(axis=0)
+        self.scale = (vectors.max(axis=0) - self.low) / 255.0
+        self.scale[self.scale == 0] = 1.0
+        return self
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return np.clip(np.rint((vectors - self.low) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return codes.astype(np.float32) * self.scale + self.low
+
+    def scores(self, query, codes, block=65536):
+        """Asymmetric inner products: full-precision query against int8 codes"""
+        weights = query * self.scale
+        offset = float(query @ self.low)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), block):
+            out[start:start + block] = codes[start:start + block].astype(np.float32) @ weights + offset
+        return out
+
+    def state(self):
+        return {'low': self.low, 'scale': self.scale}
+
+
+class ProductQuantizer:
+    """Product quantization: ``m`` sub-vectors, each replaced by one of 256 centroids"""
+
+    kind = 'pq'
+
+    def __init__(self, m=48, codebooks=None):
+        self.m = m
+        self.codebooks = codebooks  # (m, 256, dim // m)
+
+    @property
+    def code_size(self):
+        return self.m
+
+    def _split(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[1] % self.m:
+            raise ValueError(f"Dimension {vectors.shape[1]} is not divisible into {self.m} sub-vectors")
+        return vectors.reshape(len(vectors), self.m, -1)
+
+    def train(self, vectors, iterations=20, seed=0):
+        parts = self._split(vectors)
+        self.codebooks = np.stack([
+            kmeans(parts[:, j, :], 256, iterations=iterations, seed=seed + j) for j in range(self.m)
+        ]).astype(np.float32)
+        return self
+
+    def encode(self, vectors, block=16384):
+        parts = self._split(vectors)
+        codes = np.empty((len(parts), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            book = self.codebooks[j]
+            for start in range(0, len(parts), block):
+                sub = parts[start:start + block, j, :]
+                distances = -2 * sub @ book.T + (book ** 2).sum(1)[None, :]
+                codes[start:start + block, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def decode(self, codes):
+        return np.concatenate([self.codebooks[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def scores(self, query, codes):
+        """Asymmetric distance computation via a (m, 256) query lookup table"""
+        table = np.einsum('jd,jkd->jk', query.reshape(self.m, -1), self.codebooks)
+        out = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.m):
+            out += table[j].take(codes[:, j])
+        return out
+
+    def state(self):
+        return {'m': np.array(self.m), 'codebooks': self.codebooks}
+
+
+def create_quantizer(kind, pq_subvectors=48):
+    if kind == 'sq8':
+        return ScalarQuantizer()
+    if kind == 'pq':
+        return ProductQuantizer(m=pq_subvectors)
+    raise ValueError(f"Unknown quantization '{kind}', expected 'sq8' or 'pq'")
+
+
+def save_quantizer(quantizer, path):
+    np.savez(os.path.join(path, QUANTIZER_FILE), kind=np.array(quantizer.kind), **quantizer.state())
+
+
+def load_quantizer(path):
+    """Load the quantizer stored with an index, or None if the index is not quantized"""
+    file_path = os.path.join(path, QUANTIZER_FILE)
+    if not os.path.exists(file_path):
+        return None
+    data = np.load(file_path)
+    if str(data['kind']) == 'sq8':
+        return ScalarQuantizer(low=data['low'], scale=data['scale'])
+    return ProductQuantizer(m=int(data['m']), codebooks=data['codebooks'])
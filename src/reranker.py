@@ -0,0 +1,113 @@
+import time
+import threading
+
+
+def estimate_tokens(text):
+    """Rough token count for English text (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def fit_token_budget(docs, k, max_tokens):
+    """Keep up to k docs in order while their combined size fits max_tokens (the first doc always fits)"""
+    kept, used = [], 0
+    for doc in docs:
+        if len(kept) == k:
+            break
+        tokens = estimate_tokens(doc.page_content)
+        if kept and max_tokens and used + tokens > max_tokens:
+            continue
+        kept.append(doc)
+        used += tokens
+    return kept
+
+
+class CrossEncoderReranker:
+    """Re-score over-fetched chunks with a small cross-encoder and keep the best few.
+
+    Query/chunk pairs are scored in batches. The ``budget_ms`` is enforced per
+    batch: a batch only starts if, at the cost per pair measured on earlier
+    batches, the pairs still unscored fit in what is left of the budget;
+    otherwise the scores are dropped and the retrieval order is used. A batch
+    already running is not interrupted, so one unexpectedly slow batch can
+    overrun the budget by its own duration, but once every batch has finished
+    its scores are always used.
+    """
+
+    def __init__(self, model_name, fetch_k=20, budget_ms=150, max_tokens=1200, batch_size=8, max_length=256):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        self.model_name = model_name
+        self.fetch_k = fetch_k
+        self.budget = budget_ms / 1000.0
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self.pair_seconds = None
+        self.reranked = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def _score(self, query, docs, deadline):
+        """Cross-encoder scores for each doc, or None if the rest could not be scored before the deadline"""
+        scores = []
+        for start in range(0, len(docs), self.batch_size):
+            remaining = deadline - time.monotonic()
+            pair_seconds = self.pair_seconds
+            if remaining <= 0 or (pair_seconds and (len(docs) - start) * pair_seconds > remaining):
+                return None
+            pairs = [(query, doc.page_content) for doc in docs[start:start + self.batch_size]]
+            batch_start = time.monotonic()
+            scores.extend(float(score) for score in self.model.predict(pairs, batch_size=self.batch_size))
+            cost = (time.monotonic() - batch_start) / len(pairs)
+            with self._lock:
+                # Moving average, so a single slow batch does not switch reranking off
+                self.pair_seconds = cost if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * cost
+        return scores
+
+    def rerank(self, query, docs, k):
+        """Best k docs by cross-encoder score within the token budget, or the retrieval order on timeout"""
+        if len(docs) <= 1:
+            return docs[:k]
+        deadline = time.monotonic() + self.budget
+        try:
+            scores = self._score(query, docs, deadline)
+        except Exception as e:
+            print(f"Rerank failed, keeping retrieval order: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return fit_token_budget(docs, k, self.max_tokens)
+
+        if scores is None:
+            with self._lock:
+                self.timeouts += 1
+            return fit_token_budget(docs, k, self.max_tokens)
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        with self._lock:
+            self.reranked += 1
+        return fit_token_budget([docs[i] for i in order], k, self.max_tokens)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model': self.model_name,
+                'reranked': self.reranked,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'ms_per_pair': round(self.pair_seconds * 1000, 2) if self.pair_seconds else None,
+            }
+
+
+def load_reranker():
+    """Load the cross-encoder configured by the RERANK_* settings, or None when reranking is off"""
+    from src import config
+
+    if not config.RERANK:
+        return None
+    return CrossEncoderReranker(
+        config.RERANK_MODEL,
+        fetch_k=config.RERANK_FETCH_K,
+        budget_ms=config.RERANK_BUDGET_MS,
+        max_tokens=config.RERANK_MAX_TOKENS
+    )
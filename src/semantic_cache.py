@@ -0,0 +1,92 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def documents_fingerprint(docs, inputs=None):
+    """Order-insensitive fingerprint of a retrieved document set and the other prompt inputs"""
+    keys = sorted(doc.id or hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest() for doc in docs)
+    keys.extend(f"{name}={value}" for name, value in sorted((inputs or {}).items()))
+    return hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()
+
+
+class SemanticAnswerCache:
+    """Serve stored answers for near-identical questions over the same retrieved chunks.
+
+    An entry matches when the fingerprint of the retrieved documents and the
+    other prompt ``inputs`` (conversation history...) is identical and the
+    cosine similarity between query embeddings is at least ``threshold``.
+    Entries expire after ``ttl`` seconds and the least recently used are
+    evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (fingerprint, unit vector, answer, created_at)
+        self._by_fingerprint = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _drop(self, key):
+        fingerprint = self._entries.pop(key)[0]
+        keys = self._by_fingerprint[fingerprint]
+        keys.discard(key)
+        if not keys:
+            del self._by_fingerprint[fingerprint]
+
+    def lookup(self, embedding, docs, inputs=None):
+        """Return a cached answer or None"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        fingerprint = documents_fingerprint(docs, inputs)
+        now = time.time()
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for key in list(self._by_fingerprint.get(fingerprint, ())):
+                _, cached, _, created_at = self._entries[key]
+                if now - created_at > self.ttl:
+                    self._drop(key)
+                    self.expired += 1
+                    continue
+                score = float(cached @ vector)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][2]
+
+    def store(self, embedding, docs, answer, inputs=None):
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        fingerprint = documents_fingerprint(docs, inputs)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (fingerprint, vector, answer, time.time())
+            self._by_fingerprint.setdefault(fingerprint, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class DocumentShard:
+    """Chunks and unit-normalized vectors of one uploaded document, searched by brute force.
+
+    Exposes the same search methods as the vector stores so the chat pipeline
+    can query it in place of the global index.
+    """
+
+    def __init__(self, doc_id, docs, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.doc_id = doc_id
+        self.docs = list(docs)
+        self.vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        self.last_used = time.monotonic()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def similarity_search_with_vectors_by_vector(self, embedding, k=4, **kwargs):
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = self.vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        top = np.argsort(-scores)[:k]
+        return [(self.docs[i], float(scores[i]), self.vectors[i]) for i in top]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _, _ in self.similarity_search_with_vectors_by_vector(embedding, k)]
+
+    def leading_chunks(self, k):
+        """The first k chunks in document order"""
+        return self.docs[:k]
+
+
+class SessionShards:
+    """Uploaded documents kept in process memory, keyed by doc_id.
+
+    A shard is dropped after ``ttl`` seconds without a query, and the least
+    recently used shards go first once more than ``max_chunks`` chunks are
+    held. ``on_evict(doc_id)`` is called for every expired or evicted shard
+    (not for explicit deletes) so callers can release related state.
+    """
+
+    def __init__(self, ttl=7200, max_chunks=20000, on_evict=None):
+        self.ttl = ttl
+        self.max_chunks = max_chunks
+        self.on_evict = on_evict
+        self._shards = OrderedDict()
+        self._chunks = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _pop(self, doc_id):
+        shard = self._shards.pop(doc_id)
+        self._chunks -= len(shard)
+        return shard
+
+    def _sweep(self):
+        """Drop expired and over-budget shards (caller holds the lock), return their doc_ids"""
+        now = time.monotonic()
+        dropped = [doc_id for doc_id, shard in self._shards.items() if now - shard.last_used > self.ttl]
+        for doc_id in dropped:
+            self._pop(doc_id)
+        while self._chunks > self.max_chunks and len(self._shards) > 1:
+            dropped.append(self._pop(next(iter(self._shards))).doc_id)
+        self.evicted += len(dropped)
+        return dropped
+
+    def _notify(self, dropped):
+        for doc_id in dropped:
+            print(f"Dropped session shard for doc_id: {doc_id}")
+            if self.on_evict:
+                try:
+                    self.on_evict(doc_id)
+                except Exception as e:
+                    print(f"Error releasing doc_id {doc_id}: {str(e)}")
+
+    def add(self, doc_id, docs, vectors):
+        shard = DocumentShard(doc_id, docs, vectors)
+        with self._lock:
+            if doc_id in self._shards:
+                self._pop(doc_id)
+            self._shards[doc_id] = shard
+            self._chunks += len(shard)
+            dropped = self._sweep()
+        self._notify(dropped)
+        return shard
+
+    def get(self, doc_id):
+        """The document's shard (refreshing its idle timer), or None if it is not held here"""
+        with self._lock:
+            dropped = self._sweep()
+            shard = self._shards.get(doc_id)
+            if shard is None:
+                self.misses += 1
+            else:
+                shard.last_used = time.monotonic()
+                self._shards.move_to_end(doc_id)
+                self.hits += 1
+        self._notify(dropped)
+        return shard
+
+    def delete(self, doc_id):
+        with self._lock:
+            if doc_id in self._shards:
+                self._pop(doc_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._shards),
+                'chunks': self._chunks,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+            }
+
+
+def load_session_shards(on_evict=None):
+    """Create the shard pool configured by the SESSION_SHARD_* settings, or None to keep uploads in the global index"""
+    from src import config
+
+    if not config.SESSION_SHARDS:
+        return None
+    return SessionShards(ttl=config.SESSION_SHARD_TTL, max_chunks=config.SESSION_SHARD_MAX_CHUNKS,
+                         on_evict=on_evict)
@@ -0,0 +1,205 @@
+import json
+import hashlib
+import threading
+from concurrent.futures import Future, wait
+from typing import Any
+from langchain_core.language_models.chat_models import BaseChatModel
+
+
+def request_key(*parts):
+    """Stable hash of JSON-serializable request parts (messages, model parameters...)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class SharedCallTimeout(TimeoutError):
+    """A follower heard nothing from the leader's call within the single-flight timeout"""
+
+
+class _Stream:
+    """Chunks of an in-flight streamed call, replayed and then followed by every caller"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def follow(self, timeout=None):
+        """Yield the chunks; raises SharedCallTimeout if none arrives within ``timeout`` seconds"""
+        sent = 0
+        while True:
+            with self.cond:
+                if not self.cond.wait_for(lambda: len(self.chunks) > sent or self.done, timeout):
+                    raise SharedCallTimeout(f"Shared LLM stream produced nothing for {timeout:g}s")
+                new_chunks, sent, done, error = self.chunks[sent:], len(self.chunks), self.done, self.error
+            yield from new_chunks
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one upstream call.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    with the same key while it is in flight wait for and share its result or
+    exception. Nothing is kept once the call completes, so this is not a cache.
+    A follower that hears nothing from the leader for ``timeout`` seconds
+    stops waiting and makes the call itself (a stream only if it has not
+    received any chunk yet).
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.upstream = 0
+        self.collapsed = 0
+        self.follower_timeouts = 0
+
+    def _timed_out(self, key):
+        print(f"Shared LLM call {key[:12]} gave nothing for {self.timeout:g}s, calling the LLM directly")
+        with self._lock:
+            self.follower_timeouts += 1
+            self.upstream += 1
+
+    def do(self, key, fn):
+        with self._lock:
+            self.requests += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.upstream += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            # Waited on separately: the leader's own error may be a TimeoutError (LLMDeadlineExceeded)
+            if not wait([future], timeout=self.timeout).done:
+                self._timed_out(key)
+                return fn()
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(self, key, fn):
+        """Like ``do`` for a call returning an iterator: followers receive the leader's chunks
+        (those already produced first) as they arrive"""
+        with self._lock:
+            self.requests += 1
+            shared = self._streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._streams[key] = _Stream()
+                self.upstream += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            received = False
+            try:
+                for chunk in shared.follow(self.timeout):
+                    received = True
+                    yield chunk
+                return
+            except SharedCallTimeout:
+                if received:
+                    raise
+            self._timed_out(key)
+            yield from fn()
+            return
+
+        try:
+            for chunk in fn():
+                with shared.cond:
+                    shared.chunks.append(chunk)
+                    shared.cond.notify_all()
+                yield chunk
+        except GeneratorExit:
+            # The leader's consumer went away (e.g. client disconnect) before the stream finished
+            shared.error = RuntimeError("Shared LLM stream was abandoned before completion")
+            raise
+        except BaseException as e:
+            shared.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with shared.cond:
+                shared.done = True
+                shared.cond.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'upstream_calls': self.upstream,
+                'collapsed': self.collapsed,
+                'follower_timeouts': self.follower_timeouts,
+                'in_flight': len(self._calls) + len(self._streams),
+            }
+
+
+def _load_flight():
+    from src import config
+
+    return SingleFlight(timeout=config.SINGLE_FLIGHT_TIMEOUT or None)
+
+
+# Shared by every LLM call site so /metrics reports one set of numbers
+llm_flight = _load_flight()
+
+
+class SingleFlightChatModel(BaseChatModel):
+    """Chat model wrapper that shares one upstream call between concurrent identical prompts"""
+
+    model: BaseChatModel
+    flight: Any = None
+
+    @property
+    def _llm_type(self):
+        return f"single-flight-{self.model._llm_type}"
+
+    def _key(self, messages, stop, kwargs):
+        return request_key(
+            self.model._identifying_params,
+            [(message.type, message.content) for message in messages],
+            stop,
+            kwargs
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return (self.flight or llm_flight).do(
+            self._key(messages, stop, kwargs),
+            lambda: self.model._generate(messages, stop=stop, **kwargs)
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in (self.flight or llm_flight).stream(
+            self._key(messages, stop, kwargs),
+            lambda: self.model._stream(messages, stop=stop, **kwargs)
+        ):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def with_single_flight(model):
+    """Wrap a chat model so identical in-flight prompts are coalesced (SINGLE_FLIGHT=0 disables)"""
+    from src import config
+
+    if not config.SINGLE_FLIGHT:
+        return model
+    return SingleFlightChatModel(model=model)
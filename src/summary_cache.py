@@ -0,0 +1,114 @@
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+def prompt_version(*parts):
+    """Short fingerprint of the prompts and model a summary was generated with"""
+    return hashlib.sha256("\n\x00".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def document_key(file_bytes, version):
+    """Cache key for an uploaded file: SHA-256 of its bytes, scoped to the prompt version"""
+    return f"{hashlib.sha256(file_bytes).hexdigest()}:{version}"
+
+
+class SummaryCache:
+    """Content-addressed store of document summaries in SQLite.
+
+    Keyed by ``document_key`` so re-uploading the same PDF (which gets a new
+    doc_id) reuses the earlier analysis. Entries older than ``ttl`` seconds
+    are ignored and removed; beyond ``max_entries`` the least recently used go.
+    """
+
+    def __init__(self, db_path, max_entries=500, ttl=30 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        conn = self._connect()
+        try:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                comprehensive_analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_document_summaries_last_used "
+                         "ON document_summaries (last_used)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def get(self, key):
+        """The stored {'summary', 'comprehensive_analysis'} for the key, or None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT summary, comprehensive_analysis FROM document_summaries WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE document_summaries SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error reading summary cache: {e}")
+            row = None
+        finally:
+            conn.close()
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return {'summary': row[0], 'comprehensive_analysis': row[1]} if row else None
+
+    def put(self, key, result):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO document_summaries "
+                "(key, summary, comprehensive_analysis, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, result['summary'], result['comprehensive_analysis'], now, now)
+            )
+            conn.execute("DELETE FROM document_summaries WHERE created_at <= ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM document_summaries WHERE key NOT IN "
+                "(SELECT key FROM document_summaries ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error persisting summary: {e}")
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM document_summaries").fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+
+def load_summary_cache():
+    """Open the summary cache at SUMMARY_CACHE_PATH, or None when it is disabled"""
+    from src import config
+
+    if not config.SUMMARY_CACHE_PATH or config.SUMMARY_CACHE_SIZE <= 0:
+        return None
+    return SummaryCache(config.SUMMARY_CACHE_PATH, max_entries=config.SUMMARY_CACHE_SIZE,
+                        ttl=config.SUMMARY_CACHE_TTL)
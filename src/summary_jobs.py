@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class SummaryJob:
+    """A document summary being generated in the background.
+
+    The producer appends analysis text as it is written and finishes with the
+    result dict; readers follow the text live until the result is in.
+    """
+
+    def __init__(self, doc_id):
+        self.doc_id = doc_id
+        self.status = 'queued'
+        self.parts = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cond = threading.Condition()
+
+    def start(self):
+        with self._cond:
+            self.status = 'running'
+            self.started = time.time()
+
+    def append(self, text):
+        with self._cond:
+            self.parts.append(text)
+            self._cond.notify_all()
+
+    def finish(self, result):
+        with self._cond:
+            self.status, self.result, self.finished = 'done', result, time.time()
+            self._cond.notify_all()
+
+    def fail(self, error):
+        with self._cond:
+            self.status, self.error, self.finished = 'failed', str(error), time.time()
+            self._cond.notify_all()
+
+    def follow(self, timeout=None):
+        """Yield ('analysis', text) pieces as they are generated (starting with what exists so far),
+        then ('done', result). Raises RuntimeError if the job fails and TimeoutError after timeout."""
+        deadline = time.monotonic() + timeout if timeout else None
+        sent = 0
+        while True:
+            with self._cond:
+                while len(self.parts) == sent and self.status in ACTIVE_STATES:
+                    remaining = deadline - time.monotonic() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"Summary for {self.doc_id} is still {self.status}")
+                    self._cond.wait(remaining)
+                new_parts, sent, status = self.parts[sent:], len(self.parts), self.status
+            for text in new_parts:
+                yield 'analysis', text
+            if status == 'done':
+                yield 'done', self.result
+                return
+            if status == 'failed':
+                raise RuntimeError(self.error)
+
+    def describe(self):
+        with self._cond:
+            now = time.time()
+            return {
+                'doc_id': self.doc_id,
+                'status': self.status,
+                'queued_ms': round(((self.started or now) - self.created) * 1000),
+                'running_ms': round(((self.finished or now) - self.started) * 1000) if self.started else 0,
+                'analysis_chars': sum(len(part) for part in self.parts),
+                'error': self.error,
+            }
+
+
+class SummaryJobs:
+    """Bounded pool that precomputes document summaries, one job per doc_id.
+
+    ``summarize(*args)`` must yield ('analysis', text) pieces and finally
+    ('done', result). At most ``max_workers`` summaries run at once; when
+    ``max_queued`` jobs are already waiting new uploads are not queued and their
+    summary is generated on request instead. Finished jobs are kept for
+    ``ttl`` seconds. The pool is created lazily so it survives gunicorn forking.
+    """
+
+    def __init__(self, summarize, max_workers=2, max_queued=16, ttl=3600):
+        self.summarize = summarize
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="summary")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _prune(self):
+        now = time.time()
+        for doc_id in [d for d, job in self._jobs.items() if job.finished and now - job.finished > self.ttl]:
+            del self._jobs[doc_id]
+
+    def _run(self, job, args):
+        job.start()
+        try:
+            for kind, payload in self.summarize(*args):
+                if kind == 'analysis':
+                    job.append(payload)
+                elif kind == 'done':
+                    job.finish(payload)
+            if job.status != 'done':
+                raise RuntimeError("Summary generator ended without a result")
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"Background summary failed for doc_id {job.doc_id}: {str(e)}")
+            job.fail(e)
+            with self._lock:
+                self.failed += 1
+
+    def submit(self, doc_id, *args):
+        """Queue summarize(*args) as the document's job; returns the job, or None if the queue is full"""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(doc_id)
+            if job is not None and job.status != 'failed':
+                return job
+            queued = sum(1 for other in self._jobs.values() if other.status == 'queued')
+            if queued >= self.max_queued:
+                self.rejected += 1
+                return None
+            job = SummaryJob(doc_id)
+            self._jobs[doc_id] = job
+            self._executor().submit(self._run, job, args)
+            return job
+
+    def get(self, doc_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(doc_id)
+
+    def discard(self, doc_id):
+        """Forget the document's job (a running one still finishes, its result is dropped)"""
+        with self._lock:
+            self._jobs.pop(doc_id, None)
+
+    def stats(self):
+        with self._lock:
+            states = [job.status for job in self._jobs.values()]
+            return {
+                'workers': self.max_workers,
+                'queued': states.count('queued'),
+                'running': states.count('running'),
+                'done': states.count('done'),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+
+def load_summary_jobs(summarize):
+    """Create the background summary pool from the SUMMARY_* settings, or None when SUMMARY_WORKERS is 0"""
+    from src import config
+
+    if config.SUMMARY_WORKERS <= 0:
+        return None
+    return SummaryJobs(summarize, max_workers=config.SUMMARY_WORKERS, max_queued=config.SUMMARY_MAX_QUEUED,
+                       ttl=config.SUMMARY_RESULT_TTL)
@@ -0,0 +1,90 @@
+import os
+import threading
+import numpy as np
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def fit_logistic(X, y, l2=1e-3, lr=0.5, epochs=500):
+    """L2-regularized logistic regression by batch gradient descent, y=1 means off-topic"""
+    X = _unit(X)
+    y = np.asarray(y, dtype=np.float32)
+    weights = np.zeros(X.shape[1], dtype=np.float32)
+    bias = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(X @ weights + bias)))
+        error = p - y
+        weights -= lr * (X.T @ error / len(y) + l2 * weights)
+        bias -= lr * float(error.mean())
+    return weights, bias
+
+
+def fit_centroids(X, y):
+    """Nearest-centroid model expressed as a linear scorer: cos(off-topic) - cos(medical)"""
+    X = _unit(X)
+    y = np.asarray(y)
+    off_topic = _unit(X[y == 1].mean(axis=0))
+    medical = _unit(X[y == 0].mean(axis=0))
+    return off_topic - medical, 0.0
+
+
+class TopicGate:
+    """Decide from the query embedding alone whether a question is off-topic.
+
+    The model is linear in the normalized embedding (logistic regression or
+    nearest centroid) so a check costs one 384-dim dot product. Parameters and
+    the calibrated threshold come from extra/calibrate_topic_gate.py.
+    """
+
+    def __init__(self, weights, bias, threshold, kind='logistic'):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.kind = kind
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = 0
+
+    def score(self, embedding):
+        """Off-topic score: a probability for logistic models, a cosine margin for centroids"""
+        raw = float(_unit(embedding) @ self.weights + self.bias)
+        if self.kind == 'logistic':
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def is_off_topic(self, embedding):
+        off_topic = self.score(embedding) >= self.threshold
+        with self._lock:
+            self.checked += 1
+            self.rejected += int(off_topic)
+        return off_topic
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, threshold=self.threshold, kind=self.kind)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['weights'], float(data['bias']), float(data['threshold']), str(data['kind']))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'threshold': round(self.threshold, 4),
+                'checked': self.checked,
+                'rejected': self.rejected,
+            }
+
+
+def load_topic_gate():
+    """Load the calibrated gate from TOPIC_GATE_PATH, or None if it has not been calibrated"""
+    from src import config
+
+    if not config.TOPIC_GATE_PATH or not os.path.exists(config.TOPIC_GATE_PATH):
+        return None
+    return TopicGate.load(config.TOPIC_GATE_PATH)
@@ -0,0 +1,89 @@
+import re
+import time
+import zlib
+from typing import List
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class WordEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedder: each word maps to a fixed random unit vector"""
+
+    def __init__(self, dim=32):
+        self.dim = dim
+        self.calls = 0
+
+    def _word(self, word):
+        vector = np.random.default_rng(zlib.crc32(word.encode('utf-8'))).standard_normal(self.dim)
+        return vector / np.linalg.norm(vector)
+
+    def _embed(self, text):
+        vector = sum((self._word(word) for word in re.findall(r"\w+", text.lower())), np.zeros(self.dim))
+        return (vector / max(np.linalg.norm(vector), 1e-12)).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._embed(text)
+
+
+@pytest.fixture
+def embeddings():
+    return WordEmbeddings()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model answering ``text`` after ``delays[n]`` seconds on its n-th call (the last delay repeats)"""
+
+    delays: List[float] = [0.0]
+    text: str = "answer"
+    fail: bool = False
+    calls: List[float] = []
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def _begin(self):
+        delay = self.delays[min(len(self.calls), len(self.delays) - 1)]
+        self.calls.append(delay)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        return delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay = self._begin()
+        try:
+            time.sleep(delay)
+            if self.fail:
+                raise RuntimeError(f"{self.text} failed")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+        finally:
+            self.active -= 1
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        delay = self._begin()
+        try:
+            time.sleep(delay)
+            if self.fail:
+                raise RuntimeError(f"{self.text} failed")
+            for word in self.text.split():
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def scripted_model():
+    def make(delays=(0.0,), text="answer", fail=False):
+        return ScriptedChatModel(delays=list(delays), text=text, fail=fail, calls=[])
+    return make
@@ -0,0 +1,73 @@
+import numpy as np
+from src.ann_index import IVFIndex, train_kmeans
+from src.local_store import LocalVectorStore, normalize_rows
+
+
+def clustered_vectors(count, dim=16, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return normalize_rows(centers[rng.integers(clusters, size=count)] + 0.1 * rng.standard_normal((count, dim)))
+
+
+def vector_store(tmp_path, embeddings, count=400, **kwargs):
+    store = LocalVectorStore(embeddings, str(tmp_path / "index"), **kwargs)
+    vectors = clustered_vectors(count)
+    ids = [f"c{i}" for i in range(count)]
+    store.add_vectors(vectors, ids, [{'doc_id': f"d{i % 4}"} for i in range(count)], ids)
+    return store, vectors
+
+
+def test_train_kmeans_returns_unit_centroids():
+    centroids = train_kmeans(clustered_vectors(200), 8)
+    assert centroids.shape == (8, 16)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+
+def test_probing_every_list_matches_exact_search(tmp_path, embeddings):
+    store, vectors = vector_store(tmp_path, embeddings, ann_min_rows=0)
+    store.build_ann(nlist=8)
+    assert store.ann.nlist == 8
+    assert len(store.ann) == len(vectors)
+
+    for query in vectors[:20]:
+        exact = [doc.id for doc in store.similarity_search_by_vector(query, k=5, exact=True)]
+        probed = [doc.id for doc in store.similarity_search_by_vector(query, k=5, nprobe=8)]
+        assert probed == exact
+
+
+def test_small_nprobe_keeps_recall(tmp_path, embeddings):
+    store, vectors = vector_store(tmp_path, embeddings, ann_min_rows=0)
+    store.build_ann(nlist=8)
+
+    found = 0
+    for query in vectors[:50]:
+        exact = {doc.id for doc in store.similarity_search_by_vector(query, k=10, exact=True)}
+        probed = {doc.id for doc in store.similarity_search_by_vector(query, k=10, nprobe=2)}
+        found += len(exact & probed)
+    assert found / 500 >= 0.9
+
+
+def test_index_builds_at_threshold_and_tracks_writes(tmp_path, embeddings):
+    store, vectors = vector_store(tmp_path, embeddings, ann_min_rows=300)
+    assert store.ann.is_trained
+
+    extra = clustered_vectors(10, seed=1)
+    ids = [f"n{i}" for i in range(10)]
+    store.add_vectors(extra, ids, [{} for _ in ids], ids)
+    assert len(store.ann) == len(vectors) + 10
+    assert store.similarity_search_by_vector(extra[3], k=1, nprobe=1)[0].id == 'n3'
+
+    store.delete(filter={'doc_id': 'd0'})
+    store.compact()
+    assert len(store.ann) == len(store) == len(vectors) - 100 + 10
+    assert all(doc.metadata.get('doc_id') != 'd0'
+               for doc in store.similarity_search_by_vector(vectors[0], k=20, nprobe=8))
+
+
+def test_index_reloads_without_retraining(tmp_path, embeddings):
+    store, vectors = vector_store(tmp_path, embeddings, ann_min_rows=0)
+    store.build_ann(nlist=8)
+
+    index = IVFIndex(store.path, nprobe=3)
+    assert index.nlist == 8
+    assert np.array_equal(np.sort(index.candidates(vectors[0])), np.sort(store.ann.candidates(vectors[0], 3)))
@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.embedding_batcher import BatchingEmbeddings
+
+
+class RecordingEmbeddings:
+    """Records every batch it is asked to embed, optionally blocking until released"""
+
+    def __init__(self, base, gate=None):
+        self.base = base
+        self.gate = gate
+        self.batches = []
+        self.direct = []
+
+    def embed_documents(self, texts):
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append(list(texts))
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.direct.append(text)
+        return self.base.embed_query(text)
+
+
+def test_concurrent_queries_share_a_batch(embeddings):
+    base = RecordingEmbeddings(embeddings)
+    batcher = BatchingEmbeddings(base, max_batch_size=8, max_wait_ms=200)
+    texts = [f"question {i}" for i in range(8)]
+
+    with ThreadPoolExecutor(8) as pool:
+        vectors = list(pool.map(batcher.embed_query, texts))
+
+    assert vectors == [embeddings.embed_query(text) for text in texts]
+    assert len(base.batches) < len(texts)
+    assert sorted(text for batch in base.batches for text in batch) == sorted(texts)
+    stats = batcher.stats()
+    assert stats['texts'] == 8 and stats['largest_batch'] <= 8 and stats['fallbacks'] == 0
+
+
+def test_batch_errors_reach_the_caller(embeddings):
+    class Failing(RecordingEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("model unavailable")
+
+    batcher = BatchingEmbeddings(Failing(embeddings), max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        batcher.embed_query("anemia")
+
+
+def test_stuck_worker_falls_back_to_a_direct_embed(embeddings):
+    gate = threading.Event()
+    base = RecordingEmbeddings(embeddings, gate=gate)
+    batcher = BatchingEmbeddings(base, max_wait_ms=1, timeout=0.1)
+
+    started = time.monotonic()
+    vector = batcher.embed_query("thyroid")
+    assert time.monotonic() - started < 2
+    assert vector == embeddings.embed_query("thyroid")
+    assert base.direct == ["thyroid"]
+    assert batcher.stats()['fallbacks'] == 1
+
+    # The late batch result lands on a cancelled future without killing the worker
+    gate.set()
+    assert batcher.embed_query("insulin") == embeddings.embed_query("insulin")
+    assert base.direct == ["thyroid"]
+    assert batcher._worker.is_alive()
+
+
+def test_documents_bypass_the_queue(embeddings):
+    base = RecordingEmbeddings(embeddings)
+    batcher = BatchingEmbeddings(base)
+
+    assert batcher.embed_documents(["a", "b"]) == embeddings.embed_documents(["a", "b"])
+    assert batcher._worker is None
@@ -0,0 +1,87 @@
+import sqlite3
+import time
+import numpy as np
+from src.embedding_cache import CachedEmbeddings, normalize_query
+
+
+def test_normalized_queries_share_an_entry(embeddings):
+    cache = CachedEmbeddings(embeddings)
+    first = cache.embed_query("What is  Anemia?")
+    second = cache.embed_query("what is anemia?")
+
+    assert first == second
+    assert embeddings.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_memory_tier_evicts_least_recently_used(embeddings):
+    cache = CachedEmbeddings(embeddings, max_size=2)
+    cache.embed_query("a")
+    cache.embed_query("b")
+    cache.embed_query("a")
+    cache.embed_query("c")
+    calls = embeddings.calls
+
+    cache.embed_query("a")
+    assert embeddings.calls == calls
+    cache.embed_query("b")
+    assert embeddings.calls == calls + 1
+
+
+def test_disk_tier_survives_a_new_instance_without_storing_the_text(tmp_path, embeddings):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    vector = CachedEmbeddings(embeddings, db_path=db_path).embed_query("my hba1c is 9 percent")
+    calls = embeddings.calls
+
+    reopened = CachedEmbeddings(embeddings, db_path=db_path)
+    assert np.allclose(reopened.embed_query("My HbA1c is 9 percent"), vector, atol=1e-6)
+    assert embeddings.calls == calls
+    assert reopened.stats()['disk_hits'] == 1
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT digest FROM query_vectors").fetchall()
+    conn.close()
+    assert len(rows) == 1
+    assert normalize_query("my hba1c is 9 percent") not in rows[0][0]
+    assert 'hba1c' not in rows[0][0]
+
+
+def test_disk_tier_keeps_at_most_max_disk_entries(tmp_path, embeddings):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    cache = CachedEmbeddings(embeddings, max_size=1, db_path=db_path, max_disk_entries=3)
+    for query in ("one", "two", "three", "four", "five"):
+        cache.embed_query(query)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM query_vectors").fetchone()[0] == 3
+    conn.close()
+    calls = embeddings.calls
+    CachedEmbeddings(embeddings, max_size=1, db_path=db_path).embed_query("one")
+    assert embeddings.calls == calls + 1
+
+
+def test_disk_entries_expire_after_ttl(tmp_path, embeddings):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    CachedEmbeddings(embeddings, db_path=db_path, disk_ttl=0.05).embed_query("fever")
+    time.sleep(0.1)
+    calls = embeddings.calls
+
+    cache = CachedEmbeddings(embeddings, db_path=db_path, disk_ttl=0.05)
+    cache.embed_query("fever")
+    assert embeddings.calls == calls + 1
+    assert cache.stats()['disk_hits'] == 0
+
+
+def test_plaintext_table_from_older_builds_is_dropped(tmp_path, embeddings):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE query_embeddings (namespace TEXT, query TEXT, vector BLOB)")
+    conn.execute("INSERT INTO query_embeddings VALUES ('all-MiniLM-L6-v2', 'my lab results', x'00')")
+    conn.commit()
+    conn.close()
+
+    CachedEmbeddings(embeddings, db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert 'query_embeddings' not in tables
@@ -0,0 +1,63 @@
+from langchain_core.documents import Document
+from src import config
+from src.keyword_index import KeywordIndex, load_keyword_index, query_terms, reciprocal_rank_fusion
+
+CORPUS = [
+    "Metformin 500mg is a first-line treatment for type 2 diabetes.",
+    "An HbA1c above 6.5 percent indicates diabetes.",
+    "Iron deficiency is the most common cause of anemia.",
+]
+
+
+def make_index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keywords.sqlite"))
+    index.add_documents([Document(page_content=text, metadata={'source': 'corpus'}) for text in CORPUS])
+    return index
+
+
+def test_query_terms_drop_stopwords_and_keep_lab_tokens():
+    assert query_terms("What is my HbA1c and 500mg dose?") == ['hba1c', '500mg', 'dose']
+
+
+def test_search_ranks_exact_terms_and_round_trips_metadata(tmp_path):
+    index = make_index(tmp_path)
+
+    docs = index.search("what does metformin do", k=2)
+    assert [doc.page_content for doc in docs] == [CORPUS[0]]
+    assert docs[0].metadata == {'source': 'corpus'}
+    assert index.search("HbA1c")[0].page_content == CORPUS[1]
+    assert index.search("what is the") == []
+    assert len(index) == 3
+
+
+def test_doc_id_scoping_and_delete(tmp_path):
+    index = make_index(tmp_path)
+    index.add_documents([Document(page_content="Report: hba1c 7.2 percent", metadata={'doc_id': 'u1'}, id='u1-0')])
+
+    assert [doc.id for doc in index.search("hba1c", doc_id='u1')] == ['u1-0']
+    assert len(index.search("hba1c")) == 2
+    assert [doc.page_content for doc in index.search("hba1c", corpus_only=True)] == [CORPUS[1]]
+
+    index.delete('u1')
+    assert index.search("hba1c", doc_id='u1') == []
+    assert len(index) == 3
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(page_content=text) for text in ("a", "b", "c"))
+
+    fused = reciprocal_rank_fusion([[a, b], [Document(page_content="b"), c]], k=3)
+    assert [doc.page_content for doc in fused] == ["b", "a", "c"]
+    assert len(reciprocal_rank_fusion([[a, b], [c]], k=2)) == 2
+
+
+def test_load_keyword_index_skips_an_empty_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'HYBRID_RETRIEVAL', True)
+    monkeypatch.setattr(config, 'KEYWORD_INDEX_PATH', str(tmp_path / "keywords.sqlite"))
+    assert load_keyword_index() is None
+
+    make_index(tmp_path)
+    assert len(load_keyword_index()) == 3
+
+    monkeypatch.setattr(config, 'HYBRID_RETRIEVAL', False)
+    assert load_keyword_index() is None
@@ -0,0 +1,53 @@
+import pytest
+from src.keyword_matcher import KeywordMatcher
+from src.keywords import MEDICAL_KEYWORDS
+
+
+def test_prefix_mode_matches_at_word_starts_only():
+    matcher = KeywordMatcher(['ct', 'health'])
+
+    assert matcher.contains_any("Book a CT scan")
+    assert matcher.contains_any("healthcare costs")
+    assert not matcher.contains_any("see a doctor")
+
+
+def test_word_mode_matches_whole_words_only():
+    matcher = KeywordMatcher(['test', 'blood test'], boundary='word')
+
+    assert matcher.matched_keywords("a blood test today") == {'blood test'}
+    assert matcher.contains_any("one more test.")
+    assert not matcher.contains_any("three tests")
+    assert not matcher.contains_any("a contest")
+
+
+@pytest.mark.parametrize("text", ["coding in c++ daily", "i like c++", "c++, rust"])
+def test_word_mode_matches_keywords_ending_in_punctuation(text):
+    assert KeywordMatcher(['c++'], boundary='word').contains_any(text)
+
+
+def test_word_mode_rejects_keywords_ending_in_punctuation_inside_a_word():
+    matcher = KeywordMatcher(['covid-'], boundary='word')
+
+    assert matcher.contains_any("covid- positive")
+    assert not matcher.contains_any("covid-19")
+
+
+def test_substring_mode_matches_anywhere():
+    assert KeywordMatcher(['ct'], boundary='substring').contains_any("doctor")
+
+
+def test_longest_keyword_wins_at_a_position():
+    matcher = KeywordMatcher(['insulin', 'insulin pump'])
+
+    assert matcher.find_all("my insulin pump broke") == [(3, 15, 'insulin pump')]
+
+
+def test_empty_keyword_list_never_matches():
+    assert not KeywordMatcher([]).contains_any("anything at all")
+
+
+def test_medical_keywords_flag_health_questions():
+    matcher = KeywordMatcher(MEDICAL_KEYWORDS)
+
+    assert matcher.contains_any("what are symptoms of diabetes")
+    assert not matcher.contains_any("recommend a good movie for tonight")
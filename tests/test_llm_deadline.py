@@ -0,0 +1,133 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from src.llm_deadline import _Attempt, DeadlineChatModel, DeadlineStats, FallbackWatch, LLMDeadlineExceeded
+from src.llm_governor import LLMGovernor
+
+QUESTION = [HumanMessage(content="What causes anemia?")]
+
+
+def deadline_model(model, fallback=None, **kwargs):
+    kwargs.setdefault('deadline', 1.0)
+    kwargs.setdefault('fallback_reserve', 0.7)
+    return DeadlineChatModel(model=model, fallback=fallback, stats=DeadlineStats(), **kwargs)
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_fast_primary_answers_without_the_fallback(scripted_model):
+    primary, fallback = scripted_model(text="primary"), scripted_model(text="fallback")
+    wrapped = deadline_model(primary, fallback)
+
+    assert wrapped.invoke(QUESTION).content == "primary"
+    assert fallback.calls == []
+    assert wrapped.stats.counts['fallbacks'] == 0
+
+
+def test_stalled_primary_is_answered_by_the_fallback(scripted_model):
+    primary, fallback = scripted_model([5.0], text="primary"), scripted_model(text="fallback")
+    wrapped = deadline_model(primary, fallback)
+
+    start = time.monotonic()
+    message = wrapped.invoke(QUESTION)
+
+    assert message.content == "fallback"
+    assert 0.25 <= time.monotonic() - start < 1.0
+    assert wrapped.stats.counts['fallback_wins'] == 1
+
+
+def test_failed_primary_asks_the_fallback_at_once(scripted_model):
+    primary, fallback = scripted_model(text="primary", fail=True), scripted_model(text="fallback")
+    wrapped = deadline_model(primary, fallback, deadline=5.0, fallback_reserve=1.0)
+
+    start = time.monotonic()
+    assert wrapped.invoke(QUESTION).content == "fallback"
+    assert time.monotonic() - start < 1.0
+
+
+def test_no_answer_within_the_deadline_raises(scripted_model):
+    wrapped = deadline_model(scripted_model([5.0]), deadline=0.2)
+
+    with pytest.raises(LLMDeadlineExceeded):
+        wrapped.invoke(QUESTION)
+    assert wrapped.stats.counts['deadline_exceeded'] == 1
+
+
+def test_hedge_wins_over_a_slow_primary(scripted_model):
+    primary = scripted_model([5.0, 0.0], text="primary")
+    wrapped = deadline_model(primary, deadline=2.0, hedge=True, hedge_min_delay=0.1)
+
+    assert wrapped.invoke(QUESTION).content == "primary"
+    assert len(primary.calls) == 2
+    assert wrapped.stats.counts['hedge_wins'] == 1
+
+
+def test_stream_falls_back_before_the_first_token(scripted_model):
+    primary, fallback = scripted_model([5.0], text="primary"), scripted_model(text="fallback answer")
+    wrapped = deadline_model(primary, fallback)
+
+    assert "".join(chunk.content for chunk in wrapped.stream(QUESTION)).split() == ["fallback", "answer"]
+
+
+def test_fallback_answers_are_marked_for_the_answer_cache(scripted_model):
+    watch = FallbackWatch()
+    chain = deadline_model(scripted_model([5.0]), scripted_model(text="fallback")) | StrOutputParser()
+
+    assert chain.invoke(QUESTION, config={"callbacks": [watch]}) == "fallback"
+    assert watch.used
+
+    watch = FallbackWatch()
+    chain = deadline_model(scripted_model(), scripted_model(text="fallback")) | StrOutputParser()
+    chain.invoke(QUESTION, config={"callbacks": [watch]})
+    assert not watch.used
+
+
+def test_every_attempt_holds_its_own_governor_slot(scripted_model):
+    governor = LLMGovernor(max_concurrent=2, max_queued=4, queue_timeout=5)
+    primary, fallback = scripted_model([0.8], text="primary"), scripted_model(text="fallback")
+    wrapped = deadline_model(primary, fallback, deadline=1.0, fallback_reserve=0.8, governor=governor)
+
+    assert wrapped.invoke(QUESTION).content == "fallback"
+    # The abandoned primary is still running upstream and still counts against the limit
+    assert governor.stats()['active'] == 1
+    assert wait_for(lambda: governor.stats()['active'] == 0)
+    assert governor.admitted[0] == 2
+
+
+def test_attempts_never_exceed_the_governor_limit(scripted_model):
+    governor = LLMGovernor(max_concurrent=1, max_queued=4, queue_timeout=5)
+    # One model serves as primary, hedge and fallback so its peak is the upstream concurrency
+    model = scripted_model([0.3, 0.0, 0.0])
+    wrapped = deadline_model(model, model, deadline=2.0, fallback_reserve=1.9, hedge=True,
+                             hedge_min_delay=0.05, governor=governor)
+
+    wrapped.invoke(QUESTION)
+    assert wait_for(lambda: governor.stats()['active'] == 0 and governor.stats()['queued'] == 0)
+    assert model.peak == 1
+    assert wrapped.stats.counts['hedged'] == 1 and wrapped.stats.counts['fallbacks'] == 1
+
+
+def test_attempt_cancelled_while_queued_never_calls_upstream():
+    admitted, calls, events = threading.Event(), [], queue.Queue()
+
+    @contextmanager
+    def admit():
+        admitted.wait()
+        yield
+
+    attempt = _Attempt('hedge', lambda: calls.append(1), events, streaming=False, admit=admit)
+    attempt.cancelled = True
+    admitted.set()
+    time.sleep(0.05)
+
+    assert calls == []
+    assert events.empty()
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import ExitStack
+import pytest
+from src.llm_governor import FORMATTING, INTERACTIVE, SUMMARY, LLMGovernor, LLMOverloaded
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.005)
+    return condition()
+
+
+def start_waiter(governor, priority, results, hold=0.0):
+    def run():
+        try:
+            with governor.slot(priority):
+                results.append(priority)
+                time.sleep(hold)
+        except LLMOverloaded:
+            results.append(('shed', priority))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_waiters_are_admitted_most_urgent_first():
+    governor = LLMGovernor(max_concurrent=1, max_queued=4, queue_timeout=5, background_slots=1)
+    admitted = []
+    with governor.slot(INTERACTIVE):
+        threads = []
+        for priority in (FORMATTING, SUMMARY, INTERACTIVE):
+            threads.append(start_waiter(governor, priority, admitted))
+            assert wait_for(lambda: governor.stats()['queued'] == len(threads))
+    for thread in threads:
+        thread.join(2)
+
+    assert admitted == [INTERACTIVE, SUMMARY, FORMATTING]
+
+
+def test_background_work_is_capped_at_its_slots():
+    governor = LLMGovernor(max_concurrent=2, max_queued=4, queue_timeout=5, background_slots=1)
+    with governor.slot(SUMMARY):
+        with pytest.raises(LLMOverloaded):
+            with governor.slot(SUMMARY, timeout=0.05):
+                pass
+        # The other slot is still free for chat
+        with governor.slot(INTERACTIVE, timeout=0.05):
+            assert governor.stats()['active'] == 2
+    assert governor.timeouts[SUMMARY] == 1
+
+
+def test_full_queue_sheds_the_least_urgent_waiter():
+    governor = LLMGovernor(max_concurrent=1, max_queued=1, queue_timeout=5)
+    results = []
+    with governor.slot(INTERACTIVE):
+        summary = start_waiter(governor, SUMMARY, results)
+        assert wait_for(lambda: governor.stats()['queued'] == 1)
+        chat = start_waiter(governor, INTERACTIVE, results)
+        summary.join(2)
+        assert results == [('shed', SUMMARY)]
+        # A request less urgent than every waiter is turned away at once
+        with pytest.raises(LLMOverloaded):
+            with governor.slot(FORMATTING):
+                pass
+    chat.join(2)
+
+    assert results == [('shed', SUMMARY), INTERACTIVE]
+    assert governor.shed[SUMMARY] == 1 and governor.shed[FORMATTING] == 1
+    assert not governor._evicted
+
+
+def test_evicted_waiter_is_shed_even_when_a_slot_frees_first():
+    governor = LLMGovernor(max_concurrent=1, max_queued=1, queue_timeout=5)
+    results = []
+    holder = ExitStack()
+    holder.enter_context(governor.slot(INTERACTIVE))
+    summary = start_waiter(governor, SUMMARY, results)
+    assert wait_for(lambda: governor.stats()['queued'] == 1)
+
+    with governor._cond:
+        # A chat request evicts the summary waiter and is served elsewhere, and the slot
+        # frees up before the evicted waiter gets to run
+        chat = (INTERACTIVE, next(governor._seq))
+        assert governor._enqueue(chat)
+        governor._waiting.remove(chat)
+        holder.close()
+    summary.join(2)
+
+    assert results == [('shed', SUMMARY)]
+    assert governor.shed[SUMMARY] == 1
+    assert not governor._evicted
+    assert governor.stats()['active'] == 0
+
+
+def test_waiter_times_out_after_queue_timeout():
+    governor = LLMGovernor(max_concurrent=1, max_queued=4, queue_timeout=0.05)
+    with governor.slot(INTERACTIVE):
+        with pytest.raises(LLMOverloaded):
+            with governor.slot(INTERACTIVE):
+                pass
+
+    assert governor.timeouts[INTERACTIVE] == 1
+    assert governor.stats()['queued'] == 0
@@ -0,0 +1,75 @@
+import pytest
+from src.local_store import LocalVectorStore, parse_doc_id_filter
+
+TEXTS = [
+    "anemia lowers hemoglobin",
+    "insulin controls blood glucose",
+    "statins lower ldl cholesterol",
+    "thyroid hormone tsh levels",
+]
+
+
+def make_store(tmp_path, embeddings, **kwargs):
+    store = LocalVectorStore(embeddings, str(tmp_path / "index"), **kwargs)
+    store.add_texts(TEXTS, metadatas=[{'doc_id': 'a'}, {'doc_id': 'a'}, {'doc_id': 'b'}, {'doc_id': 'b'}],
+                    ids=['a0', 'a1', 'b0', 'b1'])
+    return store
+
+
+def test_search_returns_the_closest_chunk(tmp_path, embeddings):
+    store = make_store(tmp_path, embeddings)
+
+    doc, score = store.similarity_search_with_score("insulin controls blood glucose", k=1)[0]
+    assert doc.id == 'a1'
+    assert doc.page_content == TEXTS[1]
+    assert doc.metadata == {'doc_id': 'a'}
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert len(store) == 4
+
+
+def test_doc_id_filter_limits_results(tmp_path, embeddings):
+    store = make_store(tmp_path, embeddings)
+
+    hits = store.similarity_search("blood glucose insulin", k=4, filter={'doc_id': 'b'})
+    assert {doc.id for doc in hits} == {'b0', 'b1'}
+    hits = store.similarity_search("insulin", k=4, filter={'doc_id': {'$in': ['a', 'missing']}})
+    assert {doc.id for doc in hits} == {'a0', 'a1'}
+    with pytest.raises(ValueError):
+        store.similarity_search("insulin", filter={'source': 'x'})
+
+
+def test_delete_by_id_and_by_doc_id(tmp_path, embeddings):
+    store = make_store(tmp_path, embeddings)
+
+    assert store.delete(ids=['a1'])
+    assert 'a1' not in {doc.id for doc in store.similarity_search("blood glucose insulin", k=4)}
+    assert len(store) == 3
+
+    assert store.delete(filter={'doc_id': {'$eq': 'b'}})
+    assert [doc.id for doc in store.similarity_search("cholesterol", k=4)] == ['a0']
+    assert store.similarity_search("cholesterol", filter={'doc_id': 'b'}) == []
+    assert not store.delete(ids=['a1'])
+
+
+def test_compact_and_reopen_keep_live_chunks(tmp_path, embeddings):
+    store = make_store(tmp_path, embeddings)
+    store.delete(ids=['a0', 'b0'])
+    store.compact()
+
+    assert len(store) == 2
+    assert store.similarity_search("thyroid tsh", k=1)[0].id == 'b1'
+
+    reopened = LocalVectorStore(embeddings, store.path)
+    assert len(reopened) == 2
+    assert [doc.id for doc in reopened.similarity_search("insulin glucose", k=4)][0] == 'a1'
+    assert {doc.id for doc in reopened.similarity_search("x", k=4, filter={'doc_id': 'b'})} == {'b1'}
+    reopened.add_texts(["vitamin d deficiency"], metadatas=[{'doc_id': 'c'}], ids=['c0'])
+    assert reopened.similarity_search("vitamin d", k=1)[0].id == 'c0'
+
+
+def test_parse_doc_id_filter():
+    assert parse_doc_id_filter(None) is None
+    assert parse_doc_id_filter({'doc_id': 'a'}) == {'a'}
+    assert parse_doc_id_filter({'doc_id': {'$in': ['a', 'b']}}) == {'a', 'b'}
+    with pytest.raises(ValueError):
+        parse_doc_id_filter({'doc_id': {'$ne': 'a'}})
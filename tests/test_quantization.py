@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from src.local_store import LocalVectorStore, normalize_rows
+from src.quantization import ProductQuantizer, ScalarQuantizer, create_quantizer, load_quantizer
+
+
+def random_vectors(count, dim=16, seed=0):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((count, dim)))
+
+
+def quantized_store(tmp_path, embeddings, quantizer, count=600, rerank=50):
+    store = LocalVectorStore(embeddings, str(tmp_path / "index"), ann_min_rows=0, rerank=rerank)
+    vectors = random_vectors(count)
+    ids = [f"c{i}" for i in range(count)]
+    store.add_vectors(vectors, ids, [{} for _ in ids], ids)
+    full_bytes = store.memory_bytes()
+    store.quantize(quantizer)
+    return store, vectors, full_bytes
+
+
+def test_scalar_quantizer_round_trip_and_scores():
+    vectors = random_vectors(200)
+    quantizer = ScalarQuantizer().train(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.uint8 and codes.shape == (200, 16)
+    assert np.abs(quantizer.decode(codes) - vectors).max() < 0.01
+    assert np.allclose(quantizer.scores(vectors[0], codes), quantizer.decode(codes) @ vectors[0], atol=1e-4)
+
+
+def test_product_quantizer_scores_match_decoded_vectors():
+    vectors = random_vectors(600)
+    quantizer = ProductQuantizer(m=4).train(vectors, iterations=5)
+    codes = quantizer.encode(vectors)
+
+    assert codes.shape == (600, 4)
+    assert np.allclose(quantizer.scores(vectors[0], codes), quantizer.decode(codes) @ vectors[0], atol=1e-4)
+    with pytest.raises(ValueError):
+        ProductQuantizer(m=5).encode(vectors)
+
+
+@pytest.mark.parametrize("kind", ["sq8", "pq"])
+def test_quantized_search_reranks_exactly(tmp_path, embeddings, kind):
+    store, vectors, full_bytes = quantized_store(tmp_path, embeddings, create_quantizer(kind, pq_subvectors=4))
+
+    assert store.memory_bytes() == 600 * store.quantizer.code_size < full_bytes
+    for i in range(10):
+        doc, score = store.similarity_search_with_score_by_vector(vectors[i], k=1)[0]
+        assert doc.id == f"c{i}"
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_quantization_survives_writes_and_reopen(tmp_path, embeddings):
+    store, vectors, _ = quantized_store(tmp_path, embeddings, ScalarQuantizer())
+    extra = random_vectors(5, seed=1)
+    ids = [f"n{i}" for i in range(5)]
+    store.add_vectors(extra, ids, [{} for _ in ids], ids)
+    store.delete(ids=['c0'])
+    store.compact()
+
+    reopened = LocalVectorStore(embeddings, store.path)
+    assert isinstance(load_quantizer(store.path), ScalarQuantizer)
+    assert reopened.memory_bytes() == len(reopened) * 16
+    assert reopened.similarity_search_by_vector(extra[2], k=1)[0].id == 'n2'
+    assert reopened.similarity_search_by_vector(vectors[0], k=1)[0].id != 'c0'
+
+
+def test_create_quantizer_rejects_unknown_kinds():
+    with pytest.raises(ValueError):
+        create_quantizer('opq')
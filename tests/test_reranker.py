@@ -0,0 +1,67 @@
+import sys
+import time
+import types
+import pytest
+from langchain_core.documents import Document
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how often the query's first word occurs in the chunk, taking ``seconds_per_pair``"""
+
+    seconds_per_pair = 0.0
+
+    def __init__(self, model_name, max_length=256):
+        self.pairs = 0
+
+    def predict(self, pairs, batch_size=8):
+        time.sleep(self.seconds_per_pair * len(pairs))
+        self.pairs += len(pairs)
+        return [chunk.lower().count(query.split()[0].lower()) for query, chunk in pairs]
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'sentence_transformers', types.SimpleNamespace(CrossEncoder=FakeCrossEncoder))
+    from src.reranker import CrossEncoderReranker
+
+    def make(seconds_per_pair=0.0, **kwargs):
+        FakeCrossEncoder.seconds_per_pair = seconds_per_pair
+        return CrossEncoderReranker('fake-cross-encoder', **kwargs)
+    return make
+
+
+DOCS = [Document(page_content=text) for text in (
+    "General advice on rest.",
+    "Insulin doses for type 1 diabetes.",
+    "Insulin, insulin pumps and insulin pens.",
+    "Blood pressure basics.",
+)]
+
+
+def test_best_scored_chunks_come_first(reranker):
+    assert [doc.page_content for doc in reranker(batch_size=2).rerank("insulin dosing", DOCS, 2)] == [
+        "Insulin, insulin pumps and insulin pens.",
+        "Insulin doses for type 1 diabetes.",
+    ]
+
+
+def test_scores_are_kept_when_the_last_batch_ends_past_the_budget(reranker):
+    # One batch covering every pair, and it takes longer than the whole budget
+    slow = reranker(seconds_per_pair=0.02, budget_ms=10, batch_size=8)
+    docs = slow.rerank("insulin dosing", DOCS, 2)
+
+    assert docs[0].page_content == "Insulin, insulin pumps and insulin pens."
+    assert slow.stats()['timeouts'] == 0
+
+
+def test_batches_that_cannot_fit_the_remaining_budget_are_skipped(reranker):
+    slow = reranker(seconds_per_pair=0.01, budget_ms=30, batch_size=1)
+    slow.rerank("insulin dosing", DOCS, 2)
+    assert slow.stats()['ms_per_pair'] >= 10
+
+    # With the measured cost the four pairs (about 40ms) cannot fit 30ms, nothing is scored
+    scored = slow.model.pairs
+    docs = slow.rerank("insulin dosing", DOCS, 2)
+    assert slow.model.pairs == scored
+    assert [doc.page_content for doc in docs] == [doc.page_content for doc in DOCS[:2]]
+    assert slow.stats()['timeouts'] >= 1
@@ -0,0 +1,52 @@
+import time
+from langchain_core.documents import Document
+from src.semantic_cache import SemanticAnswerCache
+
+DOCS = [Document(page_content="Anemia is a low red blood cell count."),
+        Document(page_content="Iron deficiency is the most common cause of anemia.")]
+FIRST_TURN = {'history': "(none)", 'health_context': "(none)"}
+FOLLOW_UP = {'history': "User: What is anemia?\nAssistant: A low red blood cell count.",
+             'health_context': "(none)"}
+
+
+def test_near_identical_question_over_the_same_chunks_hits(embeddings):
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store(embeddings.embed_query("what is anemia"), DOCS, "answer", FIRST_TURN)
+
+    assert cache.lookup(embeddings.embed_query("What is anemia?"), list(reversed(DOCS)), FIRST_TURN) == "answer"
+    assert cache.lookup(embeddings.embed_query("how is diabetes treated"), DOCS, FIRST_TURN) is None
+    assert cache.lookup(embeddings.embed_query("what is anemia"), DOCS[:1], FIRST_TURN) is None
+
+
+def test_follow_up_questions_match_only_an_identical_history(embeddings):
+    cache = SemanticAnswerCache()
+    query = embeddings.embed_query("what causes it")
+    cache.store(query, DOCS, "iron deficiency", FOLLOW_UP)
+
+    assert cache.lookup(query, DOCS, dict(FOLLOW_UP)) == "iron deficiency"
+    assert cache.lookup(query, DOCS, FIRST_TURN) is None
+    assert cache.lookup(query, DOCS, {**FOLLOW_UP, 'history': FOLLOW_UP['history'] + "\nUser: thanks"}) is None
+
+
+def test_entries_expire_after_ttl(embeddings):
+    cache = SemanticAnswerCache(ttl=0.05)
+    query = embeddings.embed_query("what is anemia")
+    cache.store(query, DOCS, "answer")
+    time.sleep(0.1)
+
+    assert cache.lookup(query, DOCS) is None
+    assert cache.stats()['expired'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted(embeddings):
+    cache = SemanticAnswerCache(max_entries=2)
+    queries = [embeddings.embed_query(text) for text in ("anemia", "diabetes", "asthma")]
+    cache.store(queries[0], DOCS, "a")
+    cache.store(queries[1], DOCS, "b")
+    cache.lookup(queries[0], DOCS)
+    cache.store(queries[2], DOCS, "c")
+
+    assert cache.lookup(queries[0], DOCS) == "a"
+    assert cache.lookup(queries[1], DOCS) is None
+    assert cache.stats()['evicted'] == 1
@@ -0,0 +1,100 @@
+import time
+from langchain_core.documents import Document
+from src.keyword_index import KeywordIndex
+from src.pipeline import RetrievalPipeline
+from src.session_shards import SessionShards
+
+CORPUS = [
+    "Anemia is a low red blood cell count and causes fatigue.",
+    "Diabetes is diagnosed from fasting glucose and HbA1c tests.",
+    "A normal white blood cell count helps the body fight infection.",
+]
+UPLOAD = ["Patient report: wbc 11000 cells per microlitre, count above range."]
+
+
+class CorpusStore:
+    """Global vector store stand-in holding only the ingested corpus"""
+
+    def __init__(self, embeddings, texts):
+        self.embeddings = embeddings
+        self.docs = [Document(page_content=text, metadata={'source': 'corpus'}) for text in texts]
+        self.vectors = embeddings.embed_documents(texts)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        docs = [doc for doc in self.docs if not filter or doc.metadata.get('doc_id') == filter['doc_id']]
+        vectors = {doc.page_content: vector for doc, vector in zip(self.docs, self.vectors)}
+        scores = [sum(a * b for a, b in zip(embedding, vectors[doc.page_content])) for doc in docs]
+        return [doc for _, doc in sorted(zip(scores, docs), key=lambda pair: -pair[0])][:k]
+
+
+def upload_chunks(doc_id, texts):
+    return [Document(page_content=text, metadata={'doc_id': doc_id, 'chunk_index': i}) for i, text in enumerate(texts)]
+
+
+def make_pipeline(tmp_path, embeddings, shards):
+    keyword_index = KeywordIndex(str(tmp_path / "keywords.sqlite"))
+    keyword_index.add_documents([Document(page_content=text, metadata={'source': 'corpus'}) for text in CORPUS])
+    pipeline = RetrievalPipeline(CorpusStore(embeddings, CORPUS), question_answer_chain=None, k=3,
+                                 keyword_index=keyword_index, fetch_k=10, shards=shards)
+    return pipeline, keyword_index
+
+
+def test_unscoped_query_never_returns_shard_chunks(tmp_path, embeddings):
+    shards = SessionShards()
+    chunks = upload_chunks('u1', UPLOAD)
+    shards.add('u1', chunks, embeddings.embed_documents(UPLOAD))
+    pipeline, keyword_index = make_pipeline(tmp_path, embeddings, shards)
+    # A row an older build indexed globally for the same upload must not leak either
+    keyword_index.add_documents(chunks)
+
+    docs = pipeline.retrieve('wbc count')
+
+    assert docs
+    assert all(doc.metadata.get('doc_id') is None for doc in docs)
+    assert all('11000' not in doc.page_content for doc in docs)
+
+
+def test_scoped_query_searches_only_its_shard(tmp_path, embeddings):
+    shards = SessionShards()
+    shards.add('u1', upload_chunks('u1', UPLOAD), embeddings.embed_documents(UPLOAD))
+    other = ["Prescription: amoxicillin 500mg three times a day."]
+    shards.add('u2', upload_chunks('u2', other), embeddings.embed_documents(other))
+    pipeline, _ = make_pipeline(tmp_path, embeddings, shards)
+
+    docs = pipeline.retrieve('wbc count', doc_id='u1')
+
+    assert [doc.metadata['doc_id'] for doc in docs] == ['u1']
+
+
+def test_least_recently_used_shard_is_evicted_over_budget(embeddings):
+    evicted = []
+    shards = SessionShards(max_chunks=2, on_evict=evicted.append)
+    for doc_id in ('a', 'b'):
+        shards.add(doc_id, upload_chunks(doc_id, ["text"]), embeddings.embed_documents(["text"]))
+    shards.get('a')
+    shards.add('c', upload_chunks('c', ["text"]), embeddings.embed_documents(["text"]))
+
+    assert evicted == ['b']
+    assert shards.get('b') is None
+    assert shards.get('a') is not None and shards.get('c') is not None
+
+
+def test_idle_shard_expires_after_ttl(embeddings):
+    evicted = []
+    shards = SessionShards(ttl=0.05, on_evict=evicted.append)
+    shards.add('a', upload_chunks('a', ["text"]), embeddings.embed_documents(["text"]))
+    time.sleep(0.1)
+
+    assert shards.get('a') is None
+    assert evicted == ['a']
+    assert shards.stats()['evicted'] == 1
+
+
+def test_explicit_delete_does_not_call_on_evict(embeddings):
+    evicted = []
+    shards = SessionShards(on_evict=evicted.append)
+    shards.add('a', upload_chunks('a', ["text"]), embeddings.embed_documents(["text"]))
+    shards.delete('a')
+
+    assert shards.get('a') is None
+    assert evicted == []
@@ -0,0 +1,110 @@
+import threading
+import time
+import pytest
+from langchain_core.messages import HumanMessage
+from src.llm_deadline import LLMDeadlineExceeded
+from src.single_flight import SharedCallTimeout, SingleFlight, SingleFlightChatModel
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_identical_prompts_share_one_upstream_call(scripted_model):
+    model = scripted_model([0.2], text="shared answer")
+    wrapped = SingleFlightChatModel(model=model, flight=SingleFlight(timeout=5))
+
+    results = run_concurrently(4, lambda: wrapped.invoke([HumanMessage(content="what is anemia")]).content)
+
+    assert results == ["shared answer"] * 4
+    assert len(model.calls) == 1
+    assert wrapped.flight.stats()['collapsed'] == 3
+
+
+def test_streams_are_shared_with_followers(scripted_model):
+    model = scripted_model([0.2], text="one two three")
+    wrapped = SingleFlightChatModel(model=model, flight=SingleFlight(timeout=5))
+
+    results = run_concurrently(3, lambda: "".join(chunk.content for chunk in
+                                                  wrapped.stream([HumanMessage(content="q")])))
+
+    assert results == ["one two three "] * 3
+    assert len(model.calls) == 1
+
+
+def test_leader_errors_reach_followers_without_a_second_call():
+    flight, calls = SingleFlight(timeout=5), []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.2)
+        raise LLMDeadlineExceeded("no answer")
+
+    results = run_concurrently(2, lambda: flight.do("key", fail))
+
+    assert all(isinstance(result, LLMDeadlineExceeded) for result in results)
+    assert len(calls) == 1
+
+
+def test_follower_of_a_hung_leader_calls_directly():
+    flight, release = SingleFlight(timeout=0.1), threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: release.wait(5) and "leader"))
+    leader.start()
+    time.sleep(0.02)
+
+    start = time.monotonic()
+    assert flight.do("key", lambda: "direct") == "direct"
+    assert time.monotonic() - start < 1.0
+    assert flight.stats()['follower_timeouts'] == 1
+    release.set()
+    leader.join(2)
+
+
+def test_stream_follower_of_a_hung_leader_calls_directly():
+    flight, release = SingleFlight(timeout=0.1), threading.Event()
+
+    def hung():
+        release.wait(5)
+        yield "late"
+
+    leader = threading.Thread(target=lambda: list(flight.stream("key", hung)))
+    leader.start()
+    time.sleep(0.02)
+
+    assert list(flight.stream("key", lambda: iter(["direct"]))) == ["direct"]
+    release.set()
+    leader.join(2)
+
+
+def test_stream_follower_does_not_restart_after_receiving_chunks():
+    flight, release = SingleFlight(timeout=0.1), threading.Event()
+
+    def stalls():
+        yield "first "
+        release.wait(5)
+        yield "late"
+
+    leader = threading.Thread(target=lambda: list(flight.stream("key", stalls)))
+    leader.start()
+    time.sleep(0.05)
+
+    received = []
+    with pytest.raises(SharedCallTimeout):
+        for chunk in flight.stream("key", lambda: iter(["direct"])):
+            received.append(chunk)
+    assert received == ["first "]
+    release.set()
+    leader.join(2)
@@ -0,0 +1,47 @@
+import sqlite3
+from src.summary_cache import SummaryCache, document_key, prompt_version
+
+
+def result(name):
+    return {'summary': f"{name} summary", 'comprehensive_analysis': f"{name} analysis"}
+
+
+def test_same_bytes_hit_and_prompt_changes_miss(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"))
+    version = prompt_version("system prompt", "model-a")
+    cache.put(document_key(b"%PDF report", version), result("report"))
+
+    assert cache.get(document_key(b"%PDF report", version)) == result("report")
+    assert cache.get(document_key(b"%PDF report", prompt_version("new prompt", "model-a"))) is None
+    assert cache.get(document_key(b"%PDF other", version)) is None
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 2}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"), max_entries=2)
+    cache.put('a', result('a'))
+    cache.put('b', result('b'))
+    conn = sqlite3.connect(cache.db_path)
+    conn.execute("UPDATE document_summaries SET last_used = last_used - 10 WHERE key = 'a'")
+    conn.execute("UPDATE document_summaries SET last_used = last_used - 20 WHERE key = 'b'")
+    conn.commit()
+    conn.close()
+    cache.get('a')
+    cache.put('c', result('c'))
+
+    assert cache.get('b') is None
+    assert cache.get('a') == result('a') and cache.get('c') == result('c')
+    assert cache.stats()['entries'] == 2
+
+
+def test_expired_entries_are_ignored_and_pruned(tmp_path):
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"), ttl=60)
+    cache.put('old', result('old'))
+    conn = sqlite3.connect(cache.db_path)
+    conn.execute("UPDATE document_summaries SET created_at = created_at - 120")
+    conn.commit()
+    conn.close()
+
+    assert cache.get('old') is None
+    cache.put('new', result('new'))
+    assert cache.stats()['entries'] == 1
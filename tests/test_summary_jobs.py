@@ -0,0 +1,81 @@
+import threading
+import pytest
+from src.summary_jobs import SummaryJobs
+
+
+def scripted_summary(gate=None, fail=False):
+    def summarize(text):
+        yield 'analysis', f"{text} part one. "
+        if gate is not None:
+            gate.wait(5)
+        if fail:
+            raise RuntimeError("llm down")
+        yield 'analysis', "part two."
+        yield 'done', {'summary': text, 'comprehensive_analysis': f"{text} part one. part two."}
+    return summarize
+
+
+def test_follow_streams_analysis_then_the_result():
+    gate = threading.Event()
+    jobs = SummaryJobs(scripted_summary(gate))
+    job = jobs.submit('d1', 'report')
+
+    events = job.follow(timeout=5)
+    assert next(events) == ('analysis', 'report part one. ')
+    gate.set()
+    assert list(events) == [('analysis', 'part two.'),
+                            ('done', {'summary': 'report', 'comprehensive_analysis': 'report part one. part two.'})]
+    assert jobs.submit('d1', 'report') is job
+    assert jobs.stats()['completed'] == 1
+
+
+def test_failed_job_raises_for_followers_and_can_be_resubmitted():
+    jobs = SummaryJobs(scripted_summary(fail=True))
+    job = jobs.submit('d1', 'report')
+
+    with pytest.raises(RuntimeError, match="llm down"):
+        list(job.follow(timeout=5))
+    assert job.describe()['status'] == 'failed'
+    assert jobs.stats()['failed'] == 1
+
+    retry = jobs.submit('d1', 'report')
+    assert retry is not job
+    with pytest.raises(RuntimeError):
+        list(retry.follow(timeout=5))
+
+
+def test_full_queue_rejects_new_documents():
+    gate = threading.Event()
+    jobs = SummaryJobs(scripted_summary(gate), max_workers=1, max_queued=1)
+    running = jobs.submit('d1', 'one')
+    next(running.follow(timeout=5))
+
+    assert jobs.submit('d2', 'two') is not None
+    assert jobs.submit('d3', 'three') is None
+    assert jobs.stats()['rejected'] == 1
+    gate.set()
+    assert list(jobs.get('d2').follow(timeout=5))[-1][0] == 'done'
+
+
+def test_follow_times_out_while_the_job_is_stuck():
+    gate = threading.Event()
+    jobs = SummaryJobs(scripted_summary(gate))
+    events = jobs.submit('d1', 'report').follow(timeout=0.1)
+
+    assert next(events)[0] == 'analysis'
+    with pytest.raises(TimeoutError):
+        next(events)
+    gate.set()
+
+
+def test_finished_jobs_expire_and_can_be_discarded():
+    jobs = SummaryJobs(scripted_summary(), ttl=60)
+    job = jobs.submit('d1', 'report')
+    list(job.follow(timeout=5))
+
+    job.finished -= 61
+    assert jobs.get('d1') is None
+
+    jobs.submit('d2', 'report')
+    jobs.discard('d2')
+    assert jobs.get('d2') is None
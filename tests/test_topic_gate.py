@@ -0,0 +1,58 @@
+import pytest
+from src import config
+from src.topic_gate import TopicGate, fit_centroids, fit_logistic, load_topic_gate
+
+MEDICAL = [
+    "what does a high wbc count mean",
+    "is my hemoglobin low for anemia",
+    "side effects of metformin for diabetes",
+    "normal range for thyroid tsh",
+    "what does high ldl cholesterol mean",
+    "how much insulin for high blood glucose",
+]
+OFF_TOPIC = [
+    "who won the football match yesterday",
+    "recommend a good movie to watch tonight",
+    "write a poem about the ocean",
+    "what is the capital city of france",
+    "best pizza recipe with cheese",
+    "how do i fix my laptop keyboard",
+]
+
+
+def training_set(embeddings):
+    X = embeddings.embed_documents(MEDICAL + OFF_TOPIC)
+    y = [0] * len(MEDICAL) + [1] * len(OFF_TOPIC)
+    return X, y
+
+
+@pytest.mark.parametrize("kind, fit, threshold", [("logistic", fit_logistic, 0.5), ("centroid", fit_centroids, 0.0)])
+def test_gate_separates_training_queries(embeddings, kind, fit, threshold):
+    weights, bias = fit(*training_set(embeddings))
+    gate = TopicGate(weights, bias, threshold, kind=kind)
+
+    assert not any(gate.is_off_topic(embeddings.embed_query(text)) for text in MEDICAL)
+    assert all(gate.is_off_topic(embeddings.embed_query(text)) for text in OFF_TOPIC)
+    assert gate.stats()['checked'] == 12 and gate.stats()['rejected'] == 6
+
+
+def test_logistic_score_is_a_probability(embeddings):
+    gate = TopicGate(*fit_logistic(*training_set(embeddings)), threshold=0.5)
+
+    score = gate.score(embeddings.embed_query(OFF_TOPIC[0]))
+    assert 0.5 < score < 1.0
+
+
+def test_saved_gate_loads_from_config(tmp_path, monkeypatch, embeddings):
+    path = str(tmp_path / "topic_gate.npz")
+    gate = TopicGate(*fit_centroids(*training_set(embeddings)), threshold=0.1, kind='centroid')
+    gate.save(path)
+
+    monkeypatch.setattr(config, 'TOPIC_GATE_PATH', path)
+    loaded = load_topic_gate()
+    assert loaded.kind == 'centroid' and loaded.threshold == pytest.approx(0.1)
+    query = embeddings.embed_query(MEDICAL[0])
+    assert loaded.score(query) == pytest.approx(gate.score(query))
+
+    monkeypatch.setattr(config, 'TOPIC_GATE_PATH', str(tmp_path / "missing.npz"))
+    assert load_topic_gate() is None